@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""Microbenchmark of L{Property} get and set throughput.
+
+The property system is compared against plain instance attributes and
+builtin properties, which are the lower bounds for attribute access.
+"""
+try:
+    import _preamble
+except ImportError:
+    import sys
+    sys.exc_clear()
+
+import sys
+
+from optparse import OptionParser
+from timeit import Timer
+
+
+# Setup statements for each kind of item, from the fastest to the slowest.
+SETUPS = [
+    ("plain", """
+class Item(object):
+    def __init__(self, status):
+        self.status = status
+item = Item("Open")
+"""),
+    ("builtin", """
+class Item(object):
+    def __init__(self, status):
+        self._status = status
+    def _get_status(self):
+        return self._status
+    def _set_status(self, status):
+        self._status = status
+    status = property(_get_status, _set_status)
+item = Item("Open")
+"""),
+    ("property", """
+from jiraban.board import Item
+item = Item("1", "link", "Major", "Open", u"project", u"summary")
+"""),
+    ]
+
+STATEMENTS = [
+    "item.status",
+    "item.status = 'Open'",
+    ]
+
+
+def run(number, repeat):
+    """Print the best throughput of each statement for each kind of item."""
+    print "%-10s %15s %15s" % ("", "get (ops/s)", "set (ops/s)")
+    for name, setup in SETUPS:
+        results = []
+        for statement in STATEMENTS:
+            timer = Timer(statement, setup)
+            best = min(timer.repeat(repeat, number))
+            results.append(number / best)
+        print "%-10s %15.0f %15.0f" % (name, results[0], results[1])
+
+
+def main(args):
+    parser = OptionParser(usage="Usage: %prog [OPTIONS]")
+    parser.add_option("-n", "--number",
+        type="int",
+        default=100000,
+        help="""Number of operations per repeat, defaults to %default.""")
+    parser.add_option("-r", "--repeat",
+        type="int",
+        default=5,
+        help="""Number of repeats, defaults to %default.""")
+    options, args = parser.parse_args(args)
+    run(options.number, options.repeat)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
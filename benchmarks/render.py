@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""Benchmark of the time to render a large board into HTML."""
+try:
+    import _preamble
+except ImportError:
+    import sys
+    sys.exc_clear()
+
+import sys
+
+from optparse import OptionParser
+from timeit import Timer
+
+from jiraban.board import (
+    PRIORITY_ORDER,
+    STATUS_ORDER,
+    Board,
+    Item,
+    )
+from jiraban.html import generate_html
+from jiraban.model import build_render_model
+from jiraban.testing.synthetic import StubJIRA
+
+
+def create_board(tiles, stories, categories, identities):
+    """Create a L{Board} with about C{tiles} tiles.
+
+    Each item has one component and one fix version, so it is rendered
+    as exactly one tile.
+    """
+    board = Board("benchmark")
+    for i in xrange(tiles):
+        board.add(Item(
+            "BENCH-%d" % i, "http://localhost/browse/BENCH-%d" % i,
+            PRIORITY_ORDER[i % len(PRIORITY_ORDER)],
+            STATUS_ORDER[i % len(STATUS_ORDER)],
+            u"benchmark", u"Summary of item %d" % i,
+            assignee=u"Assignee %d" % (i % identities),
+            components=["component-%d" % (i % stories)],
+            fix_versions=["version-%d" % (i % categories)]))
+
+    return board
+
+
+def run(tiles, stories, categories, identities, repeat, search=False):
+    """Print the best time to render a board."""
+    board = create_board(tiles, stories, categories, identities)
+    jira = StubJIRA()
+    timer = Timer(lambda: generate_html(board, jira, search=search))
+    best = min(timer.repeat(repeat, 1))
+    print "%d tiles rendered in %.3f seconds" % (tiles, best)
+    if search:
+        search_index = build_render_model(board, search=True).search_index
+        print "Search index of %d items in %d bytes" % (
+            len(search_index), len(search_index.to_json()))
+
+
+def main(args):
+    parser = OptionParser(usage="Usage: %prog [OPTIONS]")
+    parser.add_option("-t", "--tiles",
+        type="int",
+        default=10000,
+        help="""Number of tiles, defaults to %default.""")
+    parser.add_option("-s", "--stories",
+        type="int",
+        default=20,
+        help="""Number of stories, defaults to %default.""")
+    parser.add_option("-c", "--categories",
+        type="int",
+        default=5,
+        help="""Number of categories, defaults to %default.""")
+    parser.add_option("-i", "--identities",
+        type="int",
+        default=30,
+        help="""Number of identities, defaults to %default.""")
+    parser.add_option("-r", "--repeat",
+        type="int",
+        default=5,
+        help="""Number of repeats, defaults to %default.""")
+    parser.add_option("--search",
+        action="store_true",
+        default=False,
+        help="""Embed a search index in the page.""")
+    options, args = parser.parse_args(args)
+    run(options.tiles, options.stories, options.categories,
+        options.identities, options.repeat, options.search)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""Benchmark of the time for the runner to start and exit.
+
+Each scenario runs the runner in a new interpreter, so the time includes
+the imports. With --imports, the slowest imports of each scenario are
+also listed, including the time of the modules they import in turn.
+"""
+try:
+    import _preamble
+except ImportError:
+    import sys
+    sys.exc_clear()
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from optparse import OptionParser
+
+
+# Directory of the jiraban package to run.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Script run in a new interpreter, with the runner arguments as its own.
+# When IMPORTS is set, the cumulative time of each import is printed.
+SCRIPT = """
+import os
+import sys
+import time
+import __builtin__
+
+times = {}
+original_import = __builtin__.__import__
+
+def timed_import(name, *args, **kwargs):
+    start = time.time()
+    try:
+        return original_import(name, *args, **kwargs)
+    finally:
+        times.setdefault(name, time.time() - start)
+
+if os.environ.get("IMPORTS"):
+    __builtin__.__import__ = timed_import
+
+try:
+    from jiraban.scripts.runner import run
+    run(sys.argv[1:])
+except SystemExit:
+    pass
+finally:
+    for name, seconds in times.iteritems():
+        sys.stderr.write("import\\t%s\\t%f\\n" % (name, seconds))
+"""
+
+CACHE = """\
+<rss version="0.92">
+  <channel>
+    <item>
+      <link>http://localhost/browse/BENCH-1</link>
+      <key>BENCH-1</key>
+      <summary>Summary</summary>
+      <project>Benchmark</project>
+      <priority>Major</priority>
+      <status>Open</status>
+      <assignee username="user">User</assignee>
+      <component>component</component>
+    </item>
+  </channel>
+</rss>
+"""
+
+
+def get_scenarios(cache):
+    """Get the name and runner arguments of each scenario."""
+    return [
+        ("help", ["--help"]),
+        ("error", ["--limit", "0", "user", "password"]),
+        ("cache", ["--cache", cache, "-f", "json", "user", "password"]),
+        ]
+
+
+def time_command(args):
+    """Get the wall time in seconds to run python with C{args}."""
+    start = time.time()
+    subprocess.call([sys.executable] + args)
+    return time.time() - start
+
+
+def run_script(args, imports=False):
+    """Run the runner with C{args} in a new interpreter.
+
+    @return: The wall time in seconds and the time of each import.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    if imports:
+        env["IMPORTS"] = "1"
+
+    start = time.time()
+    process = subprocess.Popen(
+        [sys.executable, "-c", SCRIPT] + args, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr = process.communicate()[1]
+    seconds = time.time() - start
+
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith("import\t"):
+            name, value = line.split("\t")[1:]
+            times[name] = float(value)
+
+    return seconds, times
+
+
+def run(repeat, imports):
+    """Print the best startup time of each scenario."""
+    directory = tempfile.mkdtemp()
+    try:
+        cache = os.path.join(directory, "cache.xml")
+        with open(cache, "w") as f:
+            f.write(CACHE)
+
+        best = min(time_command(["-c", "pass"]) for _ in xrange(repeat))
+        print "%-10s %.3f seconds" % ("python", best)
+
+        for name, args in get_scenarios(cache):
+            best = min(run_script(args)[0] for _ in xrange(repeat))
+            print "%-10s %.3f seconds" % (name, best)
+            if imports:
+                times = run_script(args, True)[1]
+                slowest = sorted(
+                    times.iteritems(), key=lambda t: t[1], reverse=True)
+                for module, seconds in slowest[:imports]:
+                    print "  %-30s %.3f" % (module, seconds)
+    finally:
+        shutil.rmtree(directory)
+
+
+def main(args):
+    parser = OptionParser(usage="Usage: %prog [OPTIONS]")
+    parser.add_option("-r", "--repeat",
+        type="int",
+        default=10,
+        help="""Number of repeats, defaults to %default.""")
+    parser.add_option("--imports",
+        metavar="COUNT",
+        type="int",
+        default=0,
+        help="""Number of the slowest imports to list per scenario.""")
+    options, args = parser.parse_args(args)
+    run(options.repeat, options.imports)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
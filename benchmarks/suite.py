@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""Benchmark suite of each step from a JIRA export to an HTML board.
+
+Synthetic exports of each size are parsed, built into a board, sorted
+and rendered, keeping the best time of each step. Results can be saved
+as JSON and compared against a baseline saved by an earlier run, in
+which case a regression over the threshold fails the run.
+"""
+try:
+    import _preamble
+except ImportError:
+    import sys
+    sys.exc_clear()
+
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from optparse import OptionParser
+
+from jiraban.board import Board
+from jiraban.html import generate_html
+from jiraban.jira import JIRA
+from jiraban.testing.synthetic import (
+    StubJIRA,
+    iter_items_xml,
+    )
+from jiraban.timings import Timings
+
+
+# Steps of the suite, in the order they run.
+STEPS = ["parse", "items", "board", "sort", "render"]
+
+# Seconds under which differences are noise rather than regressions.
+NOISE = 0.001
+
+
+def run_steps(cache):
+    """Run each step once on the export in the C{cache} file.
+
+    @return: A dict of the seconds spent in each step.
+    """
+    timings = Timings()
+    jira = JIRA("http://localhost", timings=timings)
+    items = list(jira.iter_items("", cache))
+    seconds = {
+        "parse": timings.phases["parse"][1],
+        "items": timings.phases["items"][1],
+        }
+
+    start = time.time()
+    board = Board("benchmark")
+    for item in items:
+        board.add(item)
+    seconds["board"] = time.time() - start
+
+    start = time.time()
+    for story in board.stories:
+        for category in story.categories:
+            category.top()
+    seconds["sort"] = time.time() - start
+
+    start = time.time()
+    generate_html(board, StubJIRA())
+    seconds["render"] = time.time() - start
+
+    return seconds
+
+
+def run_suite(sizes, repeat, **kwargs):
+    """Get the best seconds of each step for each size of export.
+
+    @param kwargs: Arguments of L{iter_items_xml} besides the count.
+    @return: A dict of the results of each size, by size as a string.
+    """
+    results = {}
+    directory = tempfile.mkdtemp()
+    try:
+        for size in sizes:
+            cache = os.path.join(directory, "%d.xml" % size)
+            with open(cache, "w") as f:
+                for chunk in iter_items_xml(size, **kwargs):
+                    f.write(chunk)
+
+            best = {}
+            for _ in xrange(repeat):
+                for step, seconds in run_steps(cache).iteritems():
+                    best[step] = min(best.get(step, seconds), seconds)
+            results[str(size)] = best
+            os.unlink(cache)
+    finally:
+        shutil.rmtree(directory)
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Get the regressions of C{results} against a C{baseline}.
+
+    @param threshold: Fraction of the baseline time a step can grow by.
+    @return: A list of C{(size, step, baseline, seconds)} tuples.
+    """
+    regressions = []
+    for size, steps in sorted(results.iteritems(), key=lambda r: int(r[0])):
+        for step in STEPS:
+            base = baseline.get(size, {}).get(step)
+            seconds = steps.get(step)
+            if base is None or seconds is None:
+                continue
+            if seconds - base > max(base * threshold, NOISE):
+                regressions.append((size, step, base, seconds))
+
+    return regressions
+
+
+def print_results(results, baseline=None):
+    """Print a table of the results, compared with a baseline if any."""
+    print "%-8s %-8s %10s %10s" % ("size", "step", "seconds", "change")
+    for size, steps in sorted(results.iteritems(), key=lambda r: int(r[0])):
+        for step in STEPS:
+            seconds = steps[step]
+            base = (baseline or {}).get(size, {}).get(step)
+            if base:
+                change = "%+.1f%%" % ((seconds - base) / base * 100)
+            else:
+                change = ""
+            print "%-8s %-8s %10.4f %10s" % (size, step, seconds, change)
+
+
+def main(args):
+    parser = OptionParser(usage="Usage: %prog [OPTIONS]")
+    parser.add_option("--sizes",
+        default="1000,10000",
+        help="""Numbers of items separated by commas, """
+            """defaults to %default.""")
+    parser.add_option("-r", "--repeat",
+        type="int",
+        default=3,
+        help="""Number of repeats, defaults to %default.""")
+    parser.add_option("-c", "--components",
+        type="int",
+        default=20,
+        help="""Number of components, defaults to %default.""")
+    parser.add_option("-v", "--versions",
+        type="int",
+        default=5,
+        help="""Number of fix versions, defaults to %default.""")
+    parser.add_option("-a", "--assignees",
+        type="int",
+        default=30,
+        help="""Number of assignees, defaults to %default.""")
+    parser.add_option("--seed",
+        type="int",
+        default=0,
+        help="""Seed of the synthetic exports, defaults to %default.""")
+    parser.add_option("-o", "--output",
+        metavar="FILE",
+        help="""File to save the results to as JSON.""")
+    parser.add_option("-b", "--baseline",
+        metavar="FILE",
+        help="""Results of an earlier run to compare with.""")
+    parser.add_option("-t", "--threshold",
+        type="float",
+        default=0.2,
+        help="""Fraction of the baseline time a step can grow by before """
+            """failing, defaults to %default.""")
+    options, args = parser.parse_args(args)
+
+    try:
+        sizes = [int(size) for size in options.sizes.split(",")]
+    except ValueError:
+        parser.error("Sizes must be numbers separated by commas.")
+
+    parameters = {
+        "components": options.components,
+        "versions": options.versions,
+        "assignees": options.assignees,
+        "seed": options.seed,
+        }
+    results = run_suite(sizes, options.repeat, **parameters)
+
+    baseline = None
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline_data = json.load(f)
+        if baseline_data["parameters"] != parameters:
+            print >>sys.stderr, (
+                "Warning, the baseline was run with other parameters: %s"
+                % baseline_data["parameters"])
+        baseline = baseline_data["results"]
+
+    print_results(results, baseline)
+
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump({
+                "parameters": parameters,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+                }, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, options.threshold)
+        for size, step, base, seconds in regressions:
+            print >>sys.stderr, (
+                "Regression of %s with %s items: %.4f to %.4f seconds"
+                % (step, size, base, seconds))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
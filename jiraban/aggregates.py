@@ -0,0 +1,176 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "compute_aggregates",
+    "parse_wip_limits",
+    "write_aggregates",
+    "write_prometheus",
+    ]
+
+import json
+import re
+
+from collections import namedtuple
+
+# Like jiraban.export, nothing here depends on Jinja so monitoring a
+# board doesn't pay for rendering it.
+from jiraban.board import STATUS_ORDER
+from jiraban.metrics import (
+    Registry,
+    format_prometheus,
+    )
+
+
+# Counts of the items on a board by each of their groupings. Each field
+# but count and wip is a list of (name, count) tuples, sorted by name.
+BoardAggregates = namedtuple("BoardAggregates", [
+    "name", "count", "statuses", "priorities", "identities", "stories",
+    "categories", "cells", "wip"])
+
+# Count of the items in a status against its work in progress limit.
+WIPLimit = namedtuple("WIPLimit", ["status", "limit", "count", "breached"])
+
+
+def parse_wip_limits(values):
+    """Parse work in progress limits given as C{STATUS=COUNT} strings.
+
+    A C{ValueError} is raised for unknown statuses or invalid counts.
+
+    @return: A dict of the limit of each status.
+    """
+    wip_limits = {}
+    for value in values:
+        match = re.match(r"^\s*(.+?)\s*=\s*(\d+)\s*$", value)
+        if not match:
+            raise ValueError("Invalid WIP limit, expected STATUS=COUNT: %r"
+                % value)
+        status, limit = match.group(1), int(match.group(2))
+        if status not in STATUS_ORDER:
+            raise ValueError("Unknown status in WIP limit: %r" % status)
+        wip_limits[status] = limit
+
+    return wip_limits
+
+
+def compute_aggregates(board, wip_limits=None):
+    """Count the items on C{board} by each of their groupings.
+
+    Statuses and priorities are counted in a single pass over the items,
+    the other groupings are already kept by the board.
+
+    @param board: L{Board} to count.
+    @param wip_limits: Optional dict of the maximum number of items in
+        each status. A limit is breached when more items are in it.
+    """
+    statuses, priorities = board.count_by("status", "priority")
+    cells = []
+    for story in board.stories:
+        for category in story.categories:
+            cells.append((story.name, category.name, len(category)))
+
+    wip = []
+    for status, limit in sorted((wip_limits or {}).items()):
+        count = statuses.get(status, 0)
+        wip.append(WIPLimit(status, limit, count, count > limit))
+
+    return BoardAggregates(
+        board.name, len(board), sorted(statuses.items()),
+        sorted(priorities.items()), count_groups(board.identities),
+        count_groups(board.stories), count_groups(board.categories), cells,
+        wip)
+
+
+def count_groups(groups):
+    """Get the name and number of items of each group of C{groups}."""
+    return [(group.name, len(group)) for group in groups]
+
+
+def write_aggregates(board, stream, wip_limits=None):
+    """Write the aggregates of C{board} to C{stream} as JSON.
+
+    See L{compute_aggregates} for the arguments.
+    """
+    aggregates = compute_aggregates(board, wip_limits)
+    json.dump({
+        "name": aggregates.name,
+        "count": aggregates.count,
+        "statuses": dict(aggregates.statuses),
+        "priorities": dict(aggregates.priorities),
+        "identities": [
+            {"name": n, "count": c} for n, c in aggregates.identities],
+        "stories": [{"name": n, "count": c} for n, c in aggregates.stories],
+        "categories": [
+            {"name": n, "count": c} for n, c in aggregates.categories],
+        "cells": [
+            {"story": s, "category": c, "count": n}
+            for s, c, n in aggregates.cells],
+        "wip": [w._asdict() for w in aggregates.wip],
+        }, stream, sort_keys=True)
+
+
+def write_prometheus(board, stream, wip_limits=None):
+    """Write the aggregates of C{board} to C{stream} for Prometheus.
+
+    Each grouping is a gauge labelled with the board and group names,
+    groups without a name have an empty label. Breached limits have a
+    C{jiraban_board_wip_breached} gauge of 1, to alert on.
+
+    See L{compute_aggregates} for the arguments.
+    """
+    aggregates = compute_aggregates(board, wip_limits)
+    registry = Registry()
+    board_name = aggregates.name or ""
+
+    def add_gauge(name, help, label_names, samples):
+        gauge = registry.gauge(name, help, ("board",) + label_names)
+        for sample in samples:
+            labels = [board_name] + [n or "" for n in sample[:-1]]
+            gauge.labels(*labels).set(sample[-1])
+
+    add_gauge(
+        "jiraban_board_items", "Items on the board.", (),
+        [(aggregates.count,)])
+    add_gauge(
+        "jiraban_board_status_items", "Items by status.", ("status",),
+        aggregates.statuses)
+    add_gauge(
+        "jiraban_board_priority_items", "Items by priority.", ("priority",),
+        aggregates.priorities)
+    add_gauge(
+        "jiraban_board_identity_items", "Items by identity.", ("identity",),
+        aggregates.identities)
+    add_gauge(
+        "jiraban_board_story_items", "Items by story.", ("story",),
+        aggregates.stories)
+    add_gauge(
+        "jiraban_board_category_items", "Items by category.", ("category",),
+        aggregates.categories)
+    add_gauge(
+        "jiraban_board_cell_items", "Items by story and category.",
+        ("story", "category"), aggregates.cells)
+    if aggregates.wip:
+        add_gauge(
+            "jiraban_board_wip_limit", "Maximum items by status.",
+            ("status",), [(w.status, w.limit) for w in aggregates.wip])
+        add_gauge(
+            "jiraban_board_wip_breached",
+            "Whether more items than the limit are in a status.",
+            ("status",), [(w.status, int(w.breached)) for w in aggregates.wip])
+
+    stream.write(format_prometheus(registry).encode("utf-8"))
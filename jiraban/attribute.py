@@ -18,7 +18,9 @@ __metaclass__ = type
 
 __all__ = [
     "Attribute",
+    "AttributeType",
     "get_attributes",
+    "register_attributes",
     ]
 
 from jiraban.variables import Variable
@@ -32,6 +34,50 @@ class Attribute:
         self.variable_factory = variable_factory or Variable
 
 
+class AttributeType(type):
+    """Metaclass registering the attributes of a class when it is defined.
+
+    Values in the class namespace providing a C{__set_name__} method are
+    told their name, so they don't need to search for it later. Then, the
+    attributes are registered so that L{get_attributes} doesn't need to
+    scan the class.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super(AttributeType, cls).__init__(name, bases, namespace)
+        for attr, value in namespace.iteritems():
+            set_name = getattr(value, "__set_name__", None)
+            if set_name is not None:
+                set_name(cls, attr)
+
+        register_attributes(cls)
+
+
+def register_attributes(cls):
+    """Register the attributes of C{cls} and return them.
+
+    Only the namespace of C{cls} is considered, in addition to the
+    attributes already registered for its base classes. The namespace
+    of base classes without registered attributes is considered too.
+    """
+    names = set()
+    for base in cls.__mro__[1:]:
+        if "__attributes__" in base.__dict__:
+            names.update(base.__dict__["__attributes__"])
+        else:
+            names.update(base.__dict__)
+    names.update(cls.__dict__)
+
+    attributes = {}
+    for name in names:
+        attribute = getattr(cls, name, None)
+        if isinstance(attribute, Attribute):
+            attributes[name] = attribute
+
+    cls.__attributes__ = attributes
+    return attributes
+
+
 def get_attributes(cls):
     if "__attributes__" in cls.__dict__:
         return cls.__dict__["__attributes__"]
@@ -21,6 +21,11 @@ __all__ = [
     "Board",
     ]
 
+from heapq import nsmallest
+from operator import attrgetter
+
+from jiraban.attribute import AttributeType
+from jiraban.metrics import REGISTRY
 from jiraban.properties import (
     List,
     String,
@@ -60,10 +65,16 @@ PRIORITY_ORDER = [
     TRIVIAL,
     ]
 
+# Precomputed positions to avoid searching the orders when sorting.
+STATUS_INDEX = dict((s, i) for i, s in enumerate(STATUS_ORDER))
+PRIORITY_INDEX = dict((p, i) for i, p in enumerate(PRIORITY_ORDER))
+
 
 class Item:
     """An item represents a work item."""
 
+    __metaclass__ = AttributeType
+
     id = String(required=True)
     link = String(required=True)
     priority = String(required=True)
@@ -72,11 +83,13 @@ class Item:
     summary = Unicode(required=True)
     assignee = Unicode()
     username = String()
-    components = List()
-    fix_versions = List()
+    updated = String()
+    components = List(interned=True)
+    fix_versions = List(interned=True)
 
     def __init__(self, id, link, priority, status, project, summary,
-            assignee=None, username=None, components=None, fix_versions=None):
+            assignee=None, username=None, components=None, fix_versions=None,
+            updated=None):
         self.id = id
         self.link = link
         self.priority = priority
@@ -85,6 +98,7 @@ class Item:
         self.summary = summary
         self.assignee = assignee
         self.username = username
+        self.updated = updated
         self.components = components if components else []
         self.fix_versions = fix_versions if fix_versions else []
 
@@ -94,29 +108,28 @@ class Item:
         Items with a higher priority are sorted first. Items with the same
         priority are ordered by item number.
         """
-        priority_cmp = cmp(
-            PRIORITY_ORDER.index(self.priority),
-            PRIORITY_ORDER.index(other.priority))
-        if priority_cmp:
-            return priority_cmp
-
-        status_cmp = cmp(
-            STATUS_ORDER.index(self.status),
-            STATUS_ORDER.index(other.status))
-        if status_cmp:
-            return status_cmp
+        return cmp(self.sort_key, other.sort_key)
 
-        return cmp(self.id, other.id)
+    @property
+    def sort_key(self):
+        """Key to sort L{Item}s by priority, status and item number."""
+        return (
+            PRIORITY_INDEX[self.priority],
+            STATUS_INDEX[self.status],
+            self.id)
 
 
 class ItemCollection:
     """A named collecton of L{Item}s organized into categories.
 
+    Items are kept by identity, so they can be removed in constant time
+    and an item is only in the collection once.
+
     @param name: Name of the L{Item} collection.
     """
     def __init__(self, name):
         self.name = name
-        self._items = []
+        self._items = {}
 
     def __cmp__(self, other):
         """Compare two groups.
@@ -131,14 +144,56 @@ class ItemCollection:
         return cmp(self.name, other.name)
 
     def __iter__(self):
-        return iter(sorted(self._items))
+        return iter(sorted(
+            self._items.itervalues(), key=attrgetter("sort_key")))
 
     def __len__(self):
         return len(self._items)
 
     def add(self, item):
         """Add C{item} to this collection."""
-        self._items.append(item)
+        self._items[id(item)] = item
+
+    def remove(self, item):
+        """Remove C{item}, as it was added, from this collection."""
+        self._items.pop(id(item), None)
+
+    def count_by(self, *attributes):
+        """Count the L{Item}s by the value of each of C{attributes}.
+
+        All the attributes are counted in a single pass over the items.
+
+        @return: A dict of the counts by value for each attribute.
+        """
+        counts = [{} for attribute in attributes]
+        getters = zip(counts, [attrgetter(a) for a in attributes])
+        for item in self._items.itervalues():
+            for count, getter in getters:
+                value = getter(item)
+                count[value] = count.get(value, 0) + 1
+
+        return counts
+
+    def top(self, limit=None):
+        """Get the first C{limit} L{Item}s in sort order.
+
+        Only the selected L{Item}s are sorted, so this is cheaper than
+        iterating over the whole collection when C{limit} is small.
+
+        @param limit: Optional maximum number of L{Item}s, defaults to all.
+        """
+        if limit is None or limit >= len(self._items):
+            return list(self)
+
+        return nsmallest(
+            limit, self._items.itervalues(), key=attrgetter("sort_key"))
+
+    def count_more(self, limit=None):
+        """Count the L{Item}s left out by L{top} for the same C{limit}."""
+        if limit is None:
+            return 0
+
+        return max(len(self._items) - limit, 0)
 
 
 class GroupCollection:
@@ -163,28 +218,36 @@ class GroupCollection:
         for group in self._get_groups(item):
             group.add(item)
 
+    def remove(self, item):
+        """Remove C{item} from this group, dropping groups left empty."""
+        for name in self._get_names(item):
+            group = self._groups.get(name)
+            if group is not None:
+                group.remove(item)
+                if not len(group):
+                    del self._groups[name]
+
     def get(self, name):
         """Get an L{ItemCollection} by C{name}."""
         return self._groups.get(name, ItemCollection(name))
 
+    def _get_names(self, item):
+        """Get the names of the groups that C{item} is associated with."""
+        names = getattr(item, self._attribute)
+        if not names:
+            return [None]
+        if not isinstance(names, (list, tuple)):
+            return [names]
+        return names
+
     def _get_groups(self, item):
         """Get the L{Story}s that C{item} is associated with."""
-        names = getattr(item, self._attribute)
-        if names:
-            if not isinstance(names, list):
-                names = [names]
-            for name in names:
-                group = self._groups.get(name)
-                if group:
-                    yield group
-                else:
-                    group = self._factory(name)
-                    self._groups[name] = group
-                    yield group
-        else:
-            if None not in self._groups:
-                self._groups[None] = self._factory(None)
-            yield self._groups[None]
+        for name in self._get_names(item):
+            group = self._groups.get(name)
+            if group is None:
+                group = self._factory(name)
+                self._groups[name] = group
+            yield group
 
 
 class Category(ItemCollection):
@@ -214,6 +277,17 @@ class Story(ItemCollection):
         super(Story, self).add(item)
         self.categories.add(item)
 
+    def remove(self, item):
+        super(Story, self).remove(item)
+        self.categories.remove(item)
+
+
+# Metrics of the items on boards.
+ITEMS_ADDED = REGISTRY.counter(
+    "jiraban_board_items_added_total", "Items added to boards.")
+ITEMS_REMOVED = REGISTRY.counter(
+    "jiraban_board_items_removed_total", "Items removed from boards.")
+
 
 class Board(Story):
     """A board contains a collection of L{Item}s grouped into L{Story}s.
@@ -237,3 +311,10 @@ class Board(Story):
         super(Board, self).add(item)
         self.stories.add(item)
         self.identities.add(item)
+        ITEMS_ADDED.inc()
+
+    def remove(self, item):
+        super(Board, self).remove(item)
+        self.stories.remove(item)
+        self.identities.remove(item)
+        ITEMS_REMOVED.inc()
@@ -0,0 +1,155 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "BoardConfig",
+    "ConfigError",
+    "FORMATS",
+    "load_config",
+    ]
+
+import re
+
+from collections import namedtuple
+from ConfigParser import (
+    Error,
+    RawConfigParser,
+    )
+
+from jiraban.aggregates import parse_wip_limits
+from jiraban.attribute import get_attributes
+from jiraban.board import Item
+from jiraban.jira import filters_to_jql
+from jiraban.output import COMPRESSIONS
+
+
+class ConfigError(Exception):
+    """Error raised when a config file is invalid."""
+
+
+# Settings of a board declared in a config file.
+BoardConfig = namedtuple("BoardConfig", [
+    "name", "jql", "category", "story", "identity", "format", "output",
+    "limit", "search", "compact", "wip_limits", "compress"])
+
+# Prefix of the config sections declaring boards.
+BOARD_PREFIX = "board:"
+
+# Output formats of boards, also those of the runner.
+FORMATS = ["aggregates", "csv", "html", "json", "prometheus"]
+
+
+def load_config(path, **defaults):
+    """Load the boards declared in the config file at C{path}.
+
+    Each board is declared in a [board:NAME] section with these options,
+    which default to those of the [DEFAULT] section and then to
+    C{defaults}:
+
+      - jql, or assignee and component separated by commas: Filters.
+      - category, story and identity: Attributes to group items.
+      - format: One of aggregates, csv, html, json or prometheus.
+      - output: Path of the output file, required. Boards are written
+        at the same time, so this can't be the standard output.
+      - limit: Maximum number of items per cell.
+      - search and compact: Booleans, see the runner options.
+      - wip_limit: STATUS=COUNT limits separated by commas.
+      - compress: Compressions of the output separated by commas.
+
+    @return: A list of L{BoardConfig}s, in the order of the file.
+    """
+    parser = RawConfigParser()
+    try:
+        if not parser.read([path]):
+            raise ConfigError("Cannot read config file %s." % path)
+    except Error, e:
+        raise ConfigError(str(e))
+
+    boards = []
+    for section in parser.sections():
+        if not section.startswith(BOARD_PREFIX):
+            continue
+        try:
+            boards.append(create_board_config(parser, section, defaults))
+        except (Error, ValueError), e:
+            raise ConfigError("Invalid section [%s]: %s" % (section, e))
+
+    if not boards:
+        raise ConfigError("No [%sNAME] section in %s." % (BOARD_PREFIX, path))
+
+    return boards
+
+
+def create_board_config(parser, section, defaults):
+    """Create a L{BoardConfig} from a section of a config file."""
+
+    def get(option, getter=parser.get):
+        if parser.has_option(section, option):
+            return getter(section, option)
+        return defaults.get(option)
+
+    jql = filters_to_jql(
+        get("jql"), split_list(get("assignee")), split_list(get("component")))
+
+    attributes = get_attributes(Item)
+    for option in "category", "story", "identity":
+        if get(option) not in attributes:
+            raise ValueError("%s is not an attribute: %r" % (
+                option, get(option)))
+
+    format = get("format") or "html"
+    if format not in FORMATS:
+        raise ValueError("format must be one of %s" % ", ".join(FORMATS))
+
+    output = get("output")
+    if not output:
+        raise ValueError("output is required")
+    if output == "-":
+        raise ValueError("output cannot be the standard output")
+
+    limit = get("limit", parser.getint)
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+
+    if parser.has_option(section, "wip_limit"):
+        wip_limits = parse_wip_limits(
+            split_list(parser.get(section, "wip_limit")))
+    else:
+        wip_limits = defaults.get("wip_limits") or {}
+
+    compress = split_list(get("compress"))
+    for compression in compress:
+        if compression not in COMPRESSIONS:
+            raise ValueError("compress must be among %s" % ", ".join(
+                sorted(COMPRESSIONS)))
+
+    return BoardConfig(
+        section[len(BOARD_PREFIX):], jql, get("category"), get("story"),
+        get("identity"), format, output, limit,
+        bool(get("search", parser.getboolean)),
+        bool(get("compact", parser.getboolean)), wip_limits, compress)
+
+
+def split_list(value):
+    """Split a comma separated C{value} into a list, or pass lists along."""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+
+    return [v for v in re.split(r"\s*,\s*", value.strip()) if v]
@@ -0,0 +1,120 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "write_csv",
+    "write_json",
+    ]
+
+import csv
+import json
+
+# Unlike jiraban.html, nothing here depends on Jinja so exporting the
+# data of a board doesn't pay for loading the template engine.
+from jiraban.model import (
+    StringTable,
+    build_render_model,
+    )
+
+
+# Fields of each item, in the order of the CSV columns and compact rows.
+ITEM_FIELDS = ["id", "link", "priority", "status", "assignee", "summary"]
+
+
+def write_json(board, stream, cell_limit=None, compact=False):
+    """Write C{board} to C{stream} as JSON while it is serialized.
+
+    The document has the board name, link and count along with its
+    categories, stories and identities. Each story has a cell per
+    category with its count and items.
+
+    @param board: L{Board} to write.
+    @param stream: File object, or any object with a C{write} method.
+    @param cell_limit: Optional maximum number of items per cell.
+    @param compact: Whether to write items as lists of positions in a
+        table of strings, which is written last as C{strings}.
+    """
+    dumps = json.dumps
+    write = stream.write
+    model = build_render_model(board, cell_limit)
+    strings = StringTable() if compact else None
+
+    write('{"name": %s, "link": %s, "count": %d, "categories": %s' % (
+        dumps(model.name), dumps(model.link), model.count,
+        dumps([{"name": c.name, "count": c.count} for c in model.columns])))
+    write(', "identities": %s' % dumps(
+        [{"name": l.name, "count": l.count} for l in model.legends]))
+    if compact:
+        write(', "fields": %s' % dumps(ITEM_FIELDS))
+
+    write(', "stories": [')
+    for i, row in enumerate(model.rows):
+        if i:
+            write(", ")
+        write('{"name": %s, "count": %d, "cells": [' % (
+            dumps(row.name), row.count))
+        for j, (column, cell) in enumerate(zip(model.columns, row.cells)):
+            if j:
+                write(", ")
+            if compact:
+                items = [
+                    [strings.get(getattr(t, f)) for f in ITEM_FIELDS]
+                    for t in cell.tiles]
+            else:
+                items = [
+                    dict((f, getattr(t, f)) for f in ITEM_FIELDS)
+                    for t in cell.tiles]
+            write('{"category": %s, "count": %d, "items": %s}' % (
+                dumps(column.name), len(cell.tiles) + cell.more,
+                dumps(items)))
+        write("]}")
+    write("]")
+
+    if compact:
+        write(', "strings": %s' % dumps(strings.strings))
+    write("}\n")
+
+
+def write_csv(board, stream, cell_limit=None):
+    """Write C{board} to C{stream} as CSV, a row per item in each cell.
+
+    The first row names the columns: the story and category of the cell
+    followed by the fields of the item. Strings are encoded in UTF-8.
+
+    See L{write_json} for the arguments.
+    """
+    writer = csv.writer(stream)
+    writer.writerow(["story", "category"] + ITEM_FIELDS)
+
+    model = build_render_model(board, cell_limit)
+    for row in model.rows:
+        for column, cell in zip(model.columns, row.cells):
+            prefix = [encode(row.name), encode(column.name)]
+            writer.writerows(
+                prefix + [encode(getattr(t, f)) for f in ITEM_FIELDS]
+                for t in cell.tiles)
+
+
+def encode(value):
+    """Encode unicode C{value} into UTF-8 for the csv module."""
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    elif value is None:
+        return ""
+    else:
+        return value
@@ -17,74 +17,507 @@
 __metaclass__ = type
 
 __all__ = [
+    "FragmentCache",
+    "compile_templates",
+    "create_environment",
     "generate_html",
+    "get_environment",
+    "get_templates_stamp",
+    "get_variant_directory",
+    "is_compiled",
     "priority_style",
+    "render_html",
     "sprite_url",
     "status_style",
+    "write_html",
+    "write_site",
     ]
 
 import os
+import re
 
 from base64 import b64encode
 from datetime import datetime
+from hashlib import sha1
+from threading import Lock
 
 from jinja2 import (
+    __version__ as jinja2_version,
     Environment,
+    FileSystemBytecodeCache,
+    ModuleLoader,
     PackageLoader,
     )
+from jinja2.ext import Extension
 
-from jiraban.board import (
-    IN_PROGRESS,
-    PRIORITY_ORDER,
-    READY_FOR_QA,
-    READY_FOR_SPRINT,
-    STATUS_ORDER,
+from jiraban.metrics import (
+    CACHE_LOOKUPS,
+    REGISTRY,
     )
-from jiraban.colors import html_colors
-
+from jiraban.model import (
+    build_render_model,
+    priority_style,
+    status_style,
+    )
+from jiraban.output import AtomicFile
 
-def priority_style(priority):
-    """Filter a priority into a CSS class."""
-    return "priority-%s" % priority.lower()
 
+# Seconds to render boards, by output.
+RENDER_SECONDS = REGISTRY.histogram(
+    "jiraban_render_seconds",
+    "Seconds to render boards into HTML, by output.", ["output"])
 
-def status_style(status):
-    """Filter a status into a CSS class."""
-    if status in (IN_PROGRESS, READY_FOR_QA, READY_FOR_SPRINT):
-        return "status-inprogress"
 
-    return "status-%s" % status.lower()
+def get_sprite(sprite, jira):
+    """Get the content of the icon for a sprite name."""
+    return jira.read_icon(sprite.replace("-", "_"))
 
 
 def sprite_url(sprite, jira):
     """Filter a sprite name into a base64 encoded data url."""
     icon_ext = os.path.splitext(sprite)[1].lstrip(".")
-    content = jira.get_icon(sprite.replace("-", "_")).read()
+    content = get_sprite(sprite, jira)
     return "data:image/%s;base64,%s" % (icon_ext, b64encode(content))
 
 
-def generate_html(board, jira):
-    """Generate an HTML kanban board to represent L{Item}s."""
-    environment = Environment(loader=PackageLoader("jiraban", "templates"))
+class MinifyExtension(Extension):
+    """Strip the indentation and blank lines from template sources.
+
+    This is done once when templates are compiled, so minified templates
+    render as fast as the others.
+    """
+
+    _whitespace = re.compile(r"\n\s+")
+
+    def preprocess(self, source, name, filename=None):
+        return self._whitespace.sub("\n", source)
+
+
+def get_variant_directory(directory, minify=False):
+    """Get the subdirectory of C{directory} for templates compiled with
+    the given options.
+
+    Minified templates compile differently from the same sources, so
+    their bytecode and modules are kept apart from the others.
+    """
+    if minify:
+        return os.path.join(directory, "minify")
+    return os.path.join(directory, "plain")
+
+
+def create_environment(
+        cache_directory=None, compiled_directory=None, minify=False):
+    """Create an environment to render the board templates.
+
+    @param cache_directory: Optional directory to cache the bytecode of
+        compiled templates across processes.
+    @param compiled_directory: Optional directory of templates compiled
+        into Python modules by L{compile_templates}, used instead of the
+        package templates.
+    @param minify: Whether to strip whitespace from the templates.
+    """
+    if compiled_directory is not None:
+        loader = ModuleLoader(
+            get_variant_directory(compiled_directory, minify))
+    else:
+        loader = PackageLoader("jiraban", "templates")
 
-    # Filter identity names to unique colors.
-    names = [i.name for i in board.identities]
-    colors = html_colors(len(names))
-    names_to_colors = dict(zip(names, colors))
-    environment.filters["identity_color"] = lambda i: names_to_colors[i]
+    if cache_directory is not None:
+        cache_directory = get_variant_directory(cache_directory, minify)
+        if not os.path.isdir(cache_directory):
+            os.makedirs(cache_directory)
+        bytecode_cache = FileSystemBytecodeCache(cache_directory)
+    else:
+        bytecode_cache = None
 
-    # Filter images to sprites.
-    sprites = sorted(set(
-        [priority_style(p) for p in PRIORITY_ORDER] +
-        [status_style(s) for s in STATUS_ORDER]))
-    environment.filters["sprite_url"] = lambda s: sprite_url(s, jira)
+    if minify:
+        extensions = [MinifyExtension]
+    else:
+        extensions = []
 
-    # Filter priority and status names to CSS classes.
+    environment = Environment(
+        loader=loader, bytecode_cache=bytecode_cache, extensions=extensions,
+        trim_blocks=minify, lstrip_blocks=minify)
     environment.filters["priority_style"] = priority_style
     environment.filters["status_style"] = status_style
+    return environment
+
+
+# Environments created by get_environment, keyed by their arguments.
+_environments = {}
+_environments_lock = Lock()
+
+
+def get_environment(
+        cache_directory=None, compiled_directory=None, minify=False):
+    """Get a shared environment to render the board templates.
+
+    Environments are only created once per process for the same
+    arguments, so templates are only loaded and compiled once.
+    Templates in C{compiled_directory} are compiled first unless they
+    are up to date, see L{is_compiled}. See L{create_environment} for
+    the arguments.
+    """
+    key = (cache_directory, compiled_directory, minify)
+    with _environments_lock:
+        environment = _environments.get(key)
+        if environment is None:
+            if (compiled_directory is not None and
+                    not is_compiled(compiled_directory, minify)):
+                compile_templates(compiled_directory, minify)
+            environment = create_environment(*key)
+            _environments[key] = environment
+
+    return environment
+
+
+# Name of the file stamping compiled templates, see get_templates_stamp.
+STAMP_NAME = "templates.stamp"
+
+
+def get_templates_stamp(minify=False):
+    """Get a hash of the package template sources and compile options.
+
+    Compiled templates are stale when their stamp differs from this.
+    """
+    environment = create_environment(minify=minify)
+    digest = sha1("jinja2 %s, minify %s\n" % (jinja2_version, minify))
+    for name in environment.list_templates():
+        source = environment.loader.get_source(environment, name)[0]
+        digest.update("%s\n%s\n" % (
+            name.encode("utf-8"), source.encode("utf-8")))
+
+    return digest.hexdigest()
+
+
+def is_compiled(directory, minify=False):
+    """Whether the templates compiled in C{directory} are up to date."""
+    path = os.path.join(get_variant_directory(directory, minify), STAMP_NAME)
+    try:
+        with open(path) as f:
+            stamp = f.read().strip()
+    except IOError:
+        return False
+
+    return stamp == get_templates_stamp(minify)
+
+
+def compile_templates(directory, minify=False):
+    """Compile the package templates into Python modules in C{directory}.
+
+    The result can be loaded by passing the same C{directory} as the
+    C{compiled_directory} of an environment. Since templates are
+    minified when they are compiled, C{minify} must be given here, and
+    the modules are written to the subdirectory for that option. The
+    subdirectory is stamped with L{get_templates_stamp}.
+    """
+    target = get_variant_directory(directory, minify)
+    environment = create_environment(minify=minify)
+    environment.compile_templates(target, zip=None, py_compile=True)
+    # The stamp is written last, so failed compiles are done again.
+    with open(os.path.join(target, STAMP_NAME), "w") as f:
+        f.write(get_templates_stamp(minify) + "\n")
+
+
+class FragmentCache:
+    """Cache of rendered fragments keyed by a hash of their context.
+
+    Fragments are only kept from one render to the next, so the cache
+    holds at most the fragments of the last rendered board.
+    """
+
+    def __init__(self):
+        self._fragments = {}
+        self._next_fragments = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, environment, name, context):
+        """Get the key of a fragment from its template and C{context}."""
+        content = repr((id(environment), name, sorted(context.items())))
+        return sha1(content).digest()
+
+    def render(self, environment, name, context):
+        """Render the template C{name} with C{context}, unless cached."""
+        key = self.get_key(environment, name, context)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = self._next_fragments.get(key)
+        if fragment is None:
+            self.misses += 1
+            CACHE_LOOKUPS.labels("fragment", "miss").inc()
+            fragment = environment.get_template(name).render(**context)
+        else:
+            self.hits += 1
+            CACHE_LOOKUPS.labels("fragment", "hit").inc()
+        self._next_fragments[key] = fragment
+        return fragment
+
+    def rotate(self):
+        """Forget the fragments that were not rendered since last time."""
+        self._fragments = self._next_fragments
+        self._next_fragments = {}
+
+
+def render_fragments(environment, name, contexts, fragment_cache=None):
+    """Render the template C{name} once per context, lazily.
+
+    @param fragment_cache: Optional L{FragmentCache} to reuse fragments.
+    """
+    if fragment_cache is None:
+        template = environment.get_template(name)
+        for context in contexts:
+            yield template.render(**context)
+    else:
+        for context in contexts:
+            yield fragment_cache.render(environment, name, context)
+
+
+def render_board(
+        environment, model, rows=None, fragment_cache=None, **context):
+    """Render the board template for C{model} as unicode chunks.
+
+    @param rows: Optional L{Row}s to render, defaults to all of them.
+    @param fragment_cache: Optional L{FragmentCache} to reuse fragments.
+    @param context: Other variables for the template.
+    """
+    if rows is None:
+        rows = model.rows
+    has_stories = model.has_stories or len(rows) < len(model.rows)
+    if model.search_index is not None:
+        search_json = model.search_index.to_json()
+    else:
+        search_json = None
+
+    row_fragments = render_fragments(environment, "row.html", (
+        {"row": row, "cell_count": model.cell_count,
+         "has_stories": has_stories, "search": search_json is not None}
+        for row in rows), fragment_cache)
+    legend_fragments = render_fragments(environment, "legend.html", (
+        {"legend": legend, "cell_count": model.cell_count}
+        for legend in model.legends), fragment_cache)
 
     template = environment.get_template("board.html")
-    return template.render(
-        board=board,
-        sprites=sprites,
-        now=datetime.utcnow().strftime("%a %e %b at %H:%M UTC"))
+    for chunk in template.generate(
+            model=model, row_fragments=row_fragments,
+            legend_fragments=legend_fragments, search_json=search_json,
+            **context):
+        yield chunk
+
+    if fragment_cache is not None:
+        fragment_cache.rotate()
+
+
+def render_html(
+        board, jira, cell_limit=None, environment=None, fragment_cache=None,
+        color_map=None, search=False, stale=False):
+    """Render an HTML kanban board as an iterator of unicode chunks.
+
+    See L{generate_html} for the arguments.
+    """
+    if environment is None:
+        environment = get_environment()
+
+    model = build_render_model(board, cell_limit, color_map, search)
+    sprite_urls = [(s, sprite_url(s, jira)) for s in model.sprites]
+
+    return render_board(
+        environment, model, fragment_cache=fragment_cache,
+        sprite_urls=sprite_urls, now=format_now(), stale=stale)
+
+
+def generate_html(
+        board, jira, cell_limit=None, environment=None, fragment_cache=None,
+        color_map=None, search=False, stale=False):
+    """Generate an HTML kanban board to represent L{Item}s.
+
+    @param board: L{Board} to represent.
+    @param jira: L{JIRA} instance to get icons.
+    @param cell_limit: Optional maximum number of L{Item}s per cell.
+    @param environment: Optional environment to render the templates,
+        defaults to the shared one from L{get_environment}.
+    @param fragment_cache: Optional L{FragmentCache} to only render the
+        story rows and legends that changed since the last render.
+    @param color_map: Optional L{ColorMap} to keep the color of each
+        identity across renders, instead of coloring them by position.
+    @param search: Whether to embed an index of the tiles in the page,
+        with a script to filter them as a query is typed.
+    @param stale: Whether the board is an older one served because the
+        latest one couldn't be built in time, as noted in the footer.
+    """
+    with RENDER_SECONDS.labels("page").time():
+        return u"".join(render_html(
+            board, jira, cell_limit, environment, fragment_cache, color_map,
+            search, stale))
+
+
+def write_html(
+        board, jira, stream, cell_limit=None, environment=None,
+        fragment_cache=None, color_map=None, search=False, stale=False,
+        encoding="utf-8", buffer_size=65536):
+    """Write an HTML kanban board to C{stream} while it is rendered.
+
+    The page is encoded and written in chunks of about C{buffer_size}
+    bytes, so it is never held in memory as a whole.
+
+    @param stream: File object, or any object with a C{write} method.
+    @param encoding: Encoding of the written bytes.
+    @param buffer_size: Number of bytes to buffer before each write.
+    See L{generate_html} for the other arguments.
+    """
+    with RENDER_SECONDS.labels("page").time():
+        chunks = render_html(
+            board, jira, cell_limit, environment, fragment_cache,
+            color_map, search, stale)
+        write_chunks(chunks, stream, encoding, buffer_size)
+
+
+def write_site(
+        board, jira, directory, cell_limit=None, environment=None,
+        color_map=None, stale=False, encoding="utf-8"):
+    """Write an HTML kanban board as a static site in C{directory}.
+
+    The site has an index page of the stories and a page per story. The
+    stylesheet and icons are shared by all pages under an C{assets}
+    directory. Their names contain a hash of their content, so they can
+    be cached for as long as they exist.
+
+    Each file is replaced atomically, so readers never see a partial
+    page. The pages and assets left by earlier sites are then removed.
+
+    @return: The path of the index page.
+    See L{write_html} for the other arguments.
+    """
+    with RENDER_SECONDS.labels("site").time():
+        return _write_site(
+            board, jira, directory, cell_limit, environment, color_map,
+            stale, encoding)
+
+
+def _write_site(
+        board, jira, directory, cell_limit, environment, color_map, stale,
+        encoding):
+    if environment is None:
+        environment = get_environment()
+
+    assets_directory = os.path.join(directory, "assets")
+    if not os.path.isdir(assets_directory):
+        os.makedirs(assets_directory)
+
+    model = build_render_model(board, cell_limit, color_map)
+    assets = []
+    sprite_urls = []
+    for sprite in model.sprites:
+        content = get_sprite(sprite, jira)
+        filename = write_asset(assets_directory, "icon", ".gif", content)
+        assets.append(filename)
+        sprite_urls.append((sprite, filename))
+
+    template = environment.get_template("style.css")
+    content = template.render(model=model, sprite_urls=sprite_urls)
+    filename = write_asset(
+        assets_directory, "style", ".css", content.encode(encoding))
+    assets.append(filename)
+    stylesheet = "assets/%s" % filename
+
+    pages = get_story_pages(model.rows)
+    now = format_now()
+    for row, page in zip(model.rows, pages):
+        chunks = render_board(
+            environment, model, [row], stylesheet=stylesheet,
+            index="index.html", now=now, stale=stale)
+        write_page(os.path.join(directory, page), chunks, encoding)
+
+    template = environment.get_template("index.html")
+    index_path = os.path.join(directory, "index.html")
+    chunks = template.generate(
+        model=model, pages=zip(model.rows, pages),
+        stylesheet=stylesheet, now=now, stale=stale)
+    write_page(index_path, chunks, encoding)
+
+    remove_unused(directory, pages, "story-")
+    remove_unused(assets_directory, assets)
+
+    return index_path
+
+
+def write_page(path, chunks, encoding="utf-8"):
+    """Write the unicode C{chunks} of a page to C{path} atomically."""
+    atomic_file = AtomicFile(path)
+    try:
+        write_chunks(chunks, atomic_file, encoding)
+    except:
+        atomic_file.discard()
+        raise
+    atomic_file.commit()
+
+
+def remove_unused(directory, filenames, prefix=""):
+    """Remove the files in C{directory} not in C{filenames}.
+
+    Only the files starting with C{prefix} are removed, so files not
+    written by L{write_site} are left alone.
+    """
+    for filename in set(os.listdir(directory)) - set(filenames):
+        path = os.path.join(directory, filename)
+        if filename.startswith(prefix) and os.path.isfile(path):
+            os.unlink(path)
+
+
+def write_asset(directory, name, extension, content):
+    """Write an asset named after a hash of its C{content}.
+
+    @return: The filename of the asset in C{directory}.
+    """
+    filename = "%s-%s%s" % (name, sha1(content).hexdigest()[:12], extension)
+    path = os.path.join(directory, filename)
+    if not os.path.exists(path):
+        atomic_file = AtomicFile(path)
+        try:
+            atomic_file.write(content)
+        except:
+            atomic_file.discard()
+            raise
+        atomic_file.commit()
+
+    return filename
+
+
+def get_story_pages(rows):
+    """Get a unique page filename for each story L{Row}."""
+    pages = []
+    used = set()
+    for row in rows:
+        name = re.sub(r"[^a-z0-9]+", "-", (row.name or "").lower())
+        name = name.strip("-") or "uncategorized"
+        page = "story-%s.html" % name
+        suffix = 1
+        while page in used:
+            suffix += 1
+            page = "story-%s-%d.html" % (name, suffix)
+        used.add(page)
+        pages.append(page)
+
+    return pages
+
+
+def write_chunks(chunks, stream, encoding="utf-8", buffer_size=65536):
+    """Encode and write unicode C{chunks} to C{stream} with buffering."""
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        data = chunk.encode(encoding)
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= buffer_size:
+            stream.write("".join(buffer))
+            buffer = []
+            buffered = 0
+
+    if buffer:
+        stream.write("".join(buffer))
+
+
+def format_now():
+    """Format the current time for the footer of pages."""
+    return datetime.utcnow().strftime("%a %e %b at %H:%M UTC")
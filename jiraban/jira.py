@@ -19,15 +19,18 @@ __metaclass__ = type
 __all__ = [
     "JIRA",
     "JIRAError",
+    "filters_to_jql",
     "kwargs_to_jql",
     ]
 
 import os
 
-from requests import (
-    HTTPError,
-    Session,
+from contextlib import contextmanager
+from threading import (
+    Lock,
+    local,
     )
+from time import time
 from urllib import urlencode
 from urlparse import (
     urlparse,
@@ -40,6 +43,11 @@ except ImportError:
     import cElementTree as etree
 
 from jiraban.board import Item
+from jiraban.metrics import (
+    CACHE_LOOKUPS,
+    REGISTRY,
+    )
+from jiraban.timings import phase
 
 
 class JIRAError(Exception):
@@ -47,50 +55,184 @@ class JIRAError(Exception):
     pass
 
 
+# Seconds to wait for JIRA to connect or to send more data.
+DEFAULT_TIMEOUT = 30
+
+# Metrics of the requests to JIRA and of the items read.
+REQUESTS = REGISTRY.counter(
+    "jiraban_jira_requests_total",
+    "Requests to JIRA, by outcome.", ["outcome"])
+REQUEST_SECONDS = REGISTRY.histogram(
+    "jiraban_jira_request_seconds",
+    "Seconds to read the content of successful requests to JIRA.")
+RESPONSE_BYTES = REGISTRY.counter(
+    "jiraban_jira_response_bytes_total",
+    "Bytes of content read from JIRA.")
+ITEMS_PARSED = REGISTRY.counter(
+    "jiraban_jira_items_parsed_total",
+    "Items parsed from JIRA or from a cache.")
+
+
 class JIRALink:
+    """Link to content on JIRA.
+
+    @param get_session: Function returning the session to get the
+        content, only called when the content is read.
+    @param url: Url of the content.
+    @param timeout: Optional seconds to wait for the server to connect or
+        to send more data.
+    @param deadline: Optional time by which the content must be read.
+    @param timings: Optional L{Timings} to count the requests, bytes and
+        seconds spent reading.
+    """
 
-    def __init__(self, session, url):
-        self._session = session
+    def __init__(
+            self, get_session, url, timeout=None, deadline=None,
+            timings=None):
+        self._get_session = get_session
         self.url = url
+        self.timeout = timeout
+        self.deadline = deadline
+        self.timings = timings
 
     def read(self):
-        response = self._session.get(self.url)
+        from requests import RequestException
+
+        timeout = self.timeout
+        if self.deadline is not None:
+            remaining = self._get_remaining()
+            timeout = min(timeout, remaining) if timeout else remaining
+
+        start = time()
         try:
+            response = self._get_session().get(
+                self.url, timeout=timeout, stream=True)
             response.raise_for_status()
-        except HTTPError, e:
+            chunks = []
+            for chunk in response.iter_content(65536):
+                chunks.append(chunk)
+                if self.deadline is not None:
+                    self._get_remaining()
+        except RequestException, e:
+            REQUESTS.labels("error").inc()
             raise JIRAError("Failed to get %s: %s" % (self.url, e))
+        except JIRAError:
+            # The deadline was exceeded while reading.
+            REQUESTS.labels("error").inc()
+            raise
+
+        content = "".join(chunks)
+        seconds = time() - start
+        REQUESTS.labels("ok").inc()
+        REQUEST_SECONDS.observe(seconds)
+        RESPONSE_BYTES.inc(len(content))
+        if self.timings is not None:
+            self.timings.count("requests")
+            self.timings.count("bytes", len(content))
+            self.timings.count("request_seconds", seconds)
 
-        return response.raw.read()
+        return content
+
+    def _get_remaining(self):
+        remaining = self.deadline - time()
+        if remaining <= 0:
+            raise JIRAError("Deadline exceeded getting %s" % self.url)
+
+        return remaining
 
 
 class JIRA:
 
     def __init__(
             self, server, username=None, password=None, verify=True,
-            session_factory=Session):
+            session_factory=None, timeout=DEFAULT_TIMEOUT, timings=None):
         # Rip off trailing slash since all urls depend on that.
         self.server = server.rstrip("/")
-
-        self._session = session_factory()
-        self._session.verify = verify
-        self._session.auth = (username, password)
+        self.timeout = timeout
+        self.timings = timings
+        self._local = local()
+        self._icons = {}
+
+        self._username = username
+        self._password = password
+        self._verify = verify
+        self._session_factory = session_factory
+        self._session_lock = Lock()
+        self._created_session = None
+
+    def _get_session(self):
+        """Get the session to JIRA, only created when first needed.
+
+        Defaults to a requests C{Session}, which is only imported then.
+        """
+        with self._session_lock:
+            if self._created_session is None:
+                session_factory = self._session_factory
+                if session_factory is None:
+                    # Imported here since requests is slow to import and
+                    # not needed to read a cache.
+                    from requests import Session as session_factory
+                session = session_factory()
+                session.verify = self._verify
+                session.auth = (self._username, self._password)
+                self._created_session = session
+
+        return self._created_session
 
     def get_link(self, path, query=""):
         base_url = urlparse(self.server)
-        qs = urlencode(query)
+        qs = urlencode(query, True)
         url = urlunparse(
             (base_url.scheme, base_url.netloc, path, None, qs, None))
-        return JIRALink(self._session, url)
+        deadline = getattr(self._local, "deadline", None)
+        return JIRALink(
+            self._get_session, url, self.timeout, deadline, self.timings)
+
+    @contextmanager
+    def time_limit(self, seconds):
+        """Limit the requests within this context to C{seconds} in total.
+
+        Requests past the limit raise a L{JIRAError}. The limit only
+        applies to the current thread, and there is none when C{seconds}
+        is C{None}. Within an outer limit, the earlier deadline applies,
+        and the outer one is restored on exit.
+        """
+        previous = getattr(self._local, "deadline", None)
+        if seconds is not None:
+            deadline = time() + seconds
+            if previous is not None:
+                deadline = min(deadline, previous)
+            self._local.deadline = deadline
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
 
     def get_icon(self, icon):
         return self.get_link("/images/icons/%s.gif" % icon)
 
-    def query_xml(self, jql, temp_max=1000):
+    def read_icon(self, icon):
+        """Read the content of an icon, only getting it once."""
+        content = self._icons.get(icon)
+        if content is None:
+            CACHE_LOOKUPS.labels("icon", "miss").inc()
+            content = self._icons[icon] = self.get_icon(icon).read()
+        else:
+            CACHE_LOOKUPS.labels("icon", "hit").inc()
+
+        return content
+
+    def query_xml(self, jql, temp_max=1000, fields=None):
+        query = {
+            "jqlQuery": jql,
+            "tempMax": temp_max,
+            }
+        if fields:
+            query["field"] = fields
+
         return self.get_link(
-            "/sr/jira.issueviews:searchrequest-xml/temp/SearchRequest.xml", {
-                "jqlQuery": jql,
-                "tempMax": temp_max,
-                })
+            "/sr/jira.issueviews:searchrequest-xml/temp/SearchRequest.xml",
+            query)
 
     def query_html(self, jql, run_query=True, clear=True):
         return self.get_link("/secure/IssueNavigator!executeAdvanced.jspa", {
@@ -102,22 +244,64 @@ class JIRA:
     def iter_items(self, jql, cache=None):
         xml_link = self.query_xml(jql)
 
-        if cache and os.path.exists(cache):
-            with open(cache) as f:
-                content = f.read()
+        with phase(self.timings, "fetch"):
+            if cache and os.path.exists(cache):
+                CACHE_LOOKUPS.labels("file", "hit").inc()
+                with open(cache) as f:
+                    content = f.read()
+            else:
+                if cache:
+                    CACHE_LOOKUPS.labels("file", "miss").inc()
+                content = xml_link.read()
+                if cache:
+                    with open(cache, "w") as f:
+                        f.write(content)
+
+        with phase(self.timings, "parse"):
+            elements = self._parse_items(content)
+        ITEMS_PARSED.inc(len(elements))
+
+        if self.timings is None:
+            for element in elements:
+                yield self._create_item(element)
         else:
-            content = xml_link.read()
-            if cache:
-                with open(cache, "w") as f:
-                    f.write(content)
-
+            # Items are created before the first is yielded, so the phase
+            # excludes the time of the caller.
+            with self.timings.phase("items"):
+                items = [self._create_item(element) for element in elements]
+            for item in items:
+                yield item
+
+    def iter_items_by_key(self, keys, batch_size=100):
+        """Iterate over the items of the given C{keys}.
+
+        Keys are queried in batches of C{batch_size} to keep urls short.
+        """
+        for i in range(0, len(keys), batch_size):
+            jql = "key in (%s)" % ", ".join(keys[i:i + batch_size])
+            for item in self.iter_items(jql):
+                yield item
+
+    def iter_updates(self, jql):
+        """Iterate over the key and update time of the items of C{jql}.
+
+        Only these fields are requested, so this is much lighter than
+        L{iter_items} to find which items changed.
+        """
+        with phase(self.timings, "fetch"):
+            content = self.query_xml(jql, fields=["key", "updated"]).read()
+        with phase(self.timings, "parse"):
+            elements = self._parse_items(content)
+        for element in elements:
+            yield element.findtext("key"), element.findtext("updated")
+
+    def _parse_items(self, content):
         try:
             root = etree.fromstring(content)
         except etree.ParseError, e:
             raise JIRAError(e)
 
-        for element in root.findall(".//item"):
-            yield self._create_item(element)
+        return root.findall(".//item")
 
     def _create_item(self, element):
         return Item(
@@ -130,7 +314,8 @@ class JIRA:
             element.find("assignee").text,
             element.find("assignee").get("username"),
             components=[c.text for c in element.findall("component")],
-            fix_versions=[c.text for c in element.findall("fixVersion")])
+            fix_versions=[c.text for c in element.findall("fixVersion")],
+            updated=element.findtext("updated"))
 
 
 def jql_quote(string):
@@ -160,3 +345,24 @@ def kwargs_to_jql(**kwargs):
             parts.append("(%s)" % " OR ".join(subparts))
 
     return " AND ".join(parts)
+
+
+def filters_to_jql(jql=None, assignees=(), components=()):
+    """Convert the filters of a board into a JQL string.
+
+    Without any filter, the unresolved items of the current user are
+    selected. A C{ValueError} is raised when C{jql} is given along with
+    other filters.
+    """
+    if jql:
+        if assignees or components:
+            raise ValueError("Cannot use JQL with assignee or component")
+        return jql
+
+    if not assignees and not components:
+        assignees = "currentUser()"
+
+    return kwargs_to_jql(
+        resolution="unresolved",
+        assignee=assignees,
+        component=components)
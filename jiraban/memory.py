@@ -0,0 +1,194 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "MemoryReport",
+    "count_memberships",
+    ]
+
+import os
+import sys
+
+from threading import Lock
+
+from jiraban.timings import PHASES
+
+# The tracemalloc module only comes with Python 3.4 and later, or with
+# the pytracemalloc backport on a patched Python 2.7. Without it, the
+# memory of the process is read from the system instead.
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def get_rss():
+    """Get the resident memory of the process in bytes, if known."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (IOError, IndexError, ValueError):
+        return None
+
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def get_max_rss():
+    """Get the peak resident memory of the process in bytes, if known."""
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux counts kilobytes where Mac OS X counts bytes.
+    if sys.platform == "darwin":
+        return max_rss
+    return max_rss * 1024
+
+
+def count_memberships(board):
+    """Count the memberships of the items in the groups of C{board}.
+
+    Each item is a member of the board, of a category of the board, of
+    an identity, and of a story and a category of that story for each
+    of its stories.
+    """
+    count = len(board)
+    for groups in board.categories, board.identities:
+        count += sum(len(group) for group in groups)
+    for story in board.stories:
+        count += len(story) + sum(len(c) for c in story.categories)
+
+    return count
+
+
+class MemoryReport:
+    """Memory of the process at the end of each phase of a run.
+
+    With C{tracemalloc}, the memory is that of the Python allocations
+    and the report includes the top allocation sites. Otherwise, the
+    memory is the resident memory of the process, which is coarser
+    since freed memory isn't always given back to the system.
+
+    Phases are recorded by L{Timings}. Their memory delta includes that
+    of the phases nested in them.
+
+    @param frames: Number of frames of the allocation sites to keep.
+    """
+
+    def __init__(self, frames=1):
+        self.tracing = tracemalloc is not None
+        if self.tracing and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.phases = {}
+        self._lock = Lock()
+
+    def get_memory(self):
+        """Get the current and peak memory in bytes, or C{None}."""
+        if self.tracing:
+            return tracemalloc.get_traced_memory()
+
+        # Some systems lag behind in updating the peak, which is at least
+        # the current memory anyway.
+        current, peak = get_rss(), get_max_rss()
+        return current, max(current, peak)
+
+    def record(self, name, start):
+        """Record the memory at the end of the phase C{name}.
+
+        @param start: Current memory at the start of the phase.
+        """
+        current, peak = self.get_memory()
+        with self._lock:
+            totals = self.phases.setdefault(name, [0, None, None])
+            if current is not None and start is not None:
+                totals[0] += current - start
+            totals[1] = current
+            totals[2] = max(totals[2], peak)
+
+    def get_peak(self):
+        """Get the peak memory in bytes, or C{None}."""
+        return self.get_memory()[1]
+
+    def get_top_sites(self, limit=10):
+        """Get the sites holding the most memory, with C{tracemalloc}.
+
+        @return: A list of C{(site, size, count)} tuples, empty without
+            C{tracemalloc}.
+        """
+        if not self.tracing:
+            return []
+
+        statistics = tracemalloc.take_snapshot().statistics("lineno")
+        return [
+            (str(statistic.traceback), statistic.size, statistic.count)
+            for statistic in statistics[:limit]]
+
+    def write_report(self, stream, board=None, top=10):
+        """Write the report of the memory of each phase to C{stream}.
+
+        @param board: Optional L{Board} built during the run, to report
+            the bytes per item and per group membership.
+        @param top: Number of allocation sites to report.
+        """
+        if self.tracing:
+            stream.write("Memory of Python allocations:\n")
+        else:
+            stream.write("Resident memory, without tracemalloc:\n")
+
+        stream.write("%-10s %12s %12s %12s\n" % (
+            "phase", "delta (KiB)", "after (KiB)", "peak (KiB)"))
+        for name in self.get_names():
+            delta, after, peak = self.phases[name]
+            stream.write("%-10s %12s %12s %12s\n" % (
+                name, format_kib(delta), format_kib(after),
+                format_kib(peak)))
+        stream.write("Peak: %s KiB\n" % format_kib(self.get_peak()))
+
+        if board is not None and len(board):
+            items = self.phases.get("items", [None])[0]
+            if items is not None:
+                stream.write("Bytes per item: %d\n" % (items / len(board)))
+            memberships = self.phases.get("board", [None])[0]
+            if memberships is not None:
+                stream.write("Bytes per group membership: %d\n" % (
+                    memberships / count_memberships(board)))
+
+        sites = self.get_top_sites(top)
+        if sites:
+            stream.write("Top allocation sites:\n")
+        for site, size, count in sites:
+            stream.write("  %-50s %10s KiB %8d blocks\n" % (
+                site, format_kib(size), count))
+
+    def get_names(self):
+        """Get the names of the phases, in the order they happen."""
+        return ([n for n in PHASES if n in self.phases] +
+            sorted(n for n in self.phases if n not in PHASES))
+
+
+def format_kib(size):
+    """Format a size in bytes as kibibytes, or a dash when unknown."""
+    if size is None:
+        return "-"
+
+    return "%d" % (size / 1024)
@@ -0,0 +1,309 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "CACHE_LOOKUPS",
+    "REGISTRY",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "PrometheusTextfile",
+    "Registry",
+    "format_prometheus",
+    ]
+
+import time
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+
+from jiraban.output import AtomicFile
+
+
+# Upper bounds of the default histogram buckets, in seconds.
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Metric:
+    """Metric with a value per combination of label values.
+
+    Metrics without labels have a single value, updated directly on the
+    metric. Metrics with labels are updated on the child returned by
+    L{labels}.
+
+    @param name: Name of the metric, as exported.
+    @param help: Description of the metric.
+    @param label_names: Optional names of the labels of the metric.
+    """
+
+    type = None
+
+    def __init__(self, name, help, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._lock = Lock()
+        self._children = {}
+        if not self.label_names:
+            self._default = self.labels()
+
+    def labels(self, *values):
+        """Get the child of the metric for the label C{values}."""
+        if len(values) != len(self.label_names):
+            raise ValueError("Expected %d label values for %s" % (
+                len(self.label_names), self.name))
+
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self.create_child())
+        return child
+
+    def create_child(self):
+        """Create the value of a combination of label values."""
+        raise NotImplementedError()
+
+    def get_samples(self):
+        """Get the samples of each child, as exported.
+
+        @return: List of C{(suffix, labels, value)} tuples, where labels
+            is a list of C{(name, value)} tuples.
+        """
+        samples = []
+        for values, child in sorted(self._children.items()):
+            labels = zip(self.label_names, values)
+            for suffix, extra_labels, value in child.get_samples():
+                samples.append((suffix, labels + extra_labels, value))
+        return samples
+
+
+class CounterValue:
+
+    def __init__(self):
+        self._lock = Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def get_samples(self):
+        return [("", [], self.value)]
+
+
+class Counter(Metric):
+    """Metric that only goes up, like a number of requests.
+
+    By convention, the names of counters end with C{_total}.
+    """
+
+    type = "counter"
+
+    def create_child(self):
+        return CounterValue()
+
+    def inc(self, amount=1):
+        """Increase the counter by C{amount}."""
+        self._default.inc(amount)
+
+
+class GaugeValue:
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def get_samples(self):
+        return [("", [], self.value)]
+
+
+class Gauge(Metric):
+    """Metric that goes up and down, like the number of items."""
+
+    type = "gauge"
+
+    def create_child(self):
+        return GaugeValue()
+
+    def set(self, value):
+        """Set the gauge to C{value}."""
+        self._default.set(value)
+
+
+class HistogramValue:
+
+    def __init__(self, buckets):
+        self._lock = Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(time.time() - start)
+
+    def get_samples(self):
+        samples = []
+        count = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            count += bucket_count
+            samples.append(("_bucket", [("le", format_value(bound))], count))
+        count += self.counts[-1]
+        samples.append(("_bucket", [("le", "+Inf")], count))
+        samples.append(("_sum", [], self.sum))
+        samples.append(("_count", [], count))
+        return samples
+
+
+class Histogram(Metric):
+    """Metric counting observations in buckets, like request latencies.
+
+    @param buckets: Optional sorted upper bounds of the buckets, defaults
+        to L{DEFAULT_BUCKETS}.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, help, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super(Histogram, self).__init__(name, help, label_names)
+
+    def create_child(self):
+        return HistogramValue(self.buckets)
+
+    def observe(self, value):
+        """Count an observation of C{value}."""
+        self._default.observe(value)
+
+    def time(self):
+        """Observe the seconds spent within this context."""
+        return self._default.time()
+
+
+class Registry:
+    """Metrics to export together."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        """Register C{metric}, unless one is already registered by name.
+
+        @return: The registered metric of the same name.
+        """
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, label_names=()):
+        """Register a L{Counter}."""
+        return self.register(Counter(name, help, label_names))
+
+    def gauge(self, name, help, label_names=()):
+        """Register a L{Gauge}."""
+        return self.register(Gauge(name, help, label_names))
+
+    def histogram(self, name, help, label_names=(), buckets=DEFAULT_BUCKETS):
+        """Register a L{Histogram}."""
+        return self.register(Histogram(name, help, label_names, buckets))
+
+    def get_metrics(self):
+        """Get the registered metrics, sorted by name."""
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+
+# Registry of the metrics reported by jiraban.
+REGISTRY = Registry()
+
+# Lookups in the caches of jiraban, shared by the modules with a cache.
+CACHE_LOOKUPS = REGISTRY.counter(
+    "jiraban_cache_lookups_total",
+    "Lookups in caches, by cache and result.", ["cache", "result"])
+
+
+def format_value(value):
+    """Format a sample value as in the Prometheus text format."""
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return "%d.0" % value
+
+    return repr(value)
+
+
+def escape_label(value):
+    """Escape a label value as in the Prometheus text format."""
+    return (unicode(value).replace("\\", "\\\\").replace("\n", "\\n")
+        .replace('"', '\\"'))
+
+
+def format_prometheus(registry):
+    """Format the metrics of C{registry} in the Prometheus text format."""
+    lines = []
+    for metric in registry.get_metrics():
+        lines.append("# HELP %s %s" % (metric.name, metric.help))
+        lines.append("# TYPE %s %s" % (metric.name, metric.type))
+        for suffix, labels, value in metric.get_samples():
+            if labels:
+                label_text = "{%s}" % ",".join(
+                    '%s="%s"' % (name, escape_label(label_value))
+                    for name, label_value in labels)
+            else:
+                label_text = ""
+            lines.append("%s%s%s %s" % (
+                metric.name, suffix, label_text, format_value(value)))
+
+    return u"\n".join(lines + [u""])
+
+
+class PrometheusTextfile:
+    """Sink writing metrics to a file in the Prometheus text format.
+
+    The file is replaced atomically, so it can be collected by the
+    textfile collector of node_exporter at any time. That collector only
+    reads files ending with C{.prom}.
+
+    @param path: Path of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, registry):
+        """Write the metrics of C{registry} to the file."""
+        atomic_file = AtomicFile(self.path)
+        try:
+            atomic_file.write(format_prometheus(registry).encode("utf-8"))
+        except:
+            atomic_file.discard()
+            raise
+        atomic_file.commit()
@@ -0,0 +1,233 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "Cell",
+    "Column",
+    "IdentityStyle",
+    "Legend",
+    "RenderModel",
+    "Row",
+    "SearchIndex",
+    "StringTable",
+    "Tile",
+    "build_render_model",
+    "priority_style",
+    "status_style",
+    ]
+
+import json
+import re
+
+from collections import namedtuple
+
+from jiraban.board import (
+    IN_PROGRESS,
+    PRIORITY_ORDER,
+    READY_FOR_QA,
+    READY_FOR_SPRINT,
+    STATUS_ORDER,
+    )
+from jiraban.palette import palette_colors
+
+
+# Plain records of everything templates need to render a board, so that
+# rendering only iterates over them.
+RenderModel = namedtuple("RenderModel", [
+    "name", "link", "count", "cell_count", "columns", "rows", "legends",
+    "identity_styles", "sprites", "has_stories", "search_index"])
+Row = namedtuple("Row", ["name", "count", "cells"])
+Cell = namedtuple("Cell", ["position", "tiles", "more"])
+Tile = namedtuple("Tile", [
+    "id", "link", "summary", "assignee", "identity_class", "priority",
+    "priority_class", "status", "status_class"])
+Legend = namedtuple("Legend", ["name", "count", "color", "identity_class"])
+IdentityStyle = namedtuple("IdentityStyle", ["identity_class", "color"])
+Column = namedtuple("Column", ["name", "count", "position"])
+
+
+def priority_style(priority):
+    """Filter a priority into a CSS class."""
+    return "priority-%s" % priority.lower()
+
+
+def status_style(status):
+    """Filter a status into a CSS class."""
+    if status in (IN_PROGRESS, READY_FOR_QA, READY_FOR_SPRINT):
+        return "status-inprogress"
+
+    return "status-%s" % status.lower()
+
+
+# CSS classes are computed once, since there are only a few of them.
+PRIORITY_STYLES = dict((p, priority_style(p)) for p in PRIORITY_ORDER)
+STATUS_STYLES = dict((s, status_style(s)) for s in STATUS_ORDER)
+SPRITES = sorted(set(PRIORITY_STYLES.values() + STATUS_STYLES.values()))
+
+
+def build_render_model(board, cell_limit=None, color_map=None, search=False):
+    """Build a L{RenderModel} of C{board}.
+
+    Attributes of each L{Item} are read once and resolved into colors and
+    CSS classes, so templates don't need to call back into the board.
+
+    @param board: L{Board} to represent.
+    @param cell_limit: Optional maximum number of L{Item}s per cell.
+    @param color_map: Optional L{ColorMap} to get the color of each
+        identity, instead of coloring them by position.
+    @param search: Whether to build a L{SearchIndex} of the tiles, as
+        C{search_index}, to filter them in the page.
+    """
+    identities = list(board.identities)
+    names = [i.name for i in identities]
+    if color_map is None:
+        colors = dict(zip(names, palette_colors(len(names))))
+    else:
+        colors = dict((name, color_map.get(name)) for name in names)
+    identity_styles, identity_classes = build_identity_styles(colors)
+    columns = [
+        Column(c.name, len(c), i * 2)
+        for i, c in enumerate(board.categories)]
+
+    rows = []
+    tiles = {}
+    search_index = SearchIndex() if search else None
+    for story in board.stories:
+        cells = []
+        for column in columns:
+            cell = story.categories.get(column.name)
+            cell_tiles = []
+            for item in cell.top(cell_limit):
+                tile = tiles.get(item.id)
+                if tile is None:
+                    tile = tiles[item.id] = create_tile(
+                        item, identity_classes)
+                    if search_index is not None:
+                        search_index.add(tile)
+                cell_tiles.append(tile)
+            cells.append(Cell(
+                column.position, cell_tiles, cell.count_more(cell_limit)))
+        rows.append(Row(story.name, len(story), cells))
+
+    legends = [
+        Legend(i.name, len(i), colors[i.name], identity_classes[i.name])
+        for i in identities]
+
+    return RenderModel(
+        board.name, board.link, len(board), len(columns) * 2,
+        columns, rows, legends, identity_styles, SPRITES, len(rows) > 1,
+        search_index)
+
+
+def build_identity_styles(colors):
+    """Build the CSS classes of identities from their C{colors}.
+
+    Identities with the same color share the same class, so each color is
+    only declared once in the stylesheet.
+
+    @param colors: Dict of identity names to colors.
+    @return: A list of L{IdentityStyle}s and a dict of identity names to
+        CSS classes.
+    """
+    styles = []
+    color_styles = {}
+    identity_classes = {}
+    for name, color in sorted(colors.items()):
+        style = color_styles.get(color)
+        if style is None:
+            style = IdentityStyle("identity-%d" % len(styles), color)
+            styles.append(style)
+            color_styles[color] = style
+        identity_classes[name] = style.identity_class
+
+    return styles, identity_classes
+
+
+def create_tile(item, identity_classes):
+    """Create a L{Tile} for C{item} with the given C{identity_classes}."""
+    priority = item.priority
+    status = item.status
+    assignee = item.assignee
+    return Tile(
+        item.id, item.link, item.summary, assignee,
+        identity_classes.get(assignee),
+        priority, PRIORITY_STYLES.get(priority) or priority_style(priority),
+        status, STATUS_STYLES.get(status) or status_style(status))
+
+
+class StringTable:
+    """Table of unique strings referenced by their position."""
+
+    def __init__(self):
+        self.strings = []
+        self._positions = {}
+
+    def get(self, string):
+        """Get the position of C{string}, adding it when it's new."""
+        position = self._positions.get(string)
+        if position is None:
+            position = self._positions[string] = len(self.strings)
+            self.strings.append(string)
+
+        return position
+
+
+class SearchIndex:
+    """Compact index of tiles to filter them in the page.
+
+    Tiles are referenced by their position in C{ids}. The assignee,
+    status and priority of each tile are positions in tables of strings,
+    and the terms of summaries are an inverted index to the tiles with
+    that term.
+    """
+
+    _terms = re.compile(r"\w\w+", re.UNICODE)
+
+    def __init__(self):
+        self.ids = []
+        self.items = []
+        self.terms = {}
+        self.assignees = StringTable()
+        self.statuses = StringTable()
+        self.priorities = StringTable()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, tile):
+        """Add a L{Tile} to the index."""
+        position = len(self.ids)
+        self.ids.append(tile.id)
+        self.items.append([
+            self.assignees.get(tile.assignee),
+            self.statuses.get(tile.status),
+            self.priorities.get(tile.priority)])
+        for term in set(self._terms.findall((tile.summary or u"").lower())):
+            self.terms.setdefault(term, []).append(position)
+
+    def to_json(self):
+        """Serialize the index to compact JSON, safe in a script element."""
+        content = json.dumps({
+            "ids": self.ids,
+            "items": self.items,
+            "terms": self.terms,
+            "assignees": self.assignees.strings,
+            "statuses": self.statuses.strings,
+            "priorities": self.priorities.strings,
+            }, separators=(",", ":"), sort_keys=True)
+        return content.replace("</", "<\\/")
@@ -0,0 +1,177 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "AtomicFile",
+    "COMPRESSIONS",
+    "CompressedStream",
+    "OutputFiles",
+    "UMASK",
+    "get_umask",
+    ]
+
+import bz2
+import gzip
+import os
+import tempfile
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+
+def get_umask():
+    """Get the umask of the process, which can only be read by setting it."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Umask of the process, read once on import since reading it briefly
+# changes it for all threads.
+UMASK = get_umask()
+
+
+class AtomicFile:
+    """File that only replaces its path once it is completely written.
+
+    Content is written to a temporary file in the same directory, which
+    is renamed over the path on L{commit}. Readers see either the old or
+    the new file, never a partial one.
+
+    @param path: Path of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory, name = os.path.split(os.path.abspath(path))
+        fd, self._temp_path = tempfile.mkstemp(
+            prefix=".%s." % name, dir=directory)
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data):
+        self._file.write(data)
+
+    def commit(self):
+        """Close the file and replace the path with it."""
+        self._file.close()
+        os.chmod(self._temp_path, 0666 & ~UMASK)
+        os.rename(self._temp_path, self.path)
+
+    def discard(self):
+        """Close and remove the file, leaving the path untouched."""
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.unlink(self._temp_path)
+
+
+class CompressedStream:
+    """Stream compressing the data written to another stream.
+
+    @param stream: Stream to write compressed data.
+    @param compressor: Object with the C{compress} and C{flush} methods
+        of the compressors in the standard library.
+    """
+
+    def __init__(self, stream, compressor):
+        self._stream = stream
+        self._compressor = compressor
+
+    def write(self, data):
+        compressed = self._compressor.compress(data)
+        if compressed:
+            self._stream.write(compressed)
+
+    def close(self):
+        self._stream.write(self._compressor.flush())
+
+
+def gzip_stream(stream):
+    # The timestamp is left out so that the same content always gives the
+    # same compressed file.
+    return gzip.GzipFile(
+        filename="", mode="wb", compresslevel=9, fileobj=stream, mtime=0)
+
+
+def bz2_stream(stream):
+    return CompressedStream(stream, bz2.BZ2Compressor(9))
+
+
+def xz_stream(stream):
+    return CompressedStream(
+        stream, lzma.LZMACompressor(preset=9 | lzma.PRESET_EXTREME))
+
+
+# Available compressions as a dict of names to a file extension and a
+# function to wrap a stream.
+COMPRESSIONS = {
+    "bz2": (".bz2", bz2_stream),
+    "gzip": (".gz", gzip_stream),
+    }
+if lzma is not None:
+    COMPRESSIONS["xz"] = (".xz", xz_stream)
+
+
+class OutputFiles:
+    """Output file along with compressed copies, written atomically.
+
+    Data written to the output is compressed as it goes, so the content
+    only needs to be produced once. Use as a context manager: the files
+    are committed together when the block succeeds, and discarded
+    otherwise.
+
+    @param path: Path of the uncompressed file.
+    @param compressions: Names of L{COMPRESSIONS} to also write, each to
+        the path followed by the extension of the compression.
+    """
+
+    def __init__(self, path, compressions=()):
+        self.path = path
+        self._files = [AtomicFile(path)]
+        self._streams = [self._files[0]]
+        for compression in compressions:
+            extension, stream_factory = COMPRESSIONS[compression]
+            atomic_file = AtomicFile(path + extension)
+            self._files.append(atomic_file)
+            self._streams.append(stream_factory(atomic_file))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+    def write(self, data):
+        for stream in self._streams:
+            stream.write(data)
+
+    def commit(self):
+        """Finish compressing and replace all the paths."""
+        for stream in self._streams[1:]:
+            stream.close()
+        for atomic_file in self._files:
+            atomic_file.commit()
+
+    def discard(self):
+        """Remove all the files, leaving the paths untouched."""
+        for atomic_file in self._files:
+            atomic_file.discard()
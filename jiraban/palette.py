@@ -0,0 +1,168 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "ColorMap",
+    "get_palette",
+    "palette_colors",
+    ]
+
+import json
+import os
+
+from colorsys import hsv_to_rgb
+from threading import Lock
+
+from jiraban.output import AtomicFile
+
+
+# Saturation and value of each tier of colors in the palette. The first
+# tier is the same as jiraban.colors, the others are only used by boards
+# with more identities than hues that can be told apart.
+TIERS = [(0.2, 0.9), (0.4, 0.9), (0.2, 0.75), (0.4, 0.75), (0.6, 0.9)]
+
+# Number of hues per tier, beyond which 8 bit colors start to repeat.
+HUES = 256
+
+# Lookup table of the palette, computed on first use.
+_palette = None
+_palette_lock = Lock()
+
+
+def palette_hue(index):
+    """Return the hue of the color at C{index} in a tier of the palette.
+
+    Hues are the same as L{jiraban.colors.iter_fractions}, each one
+    halving the largest gap left between the previous ones, computed
+    directly from the index with float arithmetic:
+    [0.0, 0.5, 0.25, 0.75, 0.125, ...]
+    """
+    if index == 0:
+        return 0.0
+
+    bits = index.bit_length()
+    numerator = 2 * (index - (1 << (bits - 1))) + 1
+    return numerator / float(1 << bits)
+
+
+def html_color(h, s, v):
+    """Return an HSV color of floats as an HTML string."""
+    return "#" + "".join(["%02x" % int(c * 255) for c in hsv_to_rgb(h, s, v)])
+
+
+def get_palette():
+    """Get the lookup table of all the distinct colors of the palette.
+
+    The table is built once, then shared by all threads.
+    """
+    global _palette
+
+    if _palette is None:
+        with _palette_lock:
+            if _palette is None:
+                palette = []
+                seen = set()
+                for s, v in TIERS:
+                    for index in range(HUES):
+                        color = html_color(palette_hue(index), s, v)
+                        if color not in seen:
+                            seen.add(color)
+                            palette.append(color)
+                _palette = palette
+
+    return _palette
+
+
+def palette_colors(n):
+    """Return the first n colors of the palette as HTML strings.
+
+    The first colors are the same as L{jiraban.colors.html_colors}. When
+    there are more than in the palette, colors start over.
+    """
+    palette = get_palette()
+    if n <= len(palette):
+        return palette[:n]
+
+    return [palette[i % len(palette)] for i in range(n)]
+
+
+class ColorMap:
+    """Map of identity names to palette colors, kept across runs.
+
+    Each new name gets the first color not used by another name, so the
+    color of a name doesn't change when other names come and go. Maps
+    can be shared by threads rendering boards at the same time.
+
+    @param path: Optional JSON file to load and save the map.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._colors = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._colors = json.load(f)
+        self._used = set(self._colors.values())
+        self._next = 0
+        self._lock = Lock()
+        self.changed = False
+
+    def __len__(self):
+        return len(self._colors)
+
+    def get(self, name):
+        """Get the color of the identity C{name}, assigning a new one."""
+        key = name or u""
+        with self._lock:
+            color = self._colors.get(key)
+            if color is None:
+                color = self._get_unused()
+                self._colors[key] = color
+                self._used.add(color)
+                self.changed = True
+
+        return color
+
+    def save(self):
+        """Save the map to its path, if any and when it changed."""
+        if self.path is None or not self.changed:
+            return
+
+        with self._lock:
+            atomic_file = AtomicFile(self.path)
+            try:
+                json.dump(
+                    self._colors, atomic_file, indent=2, sort_keys=True)
+            except:
+                atomic_file.discard()
+                raise
+            atomic_file.commit()
+            self.changed = False
+
+    def _get_unused(self):
+        palette = get_palette()
+        while self._next < len(palette):
+            color = palette[self._next]
+            self._next += 1
+            if color not in self._used:
+                return color
+
+        # All colors are used, so start over from the first one.
+        color = palette[self._next % len(palette)]
+        self._next += 1
+        return color
@@ -35,26 +35,50 @@ from jiraban.variables import (
 
 class Property:
 
+    # Name of the property in its class, which is also the key of the
+    # slot holding its variable in the __dict__ of each instance.
+    _name = None
+
     def __init__(self, variable_class=Variable, variable_kwargs={}):
         self._variable_class = variable_class
         self._variable_kwargs = variable_kwargs
 
+        # Optional properties without a default are None until they are
+        # set, so their variable is only created when needed.
+        self._optional = not (
+            variable_kwargs.get("value") is not None or
+            variable_kwargs.get("value_factory") is not None or
+            variable_kwargs.get("required"))
+
     def __get__(self, obj, cls=None):
         if obj is None:
             return self._get_attribute(cls)
-        if cls is None:
-            cls = type(obj)
-        attribute = self._get_attribute(cls)
-        variable = get_variable(obj, attribute)
+        try:
+            variable = obj.__dict__[self._name]
+        except KeyError:
+            if self._optional:
+                return None
+            variable = self._get_variable(obj)
         return variable.get()
 
     def __set__(self, obj, value):
-        cls = type(obj)
-        attribute = self._get_attribute(cls)
-        variable = get_variable(obj, attribute)
+        try:
+            variable = obj.__dict__[self._name]
+        except KeyError:
+            if value is None and self._optional:
+                return
+            variable = self._get_variable(obj)
         variable.set(value)
 
+    def __set_name__(self, cls, name):
+        """Name this property when its class is defined, see L{AttributeType}.
+        """
+        self._name = name
+
     def _detect_name(self, used_cls):
+        if self._name is not None:
+            return self._name
+
         self_id = id(self)
         for cls in used_cls.__mro__:
             for attr, prop in cls.__dict__.iteritems():
@@ -74,9 +98,15 @@ class Property:
             attribute = PropertyAttribute(self, cls, name,
                 self._variable_class, self._variable_kwargs)
             cls._attributes[self] = attribute
+            self._name = name
 
         return attribute
 
+    def _get_variable(self, obj):
+        """Slow path to get the variable when its slot is still empty."""
+        attribute = self._get_attribute(type(obj))
+        return get_variable(obj, attribute)
+
     def coerce(self, value):
         return self._variable_class(**self._variable_kwargs).coerce(value)
 
@@ -128,6 +158,12 @@ class Unicode(PropertyType):
 
 
 class List(PropertyFactory):
+    """A list property.
+
+    In addition to the usual keyword arguments, C{immutable} coerces
+    values into a tuple and C{interned} shares repeated items between
+    instances, see L{intern_value}.
+    """
 
     variable_class = ListVariable
 
@@ -20,24 +20,48 @@ __all__ = [
     "run",
     ]
 
+import os
 import sys
+import time
 
+from copy import copy
 from getpass import getpass
 from optparse import (
     OptionGroup,
     OptionValueError,
     )
 
+from jiraban.aggregates import parse_wip_limits
 from jiraban.attribute import get_attributes
 from jiraban.board import (
     Board,
     Item,
     )
-from jiraban.html import generate_html
+from jiraban.config import (
+    FORMATS,
+    ConfigError,
+    load_config,
+    )
 from jiraban.jira import (
+    DEFAULT_TIMEOUT,
     JIRA,
     JIRAError,
-    kwargs_to_jql,
+    filters_to_jql,
+    )
+from jiraban.metrics import (
+    REGISTRY,
+    PrometheusTextfile,
+    )
+from jiraban.output import (
+    COMPRESSIONS,
+    OutputFiles,
+    )
+from jiraban.timings import (
+    PHASES,
+    TimedStream,
+    Timings,
+    get_times,
+    phase,
     )
 
 from jiraban.scripts.application import (
@@ -46,43 +70,58 @@ from jiraban.scripts.application import (
     )
 from jiraban.scripts.options import AttributeOption
 
+# The modules to render, export and watch boards are imported where they
+# are used, since Jinja2 and requests are slow to import and not needed
+# for the help, option errors or exports from a cache.
 
-class RunnerApplication(Application):
 
-    # Application defaults
-    usage = """\
-Usage: %%prog [OPTIONS] USERNAME [PASSWORD]
+# Usage of the runner, formatted with the command and the attributes.
+USAGE = """\
+Usage: %s [OPTIONS] USERNAME [PASSWORD]
 Warning, JIRA might limit the number of requests within a period of time.
 
 Attributes:
   %s\
-""" % "\n  ".join(sorted(get_attributes(Item).keys()))
+"""
+
+
+class RunnerApplication(Application):
+
+    # Application defaults
+    command = "%prog"
 
     # Runner defaults
+    default_format = "html"
     default_output = "-"
     default_server = "http://localhost:8080"
+    default_workers = 4
 
     # Display defaults
     default_category = "fix_versions"
     default_identity = "assignee"
     default_story = "components"
 
+    # Output formats
+    formats = FORMATS
+
+    # Timings of the run, when asked
+    timings = None
+
+    # Memory report of the run, when asked
+    memory = None
+
+    @property
+    def usage(self):
+        """Usage listing the attributes, only built when run."""
+        return USAGE % (
+            self.command, "\n  ".join(sorted(get_attributes(Item).keys())))
+
     def add_options(self, parser):
         """See L{Application}."""
         super(RunnerApplication, self).add_options(parser)
 
         runner_group = OptionGroup(parser, "Runner options")
-        runner_group.add_option("--cache",
-            metavar="FILE",
-            help=("""Cache to use instead of a request on the server."""))
-        runner_group.add_option("-o", "--output",
-            metavar="FILE",
-            default=self.default_output,
-            help=("""Output file, defaults to "%default"."""))
-        runner_group.add_option("-s", "--server",
-            metavar="URL",
-            default=self.default_server,
-            help=("""JIRA server, defaults to "%default"."""))
+        self.add_runner_options(runner_group)
 
         filter_group = OptionGroup(parser, "Filter options")
         filter_group.add_option("-a", "--assignee",
@@ -118,6 +157,35 @@ Attributes:
             default=self.default_identity,
             help=("""Identity attribute to group items by color, """
                 """defaults to "%default"."""))
+        display_group.add_option("--colors",
+            metavar="FILE",
+            help=("""File to keep the color of each identity across runs, """
+                """instead of coloring them by position."""))
+        display_group.add_option("--compact",
+            action="store_true",
+            default=False,
+            help=("""Write JSON items as positions in a table of strings."""))
+        display_group.add_option("--limit",
+            metavar="COUNT",
+            type="int",
+            help=("""Maximum number of items to display per cell, """
+                """defaults to all items."""))
+        display_group.add_option("--minify",
+            action="store_true",
+            default=False,
+            help=("""Strip whitespace from the generated HTML."""))
+        display_group.add_option("--search",
+            action="store_true",
+            default=False,
+            help=("""Embed an index of the items in the HTML page to """
+                """filter them as a query is typed."""))
+        display_group.add_option("--wip-limit",
+            metavar="STATUS=COUNT",
+            action="append",
+            default=[],
+            help=("""Maximum number of items in a status, reported as """
+                """breached by the aggregates and prometheus formats. """
+                """More than one can be specified."""))
         display_group.add_option("--story",
             metavar="ATTR",
             type="attribute",
@@ -129,9 +197,117 @@ Attributes:
         parser.add_option_group(filter_group)
         parser.add_option_group(display_group)
 
+    def add_runner_options(self, group):
+        """Add the options to get and render the board to C{group}."""
+        group.add_option("--compiled-templates",
+            metavar="DIR",
+            help=("""Directory of templates compiled into Python modules, """
+                """compiled again whenever the templates change."""))
+        group.add_option("--metrics",
+            metavar="FILE",
+            help=("""File to write metrics to in the Prometheus text """
+                """format, after each run or refresh. To be collected by """
+                """node_exporter, its name must end with ".prom"."""))
+        group.add_option("-s", "--server",
+            metavar="URL",
+            default=self.default_server,
+            help=("""JIRA server, defaults to "%default"."""))
+        group.add_option("--template-cache",
+            metavar="DIR",
+            help=("""Directory to cache the bytecode of templates."""))
+        group.add_option("--timeout",
+            metavar="SECONDS",
+            type="float",
+            default=DEFAULT_TIMEOUT,
+            help=("""Number of seconds to wait for JIRA to connect or to """
+                """send more data, defaults to %default."""))
+        self.add_output_options(group)
+
+    def add_output_options(self, group):
+        """Add the options to output the board to C{group}."""
+        group.add_option("--cache",
+            metavar="FILE",
+            help=("""Cache to use instead of a request on the server."""))
+        group.add_option("--config",
+            metavar="FILE",
+            help=("""Config file of boards to write in one run, each in a """
+                """[board:NAME] section with its own filters, display """
+                """options, output file and compressions. The display """
+                """and compress options given here are the defaults of """
+                """the boards."""))
+        group.add_option("--compress",
+            metavar="NAME",
+            action="append",
+            type="choice",
+            choices=sorted(COMPRESSIONS),
+            default=[],
+            help=("""Also write the output compressed with NAME next to """
+                """it, one of %s. More than one can be specified."""
+                % ", ".join(sorted(COMPRESSIONS))))
+        group.add_option("--deadline",
+            metavar="SECONDS",
+            type="float",
+            help=("""Maximum number of seconds to get the items from """
+                """JIRA. When watching, the last board is written marked """
+                """as stale instead."""))
+        group.add_option("-f", "--format",
+            metavar="NAME",
+            type="choice",
+            choices=self.formats,
+            default=self.default_format,
+            help=("""Output format, one of %s, defaults to "%%default"."""
+                % ", ".join(self.formats)))
+        group.add_option("-o", "--output",
+            metavar="FILE",
+            default=self.default_output,
+            help=("""Output file, defaults to "%default"."""))
+        group.add_option("--site",
+            metavar="DIR",
+            help=("""Output directory of a static site with an index page """
+                """and a page per story, instead of a single page."""))
+        group.add_option("--watch",
+            metavar="SECONDS",
+            type="float",
+            help=("""Keep running and refresh the board every SECONDS, """
+                """only getting the items that changed and only writing """
+                """the output when the board changed."""))
+        group.add_option("--profile",
+            metavar="FILE",
+            help=("""Write the cProfile stats of the profiled phase to """
+                """FILE, to be read with the pstats module."""))
+        group.add_option("--profile-phase",
+            metavar="NAME",
+            type="choice",
+            choices=PHASES,
+            default="render",
+            help=("""Phase to profile, one of %s, defaults to "%%default"."""
+                % ", ".join(PHASES)))
+        group.add_option("--timings",
+            action="store_true",
+            default=False,
+            help=("""Print the wall and CPU time of each phase on the """
+                """standard error when done."""))
+        group.add_option("--timings-json",
+            metavar="FILE",
+            help=("""Write the wall and CPU time of each phase along with """
+                """the requests and bytes read to FILE as JSON."""))
+        group.add_option("--memory-report",
+            action="store_true",
+            default=False,
+            help=("""Print the memory after each phase, the peak memory, """
+                """the top allocation sites and the bytes per item on the """
+                """standard error when done."""))
+        group.add_option("--workers",
+            metavar="COUNT",
+            type="int",
+            default=self.default_workers,
+            help=("""Number of boards of a config file to render at the """
+                """same time, defaults to %default."""))
+
     def parse_options(self, options, args):
         """See L{Application}."""
         super(RunnerApplication, self).parse_options(options, args)
+        start_wall, start_cpu = get_times()
 
         if len(args) < 1:
             raise OptionValueError("Missing USERNAME.")
@@ -141,50 +317,357 @@ Attributes:
         username = args[0]
         password = args[1] if len(args) > 1 else getpass("Password: ")
 
-        if options.jql:
-            if options.assignee or options.component:
-                raise OptionValueError(
-                    "Cannot use JQL with assignee or component")
-            self.jql = options.jql
-        else:
-            if not options.assignee and not options.component:
-                assignee = "currentUser()"
-            else:
-                assignee = options.assignee
+        try:
+            self.jql = filters_to_jql(
+                options.jql, options.assignee, options.component)
+        except ValueError, e:
+            raise OptionValueError(str(e))
 
-            self.jql = kwargs_to_jql(
-                resolution="unresolved",
-                assignee=assignee,
-                component=options.component)
+        if options.limit is not None and options.limit < 1:
+            raise OptionValueError("Limit must be at least 1.")
+        try:
+            self.wip_limits = parse_wip_limits(options.wip_limit)
+        except ValueError, e:
+            raise OptionValueError(str(e))
+        if options.timeout <= 0:
+            raise OptionValueError("Timeout must be positive.")
 
-        self.jira = JIRA(options.server, username, password)
+        self.jira = JIRA(
+            options.server, username, password, timeout=options.timeout)
         self.board = Board(
             self.jql, self.jira.query_html(self.jql).url,
             options.category, options.story, options.identity)
+        if options.metrics is not None:
+            self.metrics = PrometheusTextfile(options.metrics)
+        else:
+            self.metrics = None
+        self.compiled_templates = options.compiled_templates
+        self.template_cache = options.template_cache
+        self.limit = options.limit
+        self.minify = options.minify
+        self.compact = options.compact
+        self.search = options.search
+        if options.colors is not None:
+            from jiraban.palette import ColorMap
+            self.color_map = ColorMap(options.colors)
+        else:
+            self.color_map = None
+        self.parse_output_options(options)
+
+        if self.timings is not None:
+            self.jira.timings = self.timings
+            end_wall, end_cpu = get_times()
+            self.timings.add(
+                "options", end_wall - start_wall, end_cpu - start_cpu)
+
+    def parse_output_options(self, options):
+        """Parse the options added by L{add_output_options}."""
+        if (options.compress and options.output == "-" and
+                not options.config):
+            raise OptionValueError("Cannot compress the standard output.")
+        if options.site and options.format != "html":
+            raise OptionValueError(
+                "Cannot write a site in %s." % options.format)
+        if options.deadline is not None and options.deadline <= 0:
+            raise OptionValueError("Deadline must be positive.")
+        if options.config:
+            if options.jql or options.assignee or options.component:
+                raise OptionValueError(
+                    "Cannot use filters with a config file.")
+            if options.cache or options.site or options.watch is not None:
+                raise OptionValueError(
+                    "Cannot use cache, site or watch with a config file.")
+            if options.output != "-":
+                raise OptionValueError(
+                    "Cannot use an output with a config file.")
+            if options.workers < 1:
+                raise OptionValueError("Workers must be at least 1.")
+            try:
+                self.board_configs = load_config(
+                    options.config, category=options.category,
+                    story=options.story, identity=options.identity,
+                    format=options.format, limit=options.limit,
+                    search=options.search, compact=options.compact,
+                    wip_limits=self.wip_limits, compress=options.compress)
+            except ConfigError, e:
+                raise OptionValueError(str(e))
+        else:
+            self.board_configs = None
+        if options.watch is not None:
+            if options.watch <= 0:
+                raise OptionValueError("Watch interval must be positive.")
+            if options.cache:
+                raise OptionValueError("Cannot watch a cache.")
+            if options.output == "-" and not options.site:
+                raise OptionValueError("Cannot watch the standard output.")
+
         self.cache = options.cache
+        self.profile = options.profile
+        self.print_timings = options.timings
+        self.timings_json = options.timings_json
+        if options.memory_report:
+            # Imported here since memory reports are rarely asked for.
+            # Creating the report is what starts tracing allocations.
+            from jiraban.memory import MemoryReport
+            self.memory = MemoryReport()
+        else:
+            self.memory = None
+        if (options.timings or options.timings_json or options.profile
+                or options.memory_report):
+            self.timings = Timings(options.profile_phase, self.memory)
+        self.deadline = options.deadline
+        self.workers = options.workers
+        self.compress = options.compress
+        self.format = options.format
         self.output = options.output
+        self.site = options.site
+        self.watch = options.watch
+        if options.watch is not None:
+            from jiraban.html import FragmentCache
+            self.fragment_cache = FragmentCache()
+        else:
+            self.fragment_cache = None
 
     def process(self):
         """See L{Application}."""
+        if self.watch is not None:
+            self.process_watch()
+            return
+        if self.board_configs is not None:
+            self.process_config()
+            return
+
         try:
-            for item in self.jira.iter_items(self.jql, self.cache):
-                self.board.add(item)
+            with self.jira.time_limit(self.deadline):
+                items = list(self.jira.iter_items(self.jql, self.cache))
+                with phase(self.timings, "board"):
+                    for item in items:
+                        self.board.add(item)
+                if self.format == "html":
+                    self.fetch_icons()
         except JIRAError, e:
             raise ApplicationError(e)
 
-        html = generate_html(self.board, self.jira)
+        self.write_output()
+        self.save_colors()
 
-        if self.output != "-":
-            output_file = open(self.output, "w")
-        else:
-            output_file = sys.stdout
+    def post_process(self, error):
+        """See L{Application}."""
+        self.write_metrics()
+        if self.timings is None:
+            return
+
+        if self.print_timings:
+            self.timings.write_summary(sys.stderr)
+        if self.timings_json is not None:
+            with open(self.timings_json, "w") as f:
+                self.timings.write_json(f)
+        if self.profile is not None:
+            self.timings.dump_profile(self.profile)
+        if self.memory is not None:
+            self.memory.write_report(sys.stderr, self.board)
+
+    def write_metrics(self):
+        """Write the metrics reported so far, if asked."""
+        if self.metrics is not None:
+            self.metrics.write(REGISTRY)
+
+    def fetch_icons(self):
+        """Fetch the icons of the sprites once, before rendering."""
+        from jiraban.html import get_sprite
+        from jiraban.model import SPRITES
+
+        with phase(self.timings, "icons"):
+            for sprite in SPRITES:
+                get_sprite(sprite, self.jira)
+
+    def process_config(self):
+        """Write each board of the config file.
+
+        Boards share the JIRA session, the icons and the environment.
+        Items are only queried once per distinct JQL, then boards are
+        built and written by a pool of worker threads.
+        """
+        from multiprocessing.pool import ThreadPool
+
+        items = {}
+        try:
+            with self.jira.time_limit(self.deadline):
+                for board_config in self.board_configs:
+                    if board_config.jql not in items:
+                        items[board_config.jql] = list(
+                            self.jira.iter_items(board_config.jql))
+                if any(c.format == "html" for c in self.board_configs):
+                    self.fetch_icons()
+        except JIRAError, e:
+            raise ApplicationError(e)
+
+        self.load_environment()
+        pool = ThreadPool(min(self.workers, len(self.board_configs)))
         try:
-            print >>output_file, html.encode('utf-8')
+            pool.map(self.write_board_config, [
+                (board_config, items[board_config.jql])
+                for board_config in self.board_configs])
+        except (JIRAError, EnvironmentError), e:
+            raise ApplicationError(e)
         finally:
-            if self.output != "-":
-                output_file.close()
+            pool.close()
+            pool.join()
+
+        self.save_colors()
+
+    def write_board_config(self, args):
+        """Build and write a board from a config and its items.
+
+        The board is written by a copy of this application with the
+        settings of the board, so it can run alongside other boards.
+
+        @param args: Tuple of a L{BoardConfig} and a list of L{Item}s.
+        """
+        board_config, items = args
+        application = copy(self)
+        application.board = Board(
+            board_config.jql, self.jira.query_html(board_config.jql).url,
+            board_config.category, board_config.story,
+            board_config.identity)
+        with phase(self.timings, "board"):
+            for item in items:
+                application.board.add(item)
+
+        application.format = board_config.format
+        application.output = board_config.output
+        application.limit = board_config.limit
+        application.search = board_config.search
+        application.compact = board_config.compact
+        application.wip_limits = board_config.wip_limits
+        application.compress = board_config.compress
+        application.write_output()
+
+    def process_watch(self):
+        """Refresh the board every interval until interrupted.
+
+        The session, templates and caches are kept between refreshes,
+        and the output is only written when the board changed. Failed
+        refreshes are reported and retried on the next interval, and the
+        last board is written once marked as stale. Icons are fetched
+        within the deadline after the first refresh. Failed writes are
+        also reported and retried on the next interval.
+        """
+        from jiraban.watch import BoardWatcher
+
+        watcher = BoardWatcher(self.jira, self.jql, self.board)
+        stale = unwritten = icons = False
+        try:
+            while True:
+                start = time.time()
+                try:
+                    with self.jira.time_limit(self.deadline):
+                        with phase(self.timings, "board"):
+                            changed = watcher.refresh()
+                        unwritten = unwritten or changed
+                        if self.format == "html" and not icons:
+                            self.fetch_icons()
+                            icons = True
+                except JIRAError, e:
+                    print >>sys.stderr, e
+                    if watcher.loaded and not stale:
+                        stale = self.write_watched_output(stale=True)
+                else:
+                    if stale or unwritten:
+                        unwritten = not self.write_watched_output()
+                        stale = stale and unwritten
+                self.write_metrics()
+                time.sleep(max(self.watch - (time.time() - start), 0))
+        except KeyboardInterrupt:
+            pass
+
+    def write_watched_output(self, stale=False):
+        """Write the output of a watched board, reporting failures.
+
+        @param stale: Whether the board is marked as stale.
+        @return: Whether the output was written.
+        """
+        try:
+            self.write_output(stale)
+            if not stale:
+                self.save_colors()
+        except (JIRAError, EnvironmentError), e:
+            print >>sys.stderr, "Failed to write the board: %s" % e
+            return False
+
+        return True
+
+    def write_output(self, stale=False):
+        """Write the board to the output file, site or standard output.
+
+        @param stale: Whether the board is marked as stale.
+        """
+        if self.site is not None:
+            from jiraban.html import write_site
+            with phase(self.timings, "render"):
+                write_site(
+                    self.board, self.jira, self.site, self.limit,
+                    self.load_environment(), self.color_map, stale)
+        elif self.output != "-":
+            with OutputFiles(self.output, self.compress) as output_file:
+                self.write(output_file, stale)
+        else:
+            self.write(sys.stdout, stale)
+
+    def save_colors(self):
+        """Save the colors of identities, if kept across runs."""
+        if self.color_map is not None:
+            self.color_map.save()
+
+    def load_environment(self):
+        """Load the environment to render templates."""
+        from jiraban.html import get_environment
+
+        return get_environment(
+            self.template_cache, self.compiled_templates, self.minify)
+
+    def write(self, stream, stale=False):
+        """Write the board to C{stream} in the output format.
+
+        When timed, rendering is the C{render} phase and writing to
+        C{stream} the C{write} phase.
+        """
+        if self.timings is not None:
+            stream = TimedStream(stream, self.timings)
+
+        with phase(self.timings, "render"):
+            if self.format == "aggregates":
+                from jiraban.aggregates import write_aggregates
+                write_aggregates(self.board, stream, self.wip_limits)
+                stream.write("\n")
+            elif self.format == "prometheus":
+                from jiraban.aggregates import write_prometheus
+                write_prometheus(self.board, stream, self.wip_limits)
+            elif self.format == "csv":
+                from jiraban.export import write_csv
+                write_csv(self.board, stream, self.limit)
+            elif self.format == "json":
+                from jiraban.export import write_json
+                write_json(self.board, stream, self.limit, self.compact)
+            else:
+                from jiraban.html import write_html
+                write_html(
+                    self.board, self.jira, stream, self.limit,
+                    self.load_environment(), self.fragment_cache,
+                    color_map=self.color_map, search=self.search,
+                    stale=stale)
+                stream.write("\n")
+
+
+def run(args=None):
+    if args is None:
+        args = sys.argv[1:]
 
+    if args[:1] == ["serve"]:
+        # Imported here since the server imports this module.
+        from jiraban.scripts.server import run as run_server
+        run_server(args[1:])
+        return
 
-def run():
     application = RunnerApplication()
-    application.run()
+    application.run(args)
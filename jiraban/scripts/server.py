@@ -0,0 +1,163 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "run",
+    ]
+
+import sys
+
+from cStringIO import StringIO
+from optparse import OptionValueError
+
+from jiraban.aggregates import write_prometheus
+from jiraban.export import write_json
+from jiraban.html import (
+    FragmentCache,
+    write_html,
+    )
+from jiraban.server import (
+    BoardBuilder,
+    BoardHTTPServer,
+    BoardRefresher,
+    )
+from jiraban.watch import BoardWatcher
+
+from jiraban.scripts.runner import RunnerApplication
+
+
+class ServerApplication(RunnerApplication):
+
+    # Application defaults
+    command = "%prog serve"
+
+    # Server defaults
+    default_address = "localhost"
+    default_deadline = 10
+    default_interval = 300
+    default_name = "board"
+    default_port = 8000
+
+    def add_output_options(self, group):
+        """See L{RunnerApplication}."""
+        group.add_option("--address",
+            metavar="HOST",
+            default=self.default_address,
+            help=("""Address to listen on, defaults to "%default"."""))
+        group.add_option("--deadline",
+            metavar="SECONDS",
+            type="float",
+            default=self.default_deadline,
+            help=("""Number of seconds to wait for a build before serving """
+                """the last board marked as stale while the build """
+                """continues, defaults to %default."""))
+        group.add_option("--interval",
+            metavar="SECONDS",
+            type="float",
+            default=self.default_interval,
+            help=("""Number of seconds between refreshes of the board, """
+                """defaults to %default."""))
+        group.add_option("--name",
+            metavar="NAME",
+            default=self.default_name,
+            help=("""Name of the board in urls, served as NAME.html and """
+                """NAME.json, defaults to "%default"."""))
+        group.add_option("-p", "--port",
+            metavar="PORT",
+            type="int",
+            default=self.default_port,
+            help=("""Port to listen on, defaults to %default."""))
+
+    def parse_output_options(self, options):
+        """See L{RunnerApplication}."""
+        if options.interval <= 0:
+            raise OptionValueError("Interval must be positive.")
+        if options.deadline <= 0:
+            raise OptionValueError("Deadline must be positive.")
+        if "/" in options.name or "." in options.name:
+            raise OptionValueError("Name cannot contain a slash or a dot.")
+
+        self.address = options.address
+        self.deadline = options.deadline
+        self.interval = options.interval
+        self.board_name = options.name
+        self.port = options.port
+        self.fragment_cache = FragmentCache()
+
+    def process(self):
+        """See L{Application}."""
+        self.watcher = BoardWatcher(self.jira, self.jql, self.board)
+        builder = BoardBuilder(self.build, self.deadline)
+        refresher = BoardRefresher([builder], self.interval)
+        server = BoardHTTPServer(
+            (self.address, self.port), {self.board_name: builder},
+            int(self.interval))
+
+        print >>sys.stderr, "Serving http://%s:%d/%s.html" % (
+            self.address, self.port, self.board_name)
+        refresher.start()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            refresher.stop()
+            server.server_close()
+
+    def build(self):
+        """Build the board in each format, unless it didn't change.
+
+        The HTML is also rendered as stale, which is cheap since all the
+        fragments but the footer are cached by the first render. The
+        metrics are written after each build, even a failed one.
+        """
+        try:
+            if not self.watcher.refresh():
+                return None
+
+            html, stale_html = [
+                self.render_html(stale) for stale in False, True]
+            json = StringIO()
+            write_json(self.board, json, self.limit, self.compact)
+            prometheus = StringIO()
+            write_prometheus(self.board, prometheus, self.wip_limits)
+            self.save_colors()
+        finally:
+            self.write_metrics()
+
+        return {
+            "html": ("text/html; charset=utf-8", html, stale_html),
+            "json": ("application/json", json.getvalue(), None),
+            "prom": (
+                "text/plain; version=0.0.4; charset=utf-8",
+                prometheus.getvalue(), None),
+            }
+
+    def render_html(self, stale=False):
+        """Render the board in HTML."""
+        html = StringIO()
+        write_html(
+            self.board, self.jira, html, self.limit, self.load_environment(),
+            self.fragment_cache, color_map=self.color_map, search=self.search,
+            stale=stale)
+        return html.getvalue()
+
+
+def run(args=None):
+    application = ServerApplication()
+    application.run(args)
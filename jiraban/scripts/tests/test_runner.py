@@ -0,0 +1,176 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from contextlib import contextmanager
+from cStringIO import StringIO
+from optparse import OptionParser
+from unittest import TestCase
+
+from jiraban.jira import JIRAError
+from jiraban.scripts.application import ApplicationError
+from jiraban.scripts.runner import RunnerApplication
+from jiraban.scripts.server import ServerApplication
+from jiraban.tests.test_watch import FakeJIRA
+
+
+class RunnerJIRA(FakeJIRA):
+    """Fake JIRA without time limits, to run boards.
+
+    Reading icons fails as many times as C{icon_errors}.
+    """
+
+    icon_errors = 0
+
+    @contextmanager
+    def time_limit(self, seconds):
+        yield
+
+    def read_icon(self, icon):
+        if self.icon_errors:
+            self.icon_errors -= 1
+            raise JIRAError("Failed to get %s" % icon)
+        return ""
+
+    def query_html(self, jql):
+        return RunnerJIRALink("http://localhost/%s" % jql)
+
+
+class RunnerJIRALink:
+
+    def __init__(self, url):
+        self.url = url
+
+
+class TestRunnerApplication(TestCase):
+
+    def test_usage(self):
+        """The usage lists the attributes of items."""
+        usage = RunnerApplication().usage
+        self.assertTrue(usage.startswith("Usage: %prog [OPTIONS]"))
+        self.assertTrue("\n  fix_versions\n" in usage)
+
+    def test_server_usage(self):
+        """The usage of the server includes its command."""
+        usage = ServerApplication().usage
+        self.assertTrue(usage.startswith("Usage: %prog serve [OPTIONS]"))
+
+    def parse_args(self, args):
+        application = RunnerApplication()
+        parser = OptionParser()
+        application.add_options(parser)
+        application.parse_options(*parser.parse_args(args))
+        return application
+
+    def test_no_timings(self):
+        """Runs are not timed by default."""
+        application = self.parse_args(["user", "password"])
+        self.assertEqual(application.timings, None)
+        self.assertEqual(application.jira.timings, None)
+
+    def test_timings(self):
+        """Timed runs share their timings with JIRA, from the options."""
+        application = self.parse_args(["--timings", "user", "password"])
+        self.assertTrue(application.jira.timings is application.timings)
+        self.assertEqual(application.timings.phases.keys(), ["options"])
+        self.assertEqual(application.timings.profile_phase, "render")
+
+    def test_lazy_imports(self):
+        """Jinja2 and requests are not imported to start the runner."""
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__)))))
+        output = subprocess.check_output([sys.executable, "-c", (
+            "import sys; import jiraban.scripts.runner; "
+            "print 'jinja2' in sys.modules, 'requests' in sys.modules")],
+            env=dict(os.environ, PYTHONPATH=root))
+        self.assertEqual(output.strip(), "False False")
+
+    def watch(self, write_error=None, icon_errors=0):
+        """Watch a board until it is written without error.
+
+        @param write_error: Optional error raised by the first write.
+        @param icon_errors: Number of times reading icons fails.
+        @return: The stale flag of each write and the standard error.
+        """
+        application = self.parse_args([
+            "--watch", "0.001", "-o", "board.html", "user", "password"])
+        application.jira = RunnerJIRA()
+        application.jira.icon_errors = icon_errors
+        application.jira.set_item("1", "t1")
+        writes = []
+
+        def write_output(stale=False):
+            writes.append(stale)
+            if len(writes) == 1 and write_error is not None:
+                raise write_error
+            if not stale:
+                raise KeyboardInterrupt()
+
+        application.write_output = write_output
+        stderr = sys.stderr
+        sys.stderr = StringIO()
+        try:
+            application.process_watch()
+            output = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        return writes, output
+
+    def test_watch_write_error(self):
+        """Failed writes of a watched board are retried on the next
+        interval, even when the board didn't change."""
+        writes, output = self.watch(IOError("No space left on device"))
+        self.assertEqual(writes, [False, False])
+        self.assertTrue("No space left on device" in output)
+
+    def test_watch_write_jira_error(self):
+        """Writes failing to get content from JIRA are also retried."""
+        writes, output = self.watch(JIRAError("Failed to get icon"))
+        self.assertEqual(writes, [False, False])
+        self.assertTrue("Failed to get icon" in output)
+
+    def test_watch_icon_error(self):
+        """Icons failing to be fetched are fetched again, then the board
+        is written even though it didn't change since."""
+        writes, output = self.watch(icon_errors=1)
+        self.assertEqual(writes, [True, False])
+        self.assertTrue("Failed to get" in output)
+
+    def test_config_write_error(self):
+        """Boards of a config file failing to be written raise an
+        application error."""
+        directory = tempfile.mkdtemp()
+        try:
+            config = os.path.join(directory, "boards.ini")
+            with open(config, "w") as f:
+                f.write("[board:a]\nformat = json\noutput = %s\n" % (
+                    os.path.join(directory, "missing", "a.json")))
+            application = self.parse_args(
+                ["--config", config, "user", "password"])
+            application.jira = RunnerJIRA()
+            application.jira.set_item("1", "t1")
+            self.assertRaises(ApplicationError, application.process_config)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,308 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "BoardBuilder",
+    "BoardHTTPServer",
+    "BoardRefresher",
+    "BoardRequestHandler",
+    "Rendition",
+    ]
+
+import sys
+
+from BaseHTTPServer import (
+    BaseHTTPRequestHandler,
+    HTTPServer,
+    )
+from collections import namedtuple
+from email.utils import formatdate
+from hashlib import sha1
+from SocketServer import ThreadingMixIn
+from threading import (
+    Condition,
+    Event,
+    Thread,
+    )
+from time import time
+from urlparse import urlparse
+
+from jiraban import version
+
+
+# Board rendered in a format, ready to be sent as is.
+Rendition = namedtuple("Rendition", [
+    "body", "content_type", "etag", "modified"])
+
+
+class BoardBuilder:
+    """Build the renditions of a board, one build at a time.
+
+    Requests for a build while another one is in progress wait for that
+    build instead of starting another, so concurrent requests for the
+    same board only cost one build.
+
+    When the last build failed, or when the build in progress takes
+    longer than C{deadline}, the stale renditions of the last build are
+    served instead, without waiting for the build to finish.
+
+    @param build: Function returning a dict of formats to content types,
+        bodies and stale bodies, or None when the board didn't change
+        since the last successful build. Stale bodies can be None to
+        serve the same body when stale.
+    @param deadline: Optional number of seconds before a build in
+        progress makes the board stale.
+    """
+
+    def __init__(self, build, deadline=None):
+        self._build = build
+        self._deadline = deadline
+        self._renditions = {}
+        self._stale_renditions = {}
+        self._condition = Condition()
+        self._building = False
+        self._build_started = None
+        self.builds = 0
+        self.waiting = 0
+        self.error = None
+
+    @property
+    def built(self):
+        """Whether the board was successfully built at least once."""
+        return bool(self._renditions)
+
+    @property
+    def stale(self):
+        """Whether the last build failed or the current one is overdue."""
+        if self.error is not None:
+            return True
+
+        return (
+            self._building and self._deadline is not None and
+            time() - self._build_started > self._deadline)
+
+    def get(self, format):
+        """Get the latest L{Rendition} of the board in C{format}.
+
+        The first call waits for the board to be built, up to the
+        deadline, later calls never wait. C{None} is returned for unknown
+        formats, or when the board couldn't be built yet.
+        """
+        if not self.builds:
+            self.build_in_background()
+            with self._condition:
+                if not self.builds:
+                    self._wait(self._deadline)
+
+        if self.stale:
+            return self._stale_renditions.get(format)
+
+        return self._renditions.get(format)
+
+    def build(self):
+        """Build the board, or wait for the build in progress.
+
+        Errors are kept as C{error} and the previous renditions are
+        still served, so a failed build only makes them stale.
+        """
+        with self._condition:
+            if self._building:
+                self._wait()
+                return
+
+            self._start()
+
+        self._run()
+
+    def build_in_background(self):
+        """Build the board in a thread, unless a build is in progress."""
+        with self._condition:
+            if self._building:
+                return
+
+            self._start()
+
+        thread = Thread(target=self._run, name="BoardBuilder")
+        thread.daemon = True
+        thread.start()
+
+    def _start(self):
+        self._building = True
+        self._build_started = time()
+
+    def _wait(self, timeout=None):
+        builds = self.builds
+        end = time() + timeout if timeout is not None else None
+        self.waiting += 1
+        try:
+            while self.builds == builds:
+                if end is None:
+                    self._condition.wait()
+                elif end > time():
+                    self._condition.wait(end - time())
+                else:
+                    break
+        finally:
+            self.waiting -= 1
+
+    def _run(self):
+        error = None
+        renditions = None
+        try:
+            renditions = self._create_renditions()
+        except Exception, error:
+            print >>sys.stderr, "Failed to build board: %s" % error
+
+        with self._condition:
+            if renditions is not None:
+                self._renditions, self._stale_renditions = renditions
+            self.error = error
+            self._building = False
+            self.builds += 1
+            self._condition.notify_all()
+
+    def _create_renditions(self):
+        contents = self._build()
+        if contents is None:
+            return None
+
+        modified = time()
+        renditions = {}
+        stale_renditions = {}
+        for format, (content_type, body, stale_body) in contents.iteritems():
+            rendition = create_rendition(body, content_type, modified)
+            renditions[format] = rendition
+            if stale_body is None:
+                stale_renditions[format] = rendition
+            else:
+                stale_renditions[format] = create_rendition(
+                    stale_body, content_type, modified)
+
+        return renditions, stale_renditions
+
+
+def create_rendition(body, content_type, modified):
+    """Create a L{Rendition} of C{body} with a strong ETag."""
+    etag = '"%s"' % sha1(body).hexdigest()
+    return Rendition(body, content_type, etag, modified)
+
+
+class BoardRefresher(Thread):
+    """Thread building boards every interval in the background.
+
+    @param builders: L{BoardBuilder}s of the boards to build.
+    @param interval: Number of seconds between the start of builds.
+    """
+
+    def __init__(self, builders, interval):
+        super(BoardRefresher, self).__init__(name="BoardRefresher")
+        self.daemon = True
+        self._builders = builders
+        self._interval = interval
+        self._stopped = Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            start = time()
+            for builder in self._builders:
+                builder.build()
+            self._stopped.wait(max(self._interval - (time() - start), 0))
+
+    def stop(self):
+        """Stop building boards after the current build."""
+        self._stopped.set()
+
+
+class BoardRequestHandler(BaseHTTPRequestHandler):
+    """Serve the renditions of boards from memory.
+
+    Boards are served under /NAME.FORMAT, with strong ETags so clients
+    can revalidate them cheaply.
+    """
+
+    server_version = "jiraban/%s" % version
+
+    def do_GET(self):
+        self.send_board(True)
+
+    def do_HEAD(self):
+        self.send_board(False)
+
+    def send_board(self, send_body):
+        """Send the rendition of the requested board."""
+        path = urlparse(self.path).path.lstrip("/")
+        builders = self.server.builders
+        if not path and len(builders) == 1:
+            self.send_response(302)
+            self.send_header("Location", "/%s.html" % builders.keys()[0])
+            self.end_headers()
+            return
+
+        name, _, format = path.rpartition(".")
+        builder = builders.get(name)
+        if builder is None:
+            self.send_error(404)
+            return
+
+        rendition = builder.get(format)
+        if rendition is None:
+            if builder.built:
+                self.send_error(404)
+            else:
+                self.send_error(503, "Board not built: %s" % builder.error)
+            return
+
+        if_none_match = self.headers.get("If-None-Match", "")
+        etags = [etag.strip() for etag in if_none_match.split(",")]
+        if rendition.etag in etags or "*" in etags:
+            self.send_response(304)
+            self.send_rendition_headers(rendition)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_rendition_headers(rendition)
+        self.send_header("Content-Type", rendition.content_type)
+        self.send_header("Content-Length", str(len(rendition.body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(rendition.body)
+
+    def send_rendition_headers(self, rendition):
+        self.send_header("ETag", rendition.etag)
+        self.send_header(
+            "Last-Modified", formatdate(rendition.modified, usegmt=True))
+        self.send_header(
+            "Cache-Control", "max-age=%d" % self.server.max_age)
+
+
+class BoardHTTPServer(ThreadingMixIn, HTTPServer):
+    """HTTP server of boards, handling each request in a thread.
+
+    @param address: Host and port to listen on.
+    @param builders: Dict of board names to L{BoardBuilder}s.
+    @param max_age: Number of seconds clients can cache boards.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, builders, max_age=0,
+            handler_class=BoardRequestHandler):
+        HTTPServer.__init__(self, address, handler_class)
+        self.builders = builders
+        self.max_age = max_age
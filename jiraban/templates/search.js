@@ -0,0 +1,64 @@
+(function () {
+  var index = JSON.parse(document.getElementById("search-index").innerHTML);
+  var container = document.getElementById("container");
+  var tiles = document.querySelectorAll(".tile");
+  var terms = Object.keys(index.terms);
+
+  // Text of the fields of each item, to match words anywhere in them.
+  var fields = index.items.map(function (item, position) {
+    return [
+      index.ids[position], index.assignees[item[0]],
+      index.statuses[item[1]], index.priorities[item[2]]
+      ].join(" ").toLowerCase();
+  });
+
+  function find(word) {
+    var found = {};
+    fields.forEach(function (text, position) {
+      if (text.indexOf(word) >= 0) {
+        found[position] = true;
+      }
+    });
+    terms.forEach(function (term) {
+      if (term.lastIndexOf(word, 0) === 0) {
+        index.terms[term].forEach(function (position) {
+          found[position] = true;
+        });
+      }
+    });
+    return found;
+  }
+
+  // Ids of the items matching all the words of the query, or null.
+  function search(query) {
+    var words = query.toLowerCase().match(/\S+/g);
+    if (!words) {
+      return null;
+    }
+    var matches = find(words[0]);
+    words.slice(1).forEach(function (word) {
+      var found = find(word);
+      for (var position in matches) {
+        if (!found[position]) {
+          delete matches[position];
+        }
+      }
+    });
+    var ids = {};
+    for (var match in matches) {
+      ids[index.ids[match]] = true;
+    }
+    return ids;
+  }
+
+  // Only classes are toggled, so tiles are dimmed without any layout.
+  document.getElementById("search").oninput = function () {
+    var ids = search(this.value);
+    container.classList.toggle("filtering", ids !== null);
+    for (var i = 0; i < tiles.length; i++) {
+      var tile = tiles[i];
+      tile.classList.toggle(
+        "match", ids !== null && tile.getAttribute("data-id") in ids);
+    }
+  };
+})();
@@ -0,0 +1,184 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "StubJIRA",
+    "generate_items_xml",
+    "iter_items_xml",
+    ]
+
+from datetime import (
+    datetime,
+    timedelta,
+    )
+from random import Random
+from xml.sax.saxutils import (
+    escape,
+    quoteattr,
+    )
+
+from jiraban.board import (
+    BLOCKER,
+    CLOSED,
+    CRITICAL,
+    IN_PROGRESS,
+    MAJOR,
+    MINOR,
+    OPEN,
+    READY_FOR_QA,
+    READY_FOR_SPRINT,
+    REOPENED,
+    RESOLVED,
+    TRIVIAL,
+    )
+
+
+# Weights of the statuses and priorities of synthetic items, roughly as
+# found on boards of unresolved items.
+STATUS_WEIGHTS = [
+    (OPEN, 40), (IN_PROGRESS, 20), (READY_FOR_QA, 10), (READY_FOR_SPRINT, 10),
+    (REOPENED, 5), (RESOLVED, 10), (CLOSED, 5)]
+PRIORITY_WEIGHTS = [
+    (BLOCKER, 2), (CRITICAL, 8), (MAJOR, 60), (MINOR, 25), (TRIVIAL, 5)]
+
+# Words of the summaries and descriptions of synthetic items.
+WORDS = (
+    "add allow board build cache change check fix handle improve items "
+    "jira link list move page query remove render report story support "
+    "update user version when with").split()
+
+ITEM_TEMPLATE = u"""\
+    <item>
+      <title>[%(key)s] %(summary)s</title>
+      <link>http://localhost/browse/%(key)s</link>
+      <project id="10000" key="%(project)s">%(project)s</project>
+      <description>%(description)s</description>
+      <key id="%(id)d">%(key)s</key>
+      <summary>%(summary)s</summary>
+      <type id="1">Bug</type>
+      <priority id="%(priority_id)d">%(priority)s</priority>
+      <status id="%(status_id)d">%(status)s</status>
+      <resolution id="-1">Unresolved</resolution>
+      <assignee username=%(username)s>%(assignee)s</assignee>
+      <reporter username="reporter">Reporter</reporter>
+      <created>%(created)s</created>
+      <updated>%(updated)s</updated>
+%(components)s%(fix_versions)s    </item>
+"""
+
+
+def choose_weighted(random, weights):
+    """Choose a value from C{(value, weight)} tuples."""
+    position = random.uniform(0, sum(w for v, w in weights))
+    for value, weight in weights:
+        position -= weight
+        if position <= 0:
+            return value
+
+    return weights[-1][0]
+
+
+def format_date(date):
+    """Format a date as in the XML export of JIRA."""
+    return date.strftime("%a, %d %b %Y %H:%M:%S +0000")
+
+
+def iter_items_xml(
+        count, components=20, versions=5, assignees=30, project="BENCH",
+        seed=0):
+    """Iterate over the chunks of a synthetic XML export of items.
+
+    The export has the fields of the XML exports of JIRA, so parsing it
+    costs about as much. The same arguments always give the same export.
+
+    @param count: Number of items.
+    @param components: Number of components, most items have one and
+        some have none or two.
+    @param versions: Number of fix versions, most items have one.
+    @param assignees: Number of assignees, some items are unassigned.
+    @param project: Key of the project of the items.
+    @param seed: Seed of the random choices.
+    """
+    random = Random(seed)
+    start = datetime(2013, 1, 1)
+    status_ids = dict((s, i + 1) for i, (s, w) in enumerate(STATUS_WEIGHTS))
+    priority_ids = dict(
+        (p, i + 1) for i, (p, w) in enumerate(PRIORITY_WEIGHTS))
+
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<rss version="0.92">\n  <channel>\n'
+    for i in xrange(count):
+        key = "%s-%d" % (project, i + 1)
+        summary = " ".join(random.sample(WORDS, 6)).capitalize()
+        description = escape("<p>%s.</p>" % " ".join(
+            random.choice(WORDS) for _ in xrange(30)).capitalize())
+
+        if random.random() < 0.1:
+            username, assignee = "-1", "Unassigned"
+        else:
+            number = random.randrange(assignees)
+            username, assignee = "user%d" % number, "User %d" % number
+
+        component_count = choose_weighted(random, [(0, 1), (1, 8), (2, 1)])
+        item_components = random.sample(
+            xrange(components), min(component_count, components))
+        item_versions = []
+        if versions and random.random() < 0.9:
+            item_versions.append(random.randrange(versions))
+
+        created = start + timedelta(minutes=random.randrange(500000))
+        updated = created + timedelta(minutes=random.randrange(50000))
+        status = choose_weighted(random, STATUS_WEIGHTS)
+        priority = choose_weighted(random, PRIORITY_WEIGHTS)
+        yield (ITEM_TEMPLATE % {
+            "key": key,
+            "id": 10000 + i,
+            "project": project,
+            "summary": escape(summary),
+            "description": description,
+            "priority": priority,
+            "priority_id": priority_ids[priority],
+            "status": status,
+            "status_id": status_ids[status],
+            "username": quoteattr(username),
+            "assignee": escape(assignee),
+            "created": format_date(created),
+            "updated": format_date(updated),
+            "components": "".join(
+                "      <component>Component %d</component>\n" % c
+                for c in item_components),
+            "fix_versions": "".join(
+                "      <fixVersion>%d.0</fixVersion>\n" % v
+                for v in item_versions),
+            }).encode("utf-8")
+    yield "  </channel>\n</rss>\n"
+
+
+def generate_items_xml(count, **kwargs):
+    """Generate a synthetic XML export of items.
+
+    See L{iter_items_xml} for the arguments.
+    """
+    return "".join(iter_items_xml(count, **kwargs))
+
+
+class StubJIRA:
+    """JIRA returning empty icons without any request."""
+
+    def read_icon(self, icon):
+        return ""
@@ -0,0 +1,71 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+from jiraban.jira import JIRA
+from jiraban.testing.synthetic import generate_items_xml
+
+
+class TestGenerateItemsXML(TestCase):
+
+    def setUp(self):
+        super(TestGenerateItemsXML, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(TestGenerateItemsXML, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def parse_items(self, content):
+        cache = os.path.join(self.directory, "cache.xml")
+        with open(cache, "w") as f:
+            f.write(content)
+        return list(JIRA("http://localhost").iter_items("", cache))
+
+    def test_items(self):
+        """The export has the given number of items, as JIRA would."""
+        items = self.parse_items(generate_items_xml(50))
+        self.assertEqual(len(items), 50)
+        self.assertEqual(items[0].id, "BENCH-1")
+        self.assertEqual(
+            items[0].link, "http://localhost/browse/BENCH-1")
+
+    def test_spread(self):
+        """Items are spread over the given groups."""
+        items = self.parse_items(generate_items_xml(
+            200, components=3, versions=2, assignees=4))
+        components = set(c for i in items for c in i.components)
+        self.assertEqual(len(components), 3)
+        versions = set(v for i in items for v in i.fix_versions)
+        self.assertEqual(versions, set(["0.0", "1.0"]))
+        assignees = set(i.assignee for i in items)
+        self.assertEqual(len(assignees), 5)
+        self.assertTrue("Unassigned" in assignees)
+
+    def test_reproducible(self):
+        """The same seed gives the same export."""
+        self.assertEqual(generate_items_xml(10), generate_items_xml(10))
+        self.assertNotEqual(
+            generate_items_xml(10), generate_items_xml(10, seed=1))
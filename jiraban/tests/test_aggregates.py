@@ -0,0 +1,150 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+import json
+import os
+import subprocess
+import sys
+
+from cStringIO import StringIO
+from unittest import TestCase
+
+from jiraban.aggregates import (
+    compute_aggregates,
+    parse_wip_limits,
+    write_aggregates,
+    write_prometheus,
+    )
+from jiraban.board import (
+    IN_PROGRESS,
+    MAJOR,
+    MINOR,
+    OPEN,
+    Board,
+    )
+from jiraban.tests.test_board import ItemMixin
+
+
+class AggregatesMixin(ItemMixin):
+
+    def create_board(self):
+        board = Board("test")
+        for id, status, priority, components in (
+                ("1", OPEN, MAJOR, ["a"]),
+                ("2", IN_PROGRESS, MAJOR, ["a", "b"]),
+                ("3", IN_PROGRESS, MINOR, None)):
+            board.add(self.create_item(
+                id, priority=priority, status=status, assignee=u"assignee",
+                components=components, fix_versions=["1.0"]))
+        return board
+
+
+class TestParseWIPLimits(TestCase):
+
+    def test_limits(self):
+        """Limits are given by status."""
+        self.assertEqual(
+            parse_wip_limits(["In Progress=2", " Open = 5 "]),
+            {IN_PROGRESS: 2, OPEN: 5})
+
+    def test_invalid(self):
+        """Limits must have a count."""
+        self.assertRaises(ValueError, parse_wip_limits, ["Open"])
+        self.assertRaises(ValueError, parse_wip_limits, ["Open=-1"])
+
+    def test_unknown_status(self):
+        """Limits must be on known statuses."""
+        self.assertRaises(ValueError, parse_wip_limits, ["Opened=1"])
+
+
+class TestComputeAggregates(AggregatesMixin, TestCase):
+
+    def test_counts(self):
+        """Items are counted by each of their groupings."""
+        aggregates = compute_aggregates(self.create_board())
+        self.assertEqual(aggregates.count, 3)
+        self.assertEqual(
+            aggregates.statuses, [(IN_PROGRESS, 2), (OPEN, 1)])
+        self.assertEqual(aggregates.priorities, [(MAJOR, 2), (MINOR, 1)])
+        self.assertEqual(aggregates.identities, [(u"assignee", 3)])
+        self.assertEqual(
+            aggregates.stories, [("a", 2), ("b", 1), (None, 1)])
+        self.assertEqual(aggregates.categories, [("1.0", 3)])
+        self.assertEqual(aggregates.cells, [
+            ("a", "1.0", 2), ("b", "1.0", 1), (None, "1.0", 1)])
+        self.assertEqual(aggregates.wip, [])
+
+    def test_wip(self):
+        """Limits are breached by more items than the limit."""
+        aggregates = compute_aggregates(
+            self.create_board(), {IN_PROGRESS: 1, OPEN: 1})
+        self.assertEqual(
+            [(w.status, w.count, w.breached) for w in aggregates.wip],
+            [(IN_PROGRESS, 2, True), (OPEN, 1, False)])
+
+
+class TestWriteAggregates(AggregatesMixin, TestCase):
+
+    def test_json(self):
+        """Aggregates are written as JSON."""
+        stream = StringIO()
+        write_aggregates(self.create_board(), stream, {OPEN: 0})
+        aggregates = json.loads(stream.getvalue())
+        self.assertEqual(aggregates["count"], 3)
+        self.assertEqual(aggregates["statuses"], {IN_PROGRESS: 2, OPEN: 1})
+        self.assertEqual(aggregates["cells"][2], {
+            "story": None, "category": "1.0", "count": 1})
+        self.assertEqual(aggregates["wip"], [{
+            "status": OPEN, "limit": 0, "count": 1, "breached": True}])
+
+
+class TestWritePrometheus(AggregatesMixin, TestCase):
+
+    def test_text(self):
+        """Aggregates are written as gauges labelled by group."""
+        stream = StringIO()
+        write_prometheus(self.create_board(), stream, {IN_PROGRESS: 1})
+        lines = stream.getvalue().splitlines()
+        self.assertTrue('jiraban_board_items{board="test"} 3' in lines)
+        self.assertTrue(
+            'jiraban_board_status_items{board="test",status="In Progress"} 2'
+            in lines)
+        self.assertTrue(
+            'jiraban_board_cell_items{board="test",story="",category="1.0"} 1'
+            in lines)
+        self.assertTrue(
+            'jiraban_board_wip_breached{board="test",status="In Progress"} 1'
+            in lines)
+
+    def test_no_wip(self):
+        """Limits are only written when there are some."""
+        stream = StringIO()
+        write_prometheus(self.create_board(), stream)
+        self.assertFalse("wip" in stream.getvalue())
+
+    def test_no_jinja(self):
+        """Jinja2 is not imported to write aggregates."""
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        output = subprocess.check_output([sys.executable, "-c", (
+            "import sys; import jiraban.aggregates; "
+            "print 'jinja2' in sys.modules")],
+            env=dict(os.environ, PYTHONPATH=root))
+        self.assertEqual(output.strip(), "False")
@@ -20,6 +20,7 @@ __all__ = []
 
 from jiraban.attribute import (
     Attribute,
+    AttributeType,
     get_attributes,
     )
 from jiraban.properties import String
@@ -82,3 +83,67 @@ class TestGetAttributes(TestCase):
         old_attributes = get_attributes(Class)
         new_attributes = get_attributes(Class)
         self.assertEqual(old_attributes, new_attributes)
+
+
+class TestAttributeType(TestCase):
+
+    def test_register(self):
+        """
+        Attributes are registered when a class using the L{AttributeType}
+        metaclass is defined.
+        """
+        class Class:
+            __metaclass__ = AttributeType
+            attr = String()
+
+        self.assertTrue("__attributes__" in Class.__dict__)
+        self.assertEqual(Class.__dict__["__attributes__"].keys(), ["attr"])
+        self.assertTrue(get_attributes(Class)["attr"] is Class.attr)
+
+    def test_register_subclass(self):
+        """
+        Attributes of a subclass include the attributes of its base
+        classes, bound to the subclass.
+        """
+        class Class:
+            __metaclass__ = AttributeType
+            attr1 = String()
+
+        class SubClass(Class):
+            attr2 = String()
+
+        attributes = get_attributes(SubClass)
+        self.assertEqual(sorted(attributes), ["attr1", "attr2"])
+        self.assertEqual(attributes["attr1"].cls, SubClass)
+        self.assertEqual(get_attributes(Class)["attr1"].cls, Class)
+
+    def test_register_unregistered_base(self):
+        """
+        Attributes of base classes without the L{AttributeType}
+        metaclass are also registered.
+        """
+        class Class(object):
+            attr1 = String()
+
+        class SubClass(Class):
+            __metaclass__ = AttributeType
+            attr2 = String()
+
+        attributes = get_attributes(SubClass)
+        self.assertEqual(sorted(attributes), ["attr1", "attr2"])
+        self.assertEqual(attributes["attr1"].cls, SubClass)
+
+    def test_set_name(self):
+        """Values in the class namespace are told their name."""
+        names = []
+
+        class Value:
+
+            def __set_name__(self, cls, name):
+                names.append(name)
+
+        class Class:
+            __metaclass__ = AttributeType
+            value = Value()
+
+        self.assertEqual(names, ["value"])
@@ -90,6 +90,12 @@ class TestItem(ItemMixin, UniqueMixin, TestCase):
         self.assertEqual(item.components, [component])
         self.assertEqual(item.fix_versions, [fix_version])
 
+    def test_instantiate_without_optional_values(self):
+        """Optional values that are not given don't create variables."""
+        item = self.create_item()
+        self.assertFalse("assignee" in item.__dict__)
+        self.assertFalse("username" in item.__dict__)
+
     def test_sort_order_by_priority(self):
         """Higher priority items come first."""
         items = [
@@ -157,6 +163,38 @@ class ItemCollectionMixin(ItemMixin):
             ]
         self.assertEqual(collections, sorted(collections))
 
+    def test_top(self):
+        """The top items are the first items in sort order."""
+        collection = self.create_item_collection()
+        items = [
+            self.create_item(id="3"),
+            self.create_item(id="1", priority=MINOR),
+            self.create_item(id="2"),
+            ]
+        for item in items:
+            collection.add(item)
+        self.assertEqual(collection.top(2), [items[2], items[0]])
+        self.assertEqual(collection.count_more(2), 1)
+
+    def test_top_without_limit(self):
+        """Without a limit, the top items are all the items."""
+        collection = self.create_item_collection()
+        item = self.create_item()
+        collection.add(item)
+        self.assertEqual(collection.top(), [item])
+        self.assertEqual(collection.top(10), [item])
+        self.assertEqual(collection.count_more(), 0)
+        self.assertEqual(collection.count_more(10), 0)
+
+    def test_count_by(self):
+        """Items are counted by the value of each attribute."""
+        collection = self.create_item_collection()
+        collection.add(self.create_item(id="1"))
+        collection.add(self.create_item(id="2", priority=MINOR))
+        self.assertEqual(
+            collection.count_by("priority", "id"),
+            [{MAJOR: 1, MINOR: 1}, {"1": 1, "2": 1}])
+
     def test_add(self):
         """Adding items affect the length of the collection."""
         collection = self.create_item_collection()
@@ -167,6 +205,17 @@ class ItemCollectionMixin(ItemMixin):
         self.assertEqual(len(collection), 1)
         self.assertEqual(list(collection), [item])
 
+    def test_remove(self):
+        """Removing an item only removes that instance."""
+        collection = self.create_item_collection()
+        item = self.create_item()
+        other_item = self.create_item()
+        collection.add(item)
+        collection.add(other_item)
+        collection.remove(other_item)
+        self.assertEqual(len(collection), 1)
+        self.assertTrue(list(collection)[0] is item)
+
 
 class TestGroupCollection(ItemMixin, TestCase):
 
@@ -205,6 +254,15 @@ class TestGroupCollection(ItemMixin, TestCase):
         self.assertEqual(len(item_collection), 1)
         self.assertEqual(list(item_collection), [item])
 
+    def test_remove(self):
+        """Groups left empty when removing items are dropped."""
+        collection = GroupCollection(ItemCollection, "priority")
+        item = self.create_item(priority=MAJOR)
+        collection.add(item)
+        collection.add(self.create_item(priority=MINOR))
+        collection.remove(item)
+        self.assertEqual([c.name for c in collection], [MINOR])
+
 
 class TestCategory(ItemCollectionMixin, TestCase):
 
@@ -257,3 +315,16 @@ class TestBoard(TestStory, TestCase):
         board.add(self.create_item(status=OPEN))
         board.add(self.create_item(status=OPEN))
         self.assertEqual(len(board.stories), 1)
+
+    def test_remove_from_stories(self):
+        """Items removed from a L{Board} are removed from all groups."""
+        board = self.create_item_collection()
+        item = self.create_item(
+            components=["a", "b"], fix_versions=["1.0"], assignee=u"x")
+        board.add(item)
+        board.add(self.create_item(components=["a"]))
+        board.remove(item)
+        self.assertEqual(len(board), 1)
+        self.assertEqual([s.name for s in board.stories], ["a"])
+        self.assertEqual([c.name for c in board.categories], [None])
+        self.assertEqual([i.name for i in board.identities], [None])
@@ -0,0 +1,181 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+import os
+import shutil
+import tempfile
+
+from textwrap import dedent
+from unittest import TestCase
+
+from jiraban.config import (
+    ConfigError,
+    load_config,
+    )
+
+
+class TestLoadConfig(TestCase):
+
+    defaults = {
+        "category": "fix_versions",
+        "story": "components",
+        "identity": "assignee",
+        "format": "html",
+        }
+
+    def setUp(self):
+        super(TestLoadConfig, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "boards.ini")
+
+    def tearDown(self):
+        super(TestLoadConfig, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def load_config(self, content, **defaults):
+        with open(self.path, "w") as f:
+            f.write(dedent(content))
+        return load_config(self.path, **dict(self.defaults, **defaults))
+
+    def test_boards(self):
+        """Each board section declares a board, in order."""
+        boards = self.load_config("""
+            [board:b]
+            jql = project = B
+            output = b.html
+
+            [other]
+            output = other.html
+
+            [board:a]
+            assignee = x, y
+            output = a.json
+            format = json
+            limit = 5
+            search = yes
+            """)
+        self.assertEqual([b.name for b in boards], ["b", "a"])
+        self.assertEqual(boards[0].jql, "project = B")
+        self.assertEqual(boards[0].format, "html")
+        self.assertEqual(boards[0].limit, None)
+        self.assertFalse(boards[0].search)
+        self.assertEqual(
+            boards[1].jql,
+            "(assignee = x OR assignee = y) AND resolution = unresolved")
+        self.assertEqual(boards[1].format, "json")
+        self.assertEqual(boards[1].limit, 5)
+        self.assertTrue(boards[1].search)
+
+    def test_defaults(self):
+        """Options default to the DEFAULT section, then to the defaults."""
+        [board] = self.load_config("""
+            [DEFAULT]
+            story = status
+
+            [board:a]
+            output = a.html
+            """, limit=3)
+        self.assertEqual(board.story, "status")
+        self.assertEqual(board.category, "fix_versions")
+        self.assertEqual(board.limit, 3)
+
+    def test_wip_limits(self):
+        """WIP limits default to those given, unless in the section."""
+        boards = self.load_config("""
+            [board:a]
+            output = a.prom
+            format = prometheus
+            wip_limit = In Progress=2, Open=5
+
+            [board:b]
+            output = b.prom
+            format = prometheus
+            """, wip_limits={"Open": 1})
+        self.assertEqual(boards[0].wip_limits, {"In Progress": 2, "Open": 5})
+        self.assertEqual(boards[1].wip_limits, {"Open": 1})
+
+    def test_compress(self):
+        """Compressions default to those given, unless in the section."""
+        boards = self.load_config("""
+            [board:a]
+            output = a.html
+            compress = gzip, bz2
+
+            [board:b]
+            output = b.html
+            """, compress=["gzip"])
+        self.assertEqual(boards[0].compress, ["gzip", "bz2"])
+        self.assertEqual(boards[1].compress, ["gzip"])
+
+    def test_invalid_compress(self):
+        """Compressions must be known."""
+        self.assertRaises(ConfigError, self.load_config, """
+            [board:a]
+            output = a.html
+            compress = unknown
+            """)
+
+    def test_invalid_wip_limit(self):
+        """WIP limits must be on known statuses."""
+        self.assertRaises(ConfigError, self.load_config, """
+            [board:a]
+            output = a.prom
+            wip_limit = Unknown=1
+            """)
+
+    def test_missing_output(self):
+        """Boards must have an output."""
+        self.assertRaises(ConfigError, self.load_config, """
+            [board:a]
+            jql = project = A
+            """)
+
+    def test_standard_output(self):
+        """Boards can't be written to the standard output."""
+        self.assertRaises(ConfigError, self.load_config, """
+            [board:a]
+            output = -
+            """)
+
+    def test_invalid_attribute(self):
+        """Grouping options must be attributes of items."""
+        self.assertRaises(ConfigError, self.load_config, """
+            [board:a]
+            output = a.html
+            story = unknown
+            """)
+
+    def test_invalid_filters(self):
+        """JQL can't be combined with other filters."""
+        self.assertRaises(ConfigError, self.load_config, """
+            [board:a]
+            output = a.html
+            jql = project = A
+            component = a
+            """)
+
+    def test_no_boards(self):
+        """Config files must declare boards."""
+        self.assertRaises(ConfigError, self.load_config, "[other]\n")
+
+    def test_missing_file(self):
+        """Missing config files raise an error."""
+        self.assertRaises(
+            ConfigError, load_config, os.path.join(self.directory, "none"))
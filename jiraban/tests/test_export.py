@@ -0,0 +1,121 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+import json
+import os
+import subprocess
+import sys
+
+from cStringIO import StringIO
+from unittest import TestCase
+
+from jiraban.board import (
+    MAJOR,
+    OPEN,
+    Board,
+    )
+from jiraban.export import (
+    write_csv,
+    write_json,
+    )
+from jiraban.tests.test_board import ItemMixin
+
+
+class ExportMixin(ItemMixin):
+
+    def create_board(self):
+        board = Board("test", "link")
+        for id, summary in ("1", u"summary \xe9"), ("2", u"summary"):
+            board.add(self.create_item(
+                id, link="link-%s" % id, summary=summary,
+                assignee=u"assignee", components=["a"],
+                fix_versions=["1.0"]))
+        return board
+
+
+class TestWriteJSON(ExportMixin, TestCase):
+
+    def test_board(self):
+        """The board is written with its groups, cells and items."""
+        stream = StringIO()
+        write_json(self.create_board(), stream)
+        data = json.loads(stream.getvalue())
+        self.assertEqual(data["name"], "test")
+        self.assertEqual(data["link"], "link")
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["categories"], [{"name": "1.0", "count": 2}])
+        self.assertEqual(
+            data["identities"], [{"name": "assignee", "count": 2}])
+
+        [story] = data["stories"]
+        self.assertEqual((story["name"], story["count"]), ("a", 2))
+        [cell] = story["cells"]
+        self.assertEqual((cell["category"], cell["count"]), ("1.0", 2))
+        self.assertEqual(cell["items"][0], {
+            "id": "1", "link": "link-1", "priority": MAJOR, "status": OPEN,
+            "assignee": "assignee", "summary": u"summary \xe9"})
+
+    def test_cell_limit(self):
+        """The count of a cell includes the items beyond the limit."""
+        stream = StringIO()
+        write_json(self.create_board(), stream, cell_limit=1)
+        cell = json.loads(stream.getvalue())["stories"][0]["cells"][0]
+        self.assertEqual(cell["count"], 2)
+        self.assertEqual(len(cell["items"]), 1)
+
+    def test_compact(self):
+        """Compact items are positions in a table of strings."""
+        stream = StringIO()
+        write_json(self.create_board(), stream, compact=True)
+        data = json.loads(stream.getvalue())
+        strings = data["strings"]
+        items = data["stories"][0]["cells"][0]["items"]
+        self.assertEqual(
+            [dict(zip(data["fields"], [strings[i] for i in item]))["id"]
+             for item in items],
+            ["1", "2"])
+        self.assertEqual(len(strings), len(set(strings)))
+
+
+class TestWriteCSV(ExportMixin, TestCase):
+
+    def test_board(self):
+        """Each item of each cell is written as a row."""
+        stream = StringIO()
+        write_csv(self.create_board(), stream)
+        self.assertEqual(stream.getvalue().splitlines(), [
+            "story,category,id,link,priority,status,assignee,summary",
+            "a,1.0,1,link-1,Major,Open,assignee,summary \xc3\xa9",
+            "a,1.0,2,link-2,Major,Open,assignee,summary",
+            ])
+
+
+class TestImports(TestCase):
+
+    def test_no_jinja(self):
+        """Exporting a board doesn't import Jinja."""
+        path = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        output = subprocess.Popen([
+            sys.executable, "-c",
+            "import sys; import jiraban.export; "
+            "print 'jinja2' in sys.modules"],
+            cwd=path, stdout=subprocess.PIPE).communicate()[0]
+        self.assertEqual(output.strip(), "False")
@@ -27,13 +27,31 @@ from jiraban.board import (
     Board,
     )
 from jiraban.html import (
+    FragmentCache,
+    compile_templates,
+    create_environment,
+    generate_html,
+    get_environment,
+    get_story_pages,
+    get_templates_stamp,
+    get_variant_directory,
+    is_compiled,
     priority_style,
     sprite_url,
     status_style,
-    generate_html,
+    write_html,
+    write_site,
     )
+from jiraban.model import Row
+from jiraban.tests.test_board import ItemMixin
 from jiraban.tests.test_jira import JIRAMixin
 
+import os
+import shutil
+import tempfile
+
+from cStringIO import StringIO
+
 from unittest import TestCase
 
 
@@ -76,10 +94,301 @@ class TestSpriteUrl(JIRAMixin, TestCase):
             sprite_url("test.gif", jira), "data:image/gif;base64,")
 
 
-class TestGenerateHTML(JIRAMixin, TestCase):
+class TestEnvironment(JIRAMixin, TestCase):
+
+    def setUp(self):
+        super(TestEnvironment, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(TestEnvironment, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def test_get_environment_twice(self):
+        """Environments are expensive to create so they are shared."""
+        self.assertTrue(get_environment() is get_environment())
+
+    def test_cache_directory(self):
+        """The bytecode of templates is cached in the cache directory."""
+        environment = create_environment(cache_directory=self.directory)
+        generate_html(Board("test"), self.create_jira(), None, environment)
+        self.assertNotEqual(os.listdir(self.directory), [])
+
+    def test_compiled_directory(self):
+        """Templates can be compiled into modules and loaded from there."""
+        compiled_directory = os.path.join(self.directory, "compiled")
+        compile_templates(compiled_directory)
+        environment = create_environment(
+            compiled_directory=compiled_directory)
+        html = generate_html(
+            Board("test"), self.create_jira(), None, environment)
+        self.assertTrue("<title>test</title>" in html)
+
+    def test_minify_cache_directory(self):
+        """Minified templates don't share their bytecode with the others
+        in the same cache directory."""
+        board = Board("test")
+        jira = self.create_jira()
+        html = generate_html(board, jira, None, create_environment(
+            cache_directory=self.directory, minify=True))
+        self.assertFalse("\n " in html)
+        html = generate_html(board, jira, None, create_environment(
+            cache_directory=self.directory))
+        self.assertTrue("\n " in html)
+        self.assertEqual(
+            sorted(os.listdir(self.directory)), ["minify", "plain"])
+
+    def test_minify_compiled_directory(self):
+        """Minified templates are compiled apart from the others."""
+        compile_templates(self.directory, minify=True)
+        self.assertEqual(os.listdir(self.directory), ["minify"])
+        self.assertNotEqual(os.listdir(
+            get_variant_directory(self.directory, True)), [])
+
+    def test_templates_stamp(self):
+        """The stamp of the templates depends on the compile options."""
+        self.assertEqual(get_templates_stamp(), get_templates_stamp())
+        self.assertNotEqual(
+            get_templates_stamp(), get_templates_stamp(minify=True))
+
+    def test_is_compiled(self):
+        """Compiled templates are up to date until their stamp differs."""
+        self.assertFalse(is_compiled(self.directory))
+        compile_templates(self.directory)
+        self.assertTrue(is_compiled(self.directory))
+        self.assertFalse(is_compiled(self.directory, minify=True))
+        stamp_path = os.path.join(
+            get_variant_directory(self.directory), "templates.stamp")
+        with open(stamp_path, "w") as f:
+            f.write("stale\n")
+        self.assertFalse(is_compiled(self.directory))
+
+    def test_get_environment_compiles(self):
+        """Stale compiled templates are compiled again."""
+        compile_templates(self.directory)
+        stamp_path = os.path.join(
+            get_variant_directory(self.directory), "templates.stamp")
+        with open(stamp_path, "w") as f:
+            f.write("stale\n")
+        environment = get_environment(compiled_directory=self.directory)
+        self.assertTrue(is_compiled(self.directory))
+        html = generate_html(
+            Board("test"), self.create_jira(), None, environment)
+        self.assertTrue("<title>test</title>" in html)
+
+
+class TestGenerateHTML(ItemMixin, JIRAMixin, TestCase):
 
     def test_empty_board(self):
         jira = self.create_jira()
         board = Board("test")
         html = generate_html(board, jira)
         self.assertTrue("<title>test</title>" in html)
+
+    def test_identity_class(self):
+        """Tiles reference the color of their identity with a CSS class."""
+        jira = self.create_jira()
+        board = Board("test")
+        board.add(self.create_item("1", assignee=u"assignee"))
+        html = generate_html(board, jira)
+        self.assertTrue('<div class="tile identity-0">' in html)
+        self.assertTrue(".identity-0 { background: #" in html)
+        self.assertFalse('style="background' in html)
+
+    def test_minify(self):
+        """Minified HTML has no indentation."""
+        jira = self.create_jira()
+        environment = create_environment(minify=True)
+        html = generate_html(Board("test"), jira, None, environment)
+        self.assertTrue("<title>test</title>" in html)
+        self.assertFalse("\n " in html)
+
+    def test_cell_limit(self):
+        """Items beyond the cell limit are only counted."""
+        jira = self.create_jira()
+        board = Board("test")
+        for id in "1", "2", "3":
+            board.add(self.create_item(id))
+        html = generate_html(board, jira, cell_limit=2)
+        self.assertTrue(">1</a>" in html)
+        self.assertTrue(">2</a>" in html)
+        self.assertFalse(">3</a>" in html)
+        self.assertTrue("+1 more" in html)
+
+    def test_stale(self):
+        """Stale boards are marked as such in the footer."""
+        jira = self.create_jira()
+        html = generate_html(Board("test"), jira)
+        self.assertFalse('class="stale"' in html)
+        html = generate_html(Board("test"), jira, stale=True)
+        self.assertTrue('class="stale"' in html)
+
+    def test_search(self):
+        """A search index and script are only embedded when asked."""
+        jira = self.create_jira()
+        board = Board("test")
+        board.add(self.create_item("1", summary=u"</script>"))
+        html = generate_html(board, jira)
+        self.assertFalse("search-index" in html)
+        self.assertFalse("data-id" in html)
+
+        html = generate_html(board, jira, search=True)
+        self.assertTrue('<script type="application/json" id="search-index">'
+            in html)
+        self.assertTrue('data-id="1"' in html)
+        self.assertEqual(html.count("</script>"), 2)
+
+
+class WriteStream:
+
+    def __init__(self):
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(data)
+
+
+class TestWriteHTML(JIRAMixin, TestCase):
+
+    def test_empty_board(self):
+        """The written HTML is the same as the generated HTML, encoded."""
+        jira = self.create_jira()
+        board = Board(u"test \xe9")
+        stream = StringIO()
+        write_html(board, jira, stream)
+        html = generate_html(board, jira)
+        self.assertEqual(
+            stream.getvalue().split("Generated on")[0],
+            html.encode("utf-8").split("Generated on")[0])
+
+    def test_buffer_size(self):
+        """The HTML is written in chunks of about the buffer size."""
+        stream = WriteStream()
+        write_html(Board("test"), self.create_jira(), stream, buffer_size=100)
+        self.assertTrue(len(stream.writes) > 1)
+        for data in stream.writes[:-1]:
+            self.assertTrue(len(data) >= 100)
+
+
+class TestWriteSite(ItemMixin, JIRAMixin, TestCase):
+
+    def setUp(self):
+        super(TestWriteSite, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(TestWriteSite, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def create_board(self):
+        board = Board("test")
+        for id, component in ("1", "a"), ("2", "b"), ("3", None):
+            board.add(self.create_item(
+                id, components=[component] if component else None))
+        return board
+
+    def test_pages(self):
+        """The site has an index page and a page per story."""
+        index_path = write_site(
+            self.create_board(), self.create_jira(), self.directory)
+        self.assertEqual(
+            index_path, os.path.join(self.directory, "index.html"))
+        self.assertEqual(sorted(os.listdir(self.directory)), [
+            "assets", "index.html", "story-a.html", "story-b.html",
+            "story-uncategorized.html"])
+
+        with open(index_path) as f:
+            index = f.read()
+        self.assertTrue('<a href="story-a.html">a</a>' in index)
+
+        with open(os.path.join(self.directory, "story-b.html")) as f:
+            story = f.read()
+        self.assertTrue(">2</a>" in story)
+        self.assertFalse(">1</a>" in story)
+        self.assertFalse("<style" in story)
+
+    def test_assets(self):
+        """Assets are shared and named after a hash of their content."""
+        write_site(self.create_board(), self.create_jira(), self.directory)
+        assets = os.listdir(os.path.join(self.directory, "assets"))
+        stylesheets = [a for a in assets if a.endswith(".css")]
+        self.assertEqual(len(stylesheets), 1)
+        self.assertTrue(stylesheets[0].startswith("style-"))
+
+        stylesheet = "assets/%s" % stylesheets[0]
+        for page in "index.html", "story-a.html":
+            with open(os.path.join(self.directory, page)) as f:
+                self.assertTrue(stylesheet in f.read())
+
+    def test_remove_unused(self):
+        """Pages and assets of earlier sites are removed, other files
+        are left alone."""
+        write_site(self.create_board(), self.create_jira(), self.directory)
+        board = Board("other")
+        board.add(self.create_item(
+            "1", status=IN_PROGRESS, components=["c"]))
+        with open(os.path.join(self.directory, "other.html"), "w") as f:
+            f.write("other")
+        old_asset = os.path.join(self.directory, "assets", "style-old.css")
+        with open(old_asset, "w") as f:
+            f.write("old")
+        write_site(board, self.create_jira(), self.directory)
+        self.assertEqual(sorted(os.listdir(self.directory)), [
+            "assets", "index.html", "other.html", "story-c.html"])
+        assets = os.listdir(os.path.join(self.directory, "assets"))
+        self.assertEqual(len(assets), 2)
+        self.assertFalse(os.path.exists(old_asset))
+
+
+class TestGetStoryPages(TestCase):
+
+    def test_unique(self):
+        """Stories with the same page name get a unique one each."""
+        rows = [Row(name, 0, []) for name in u"x", u"x 2", u"x!", None]
+        self.assertEqual(get_story_pages(rows), [
+            "story-x.html", "story-x-2.html", "story-x-3.html",
+            "story-uncategorized.html"])
+
+
+class TestFragmentCache(ItemMixin, JIRAMixin, TestCase):
+
+    def test_same_board(self):
+        """Rendering the same board again only uses cached fragments."""
+        jira = self.create_jira()
+        board = Board("test")
+        board.add(self.create_item("1", components=["a"]))
+        board.add(self.create_item("2", components=["b"]))
+        cache = FragmentCache()
+        html = generate_html(board, jira, fragment_cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+        self.assertEqual(
+            generate_html(board, jira, fragment_cache=cache), html)
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+
+    def test_changed_board(self):
+        """Only the fragments that changed are rendered again."""
+        jira = self.create_jira()
+        board = Board("test")
+        board.add(self.create_item("1", components=["a"]))
+        board.add(self.create_item("2", components=["b"]))
+        cache = FragmentCache()
+        generate_html(board, jira, fragment_cache=cache)
+
+        # The row of story "a" is the only fragment that didn't change,
+        # the legend changes with the item count.
+        board.add(self.create_item("3", components=["b"]))
+        html = generate_html(board, jira, fragment_cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 5))
+        self.assertTrue(">3</a>" in html)
+
+    def test_rotate(self):
+        """Fragments not rendered since the last rotation are forgotten."""
+        environment = get_environment()
+        cache = FragmentCache()
+        context = {"legend": None, "cell_count": 0}
+        cache.render(environment, "legend.html", context)
+        cache.rotate()
+        cache.rotate()
+        cache.render(environment, "legend.html", context)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
@@ -22,14 +22,39 @@ from jiraban.jira import (
     JIRA,
     JIRAError,
     JIRALink,
+    REQUESTS,
+    RESPONSE_BYTES,
+    filters_to_jql,
     )
+from jiraban.timings import Timings
 from jiraban.testing.unique import UniqueMixin
 
 from cStringIO import StringIO
+from requests import Timeout
 from requests.models import Response
+from time import time
 from unittest import TestCase
 
 
+ITEMS_XML = """\
+<rss version="0.92">
+  <channel>
+    <item>
+      <link>http://localhost/browse/TEST-1</link>
+      <key>TEST-1</key>
+      <summary>Summary</summary>
+      <project>Test</project>
+      <priority>Major</priority>
+      <status>Open</status>
+      <assignee username="user">User</assignee>
+      <updated>Mon, 1 Jul 2013 10:00:00 -0400</updated>
+      <component>component</component>
+    </item>
+  </channel>
+</rss>
+"""
+
+
 def fake_session_factory(content, status_code):
     def fake_session():
         return FakeSession(content, status_code)
@@ -39,11 +64,16 @@ def fake_session_factory(content, status_code):
 
 class FakeSession:
 
-    def __init__(self, content="", status_code=200):
+    def __init__(self, content="", status_code=200, error=None):
         self.content = content
         self.status_code = status_code
+        self.error = error
+        self.timeout = None
 
-    def get(self, url):
+    def get(self, url, timeout=None, stream=False):
+        self.timeout = timeout
+        if self.error is not None:
+            raise self.error
         response = Response()
         response.raw = StringIO(self.content)
         response.status_code = self.status_code
@@ -77,15 +107,60 @@ class TestJIRALink(JIRAMixin, UniqueMixin, TestCase):
         """
         string = self.get_unique_string()
         session = FakeSession(string)
-        link = JIRALink(session, self.get_unique_url())
+        link = JIRALink(lambda: session, self.get_unique_url())
         self.assertEqual(link.read(), string)
 
+    def test_read_timings(self):
+        """
+        A link counts its requests and bytes in its timings.
+        """
+        timings = Timings()
+        session = FakeSession("content")
+        link = JIRALink(
+            lambda: session, self.get_unique_url(), timings=timings)
+        link.read()
+        self.assertEqual(timings.counters["requests"], 1)
+        self.assertEqual(timings.counters["bytes"], 7)
+        self.assertTrue(timings.counters["request_seconds"] >= 0)
+
+    def test_read_metrics(self):
+        """
+        A link reports its requests and bytes in the metrics.
+        """
+        requests = REQUESTS.labels("ok")
+        count, size = requests.value, RESPONSE_BYTES.labels().value
+        session = FakeSession("content")
+        JIRALink(lambda: session, self.get_unique_url()).read()
+        self.assertEqual(requests.value, count + 1)
+        self.assertEqual(RESPONSE_BYTES.labels().value, size + 7)
+
     def test_read_error(self):
         """
         A link that doesn't return 200 raises an exception.
         """
         session = FakeSession(status_code=404)
-        link = JIRALink(session, self.get_unique_url())
+        link = JIRALink(lambda: session, self.get_unique_url())
+        self.assertRaises(JIRAError, link.read)
+
+    def test_read_timeout(self):
+        """
+        A link is read with its timeout, and timing out raises an exception.
+        """
+        session = FakeSession(error=Timeout())
+        link = JIRALink(lambda: session, self.get_unique_url(), 5)
+        self.assertRaises(JIRAError, link.read)
+        self.assertEqual(session.timeout, 5)
+
+    def test_read_deadline(self):
+        """
+        A link is read within its deadline, and not at all past it.
+        """
+        session = FakeSession("content")
+        link = JIRALink(lambda: session, self.get_unique_url(), 5, time() + 1)
+        self.assertEqual(link.read(), "content")
+        self.assertTrue(session.timeout <= 1)
+
+        link = JIRALink(lambda: session, self.get_unique_url(), 5, time() - 1)
         self.assertRaises(JIRAError, link.read)
 
 
@@ -99,6 +174,16 @@ class TestJIRA(JIRAMixin, UniqueMixin, TestCase):
         icon = jira.get_icon("foo")
         self.assertEqual(icon.url, "http://localhost/images/icons/foo.gif")
 
+    def test_read_icon(self):
+        """
+        Icons are only read once.
+        """
+        jira = self.create_jira(session_content="icon")
+        self.assertEqual(jira.read_icon("foo"), "icon")
+        jira._get_session().content = "other"
+        self.assertEqual(jira.read_icon("foo"), "icon")
+        self.assertEqual(jira.read_icon("bar"), "other")
+
     def test_xml_query(self):
         """
         XML queries contains jqlQuery in the query string.
@@ -137,3 +222,104 @@ class TestJIRA(JIRAMixin, UniqueMixin, TestCase):
         html_link = jira.query_html("", False, False)
         self.assertTrue("runQuery=False" in html_link.url)
         self.assertTrue("clear=False" in html_link.url)
+
+    def test_xml_fields(self):
+        """
+        XML queries can request only some fields of items.
+        """
+        jira = self.create_jira()
+        xml_link = jira.query_xml("", fields=["key", "updated"])
+        self.assertTrue("field=key&field=updated" in xml_link.url)
+
+    def test_iter_items(self):
+        """
+        Items are created from the XML of a query.
+        """
+        jira = self.create_jira(session_content=ITEMS_XML)
+        [item] = list(jira.iter_items(""))
+        self.assertEqual(item.id, "TEST-1")
+        self.assertEqual(item.components, ["component"])
+        self.assertEqual(item.updated, "Mon, 1 Jul 2013 10:00:00 -0400")
+
+    def test_iter_items_lazy(self):
+        """
+        Without timings, each item is only created when iterated to.
+        """
+        content = ITEMS_XML.replace("</channel>", "<item /></channel>")
+        jira = self.create_jira(session_content=content)
+        items = jira.iter_items("")
+        self.assertEqual(items.next().id, "TEST-1")
+        self.assertRaises(AttributeError, items.next)
+
+    def test_iter_items_timings(self):
+        """
+        Fetching, parsing and creating items are timed as phases.
+        """
+        jira = self.create_jira(session_content=ITEMS_XML)
+        jira.timings = Timings()
+        list(jira.iter_items(""))
+        self.assertEqual(
+            sorted(jira.timings.phases), ["fetch", "items", "parse"])
+        self.assertEqual(jira.timings.counters["requests"], 1)
+
+    def test_iter_updates(self):
+        """
+        Updates are the key and update time of each item.
+        """
+        jira = self.create_jira(session_content=ITEMS_XML)
+        self.assertEqual(
+            list(jira.iter_updates("")),
+            [("TEST-1", "Mon, 1 Jul 2013 10:00:00 -0400")])
+
+    def test_iter_updates_error(self):
+        """
+        Invalid XML raises an exception.
+        """
+        jira = self.create_jira(session_content="<rss>")
+        self.assertRaises(JIRAError, list, jira.iter_updates(""))
+
+    def test_time_limit(self):
+        """
+        Links get the deadline of the time limit they are created in.
+        """
+        jira = self.create_jira()
+        self.assertEqual(jira.get_link("/").deadline, None)
+        with jira.time_limit(10):
+            deadline = jira.get_link("/").deadline
+            self.assertTrue(time() < deadline <= time() + 10)
+        self.assertEqual(jira.get_link("/").deadline, None)
+
+    def test_nested_time_limit(self):
+        """
+        Nested time limits keep the earlier deadline and restore the
+        outer one on exit.
+        """
+        jira = self.create_jira()
+        with jira.time_limit(10):
+            outer = jira.get_link("/").deadline
+            with jira.time_limit(100):
+                self.assertEqual(jira.get_link("/").deadline, outer)
+            with jira.time_limit(None):
+                self.assertEqual(jira.get_link("/").deadline, outer)
+            with jira.time_limit(1):
+                self.assertTrue(jira.get_link("/").deadline < outer)
+            self.assertEqual(jira.get_link("/").deadline, outer)
+        self.assertEqual(jira.get_link("/").deadline, None)
+
+
+class TestFiltersToJQL(TestCase):
+
+    def test_default(self):
+        """
+        Without filters, the unresolved items of the current user are used.
+        """
+        self.assertEqual(
+            filters_to_jql(),
+            "assignee = currentUser() AND resolution = unresolved")
+
+    def test_jql(self):
+        """
+        JQL is used as is, but not along with other filters.
+        """
+        self.assertEqual(filters_to_jql("project = A"), "project = A")
+        self.assertRaises(ValueError, filters_to_jql, "project = A", ["a"])
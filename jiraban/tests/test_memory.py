@@ -0,0 +1,130 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+import os
+
+from cStringIO import StringIO
+from unittest import (
+    TestCase,
+    skipUnless,
+    )
+
+from jiraban.board import Board
+from jiraban.memory import (
+    MemoryReport,
+    count_memberships,
+    )
+from jiraban.tests.test_board import ItemMixin
+from jiraban.timings import Timings
+
+
+class MemoryMixin(ItemMixin):
+
+    def create_board(self):
+        board = Board("test")
+        for id, components in (("1", ["a"]), ("2", ["a", "b"])):
+            board.add(self.create_item(
+                id, assignee=u"assignee", components=components))
+        return board
+
+
+class FakeMemoryReport(MemoryReport):
+    """Memory report of the memory set on it."""
+
+    memory = (None, None)
+
+    def get_memory(self):
+        return self.memory
+
+
+class TestCountMemberships(MemoryMixin, TestCase):
+
+    def test_empty(self):
+        """An empty board has no memberships."""
+        self.assertEqual(count_memberships(Board("test")), 0)
+
+    def test_memberships(self):
+        """Items count once per group they are in."""
+        board = self.create_board()
+        # The board, its category and identity, then the stories "a"
+        # and "b" with their category.
+        self.assertEqual(count_memberships(board), 2 + 2 + 2 + 2 * 2 + 1 * 2)
+
+
+class TestMemoryReport(MemoryMixin, TestCase):
+
+    def test_record(self):
+        """Each phase adds up its deltas, and keeps the memory after it
+        and the highest peak."""
+        memory = FakeMemoryReport()
+        memory.memory = (150, 200)
+        memory.record("board", 100)
+        self.assertEqual(memory.phases["board"], [50, 150, 200])
+        memory.memory = (120, 180)
+        memory.record("board", 150)
+        self.assertEqual(memory.phases["board"], [20, 120, 200])
+
+    def test_record_unknown(self):
+        """Systems without tracemalloc may not know the memory."""
+        memory = FakeMemoryReport()
+        memory.record("board", None)
+        self.assertEqual(memory.phases["board"], [0, None, None])
+
+    @skipUnless(
+        os.path.exists("/proc/self/statm"), "Resident memory is unknown.")
+    def test_resident_memory(self):
+        """Without tracemalloc, the memory is the resident memory."""
+        memory = MemoryReport()
+        memory.tracing = False
+        current, peak = memory.get_memory()
+        self.assertTrue(current > 0)
+        self.assertTrue(peak >= current)
+        self.assertEqual(memory.get_top_sites(), [])
+
+    def test_timings(self):
+        """Phases of L{Timings} are recorded."""
+        memory = MemoryReport()
+        timings = Timings(memory=memory)
+        with timings.phase("items"):
+            with timings.phase("parse"):
+                pass
+        self.assertEqual(sorted(memory.phases), ["items", "parse"])
+        self.assertEqual(memory.get_names(), ["parse", "items"])
+
+    def test_write_report(self):
+        """The report lists the phases and the bytes per item and per
+        group membership of the board."""
+        memory = FakeMemoryReport()
+        memory.phases = {"items": [4096, 8192, 8192], "board": [2400, 0, 0]}
+        stream = StringIO()
+        memory.write_report(stream, self.create_board(), top=0)
+        lines = stream.getvalue().splitlines()
+        self.assertTrue(lines[2].startswith("items "))
+        self.assertTrue(lines[3].startswith("board "))
+        self.assertIn("Bytes per item: 2048", lines)
+        self.assertIn("Bytes per group membership: 200", lines)
+
+    def test_write_report_without_board(self):
+        """Bytes per item are only reported with a board."""
+        memory = FakeMemoryReport()
+        memory.phases = {"items": [4096, 8192, 8192]}
+        stream = StringIO()
+        memory.write_report(stream, top=0)
+        self.assertNotIn("Bytes per item", stream.getvalue())
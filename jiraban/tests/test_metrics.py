@@ -0,0 +1,148 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+from jiraban.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    PrometheusTextfile,
+    Registry,
+    format_prometheus,
+    )
+
+
+class TestCounter(TestCase):
+
+    def test_inc(self):
+        """Counters are increased by one or by an amount."""
+        counter = Counter("test_total", "Test.")
+        counter.inc()
+        counter.inc(2)
+        self.assertEqual(counter.get_samples(), [("", [], 3)])
+
+    def test_labels(self):
+        """Counters with labels have a value per label values."""
+        counter = Counter("test_total", "Test.", ["cache", "result"])
+        counter.labels("icon", "hit").inc()
+        counter.labels("icon", "miss").inc()
+        counter.labels("icon", "hit").inc()
+        self.assertEqual(counter.get_samples(), [
+            ("", [("cache", "icon"), ("result", "hit")], 2),
+            ("", [("cache", "icon"), ("result", "miss")], 1),
+            ])
+
+    def test_labels_count(self):
+        """Label values must match the label names."""
+        counter = Counter("test_total", "Test.", ["cache"])
+        self.assertRaises(ValueError, counter.labels, "icon", "hit")
+
+
+class TestGauge(TestCase):
+
+    def test_set(self):
+        """Gauges have the last value set."""
+        gauge = Gauge("test", "Test.")
+        gauge.set(3)
+        gauge.set(2)
+        self.assertEqual(gauge.get_samples(), [("", [], 2)])
+
+
+class TestHistogram(TestCase):
+
+    def test_observe(self):
+        """Observations are counted in cumulative buckets."""
+        histogram = Histogram("test", "Test.", buckets=[1, 2])
+        for value in 0.5, 1, 1.5, 3:
+            histogram.observe(value)
+        self.assertEqual(histogram.get_samples(), [
+            ("_bucket", [("le", "1")], 2),
+            ("_bucket", [("le", "2")], 3),
+            ("_bucket", [("le", "+Inf")], 4),
+            ("_sum", [], 6.0),
+            ("_count", [], 4),
+            ])
+
+    def test_time(self):
+        """The seconds spent within the context are observed."""
+        histogram = Histogram("test", "Test.")
+        with histogram.time():
+            pass
+        self.assertEqual(histogram.get_samples()[-1], ("_count", [], 1))
+
+
+class TestRegistry(TestCase):
+
+    def test_register(self):
+        """Metrics are only registered once by name."""
+        registry = Registry()
+        counter = registry.counter("test_total", "Test.")
+        self.assertTrue(registry.counter("test_total", "Test.") is counter)
+        self.assertEqual(registry.get_metrics(), [counter])
+
+
+class TestFormatPrometheus(TestCase):
+
+    def test_format(self):
+        """Metrics are formatted in the Prometheus text format."""
+        registry = Registry()
+        registry.counter("b_total", "Counter.", ["name"]).labels(
+            'a "b"\n').inc()
+        registry.histogram("a_seconds", "Histogram.", buckets=[0.5]).observe(
+            1.0)
+        self.assertEqual(format_prometheus(registry), (
+            '# HELP a_seconds Histogram.\n'
+            '# TYPE a_seconds histogram\n'
+            'a_seconds_bucket{le="0.5"} 0\n'
+            'a_seconds_bucket{le="+Inf"} 1\n'
+            'a_seconds_sum 1.0\n'
+            'a_seconds_count 1\n'
+            '# HELP b_total Counter.\n'
+            '# TYPE b_total counter\n'
+            'b_total{name="a \\"b\\"\\n"} 1\n'))
+
+
+class TestPrometheusTextfile(TestCase):
+
+    def setUp(self):
+        super(TestPrometheusTextfile, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(TestPrometheusTextfile, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def test_write(self):
+        """The metrics are written to the file, replacing it."""
+        path = os.path.join(self.directory, "jiraban.prom")
+        registry = Registry()
+        registry.gauge("test", "Test.").set(1)
+        sink = PrometheusTextfile(path)
+        sink.write(registry)
+        registry.gauge("test", "Test.").set(2)
+        sink.write(registry)
+        self.assertEqual(os.listdir(self.directory), ["jiraban.prom"])
+        with open(path) as f:
+            self.assertTrue("\ntest 2\n" in f.read())
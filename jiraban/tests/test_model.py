@@ -0,0 +1,202 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+from jiraban.board import (
+    BLOCKER,
+    IN_PROGRESS,
+    MAJOR,
+    OPEN,
+    Board,
+    )
+from jiraban.model import (
+    SPRITES,
+    IdentityStyle,
+    SearchIndex,
+    StringTable,
+    Tile,
+    build_identity_styles,
+    build_render_model,
+    )
+from jiraban.palette import ColorMap
+from jiraban.tests.test_board import ItemMixin
+
+import json
+
+from unittest import TestCase
+
+
+class TestBuildRenderModel(ItemMixin, TestCase):
+
+    def test_empty_board(self):
+        """An empty board has no columns, rows or legends."""
+        model = build_render_model(Board("test", "link"))
+        self.assertEqual(model.name, "test")
+        self.assertEqual(model.link, "link")
+        self.assertEqual(model.count, 0)
+        self.assertEqual(model.cell_count, 0)
+        self.assertEqual(model.columns, [])
+        self.assertEqual(model.rows, [])
+        self.assertEqual(model.legends, [])
+        self.assertEqual(model.identity_styles, [])
+        self.assertEqual(model.sprites, SPRITES)
+        self.assertFalse(model.has_stories)
+
+    def test_cells(self):
+        """Each row has a cell per column with the tiles in sort order."""
+        board = Board("test")
+        board.add(self.create_item(
+            "1", components=["a"], fix_versions=["1.0"]))
+        board.add(self.create_item(
+            "2", priority=BLOCKER, components=["a"], fix_versions=["1.0"]))
+        board.add(self.create_item(
+            "3", components=["b"], fix_versions=["2.0"]))
+        model = build_render_model(board)
+
+        self.assertEqual(model.cell_count, 4)
+        self.assertEqual(
+            [(c.name, c.count, c.position) for c in model.columns],
+            [("1.0", 2, 0), ("2.0", 1, 2)])
+        self.assertTrue(model.has_stories)
+        self.assertEqual([r.name for r in model.rows], ["a", "b"])
+        self.assertEqual(
+            [[[t.id for t in c.tiles] for c in r.cells] for r in model.rows],
+            [[["2", "1"], []], [[], ["3"]]])
+
+    def test_cell_limit(self):
+        """Tiles beyond the cell limit are counted as more."""
+        board = Board("test")
+        for id in "1", "2", "3":
+            board.add(self.create_item(id))
+        cell = build_render_model(board, 2).rows[0].cells[0]
+        self.assertEqual([t.id for t in cell.tiles], ["1", "2"])
+        self.assertEqual(cell.more, 1)
+
+    def test_tile(self):
+        """Tiles have their colors and CSS classes resolved."""
+        board = Board("test")
+        board.add(self.create_item(
+            "1", link="link-1", status=IN_PROGRESS, summary=u"summary 1",
+            assignee=u"assignee"))
+        model = build_render_model(board)
+        tile = model.rows[0].cells[0].tiles[0]
+        self.assertEqual(tile.id, "1")
+        self.assertEqual(tile.link, "link-1")
+        self.assertEqual(tile.summary, u"summary 1")
+        self.assertEqual(tile.assignee, u"assignee")
+        self.assertEqual(
+            tile.identity_class, model.legends[0].identity_class)
+        self.assertEqual(tile.priority_class, "priority-major")
+        self.assertEqual(tile.status_class, "status-inprogress")
+
+    def test_legends(self):
+        """Each identity has a legend with a unique color."""
+        board = Board("test")
+        board.add(self.create_item("1", assignee=u"a"))
+        board.add(self.create_item("2", assignee=u"b"))
+        board.add(self.create_item("3", assignee=u"b"))
+        legends = build_render_model(board).legends
+        self.assertEqual(
+            [(l.name, l.count) for l in legends], [(u"a", 1), (u"b", 2)])
+        self.assertNotEqual(legends[0].color, legends[1].color)
+
+    def test_color_map(self):
+        """Identities keep their color from a color map."""
+        color_map = ColorMap()
+        color = color_map.get(u"b")
+        board = Board("test")
+        board.add(self.create_item("1", assignee=u"a"))
+        board.add(self.create_item("2", assignee=u"b"))
+        legends = build_render_model(board, color_map=color_map).legends
+        self.assertEqual(legends[1].color, color)
+        self.assertEqual(legends[0].color, color_map.get(u"a"))
+
+    def test_search_index(self):
+        """The search index has each tile once, only when asked."""
+        board = Board("test")
+        board.add(self.create_item("1", components=["a", "b"]))
+        board.add(self.create_item("2"))
+        self.assertEqual(build_render_model(board).search_index, None)
+        search_index = build_render_model(board, search=True).search_index
+        self.assertEqual(sorted(search_index.ids), ["1", "2"])
+
+
+class TestBuildIdentityStyles(TestCase):
+
+    def test_unique_colors(self):
+        """Identities with different colors have different classes."""
+        styles, classes = build_identity_styles({"a": "#000", "b": "#fff"})
+        self.assertEqual(styles, [
+            IdentityStyle("identity-0", "#000"),
+            IdentityStyle("identity-1", "#fff"),
+            ])
+        self.assertEqual(classes, {"a": "identity-0", "b": "identity-1"})
+
+    def test_same_colors(self):
+        """Identities with the same color share the same class."""
+        styles, classes = build_identity_styles({"a": "#000", "b": "#000"})
+        self.assertEqual(styles, [IdentityStyle("identity-0", "#000")])
+        self.assertEqual(classes, {"a": "identity-0", "b": "identity-0"})
+
+
+class TestStringTable(TestCase):
+
+    def test_get(self):
+        """Strings get their position in the table, once."""
+        table = StringTable()
+        self.assertEqual(
+            [table.get(u"a"), table.get(u"b"), table.get(u"a")], [0, 1, 0])
+        self.assertEqual(table.strings, [u"a", u"b"])
+
+
+class TestSearchIndex(TestCase):
+
+    def create_tile(self, id, summary, assignee=u"assignee"):
+        return Tile(
+            id, "link", summary, assignee, None, MAJOR, None, OPEN, None)
+
+    def test_add(self):
+        """Fields of tiles are positions in tables of strings."""
+        search_index = SearchIndex()
+        search_index.add(self.create_tile("1", u"summary", u"a"))
+        search_index.add(self.create_tile("2", u"summary", u"b"))
+        search_index.add(self.create_tile("3", u"summary", u"a"))
+        self.assertEqual(len(search_index), 3)
+        self.assertEqual(search_index.ids, ["1", "2", "3"])
+        self.assertEqual(
+            search_index.items, [[0, 0, 0], [1, 0, 0], [0, 0, 0]])
+        self.assertEqual(search_index.assignees.strings, [u"a", u"b"])
+
+    def test_terms(self):
+        """Words of summaries are lowercase terms of an inverted index."""
+        search_index = SearchIndex()
+        search_index.add(self.create_tile("1", u"Fix the parser, parser"))
+        search_index.add(self.create_tile("2", u"Parser crash \xe9t\xe9"))
+        self.assertEqual(search_index.terms, {
+            u"fix": [0], u"the": [0], u"parser": [0, 1], u"crash": [1],
+            u"\xe9t\xe9": [1]})
+
+    def test_to_json(self):
+        """The index is compact JSON that can't close a script element."""
+        search_index = SearchIndex()
+        search_index.add(self.create_tile("1", u"</script>"))
+        content = search_index.to_json()
+        self.assertFalse("</" in content)
+        self.assertFalse(", " in content)
+        self.assertEqual(json.loads(content)["terms"], {u"script": [0]})
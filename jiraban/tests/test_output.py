@@ -0,0 +1,130 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+import bz2
+import gzip
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+from jiraban.output import (
+    COMPRESSIONS,
+    UMASK,
+    AtomicFile,
+    OutputFiles,
+    get_umask,
+    )
+
+
+class OutputMixin:
+
+    def setUp(self):
+        super(OutputMixin, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "output")
+
+    def tearDown(self):
+        super(OutputMixin, self).tearDown()
+        shutil.rmtree(self.directory)
+
+
+class TestAtomicFile(OutputMixin, TestCase):
+
+    def test_commit(self):
+        """The path only exists once the file is committed."""
+        atomic_file = AtomicFile(self.path)
+        atomic_file.write("test")
+        self.assertFalse(os.path.exists(self.path))
+
+        atomic_file.commit()
+        self.assertEqual(os.listdir(self.directory), ["output"])
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "test")
+
+    def test_commit_replace(self):
+        """Committing a file replaces the existing path."""
+        with open(self.path, "w") as f:
+            f.write("old")
+
+        atomic_file = AtomicFile(self.path)
+        atomic_file.write("new")
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "old")
+
+        atomic_file.commit()
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "new")
+
+    def test_commit_mode(self):
+        """Committed files get the mode of new files, without changing
+        the umask of the process."""
+        atomic_file = AtomicFile(self.path)
+        atomic_file.commit()
+        self.assertEqual(os.stat(self.path).st_mode & 0777, 0666 & ~UMASK)
+        self.assertEqual(get_umask(), UMASK)
+
+    def test_discard(self):
+        """Discarding a file leaves nothing behind."""
+        atomic_file = AtomicFile(self.path)
+        atomic_file.write("test")
+        atomic_file.discard()
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class TestOutputFiles(OutputMixin, TestCase):
+
+    def test_compressions(self):
+        """Compressed copies of the content are written next to it."""
+        with OutputFiles(self.path, ["bz2", "gzip"]) as output_files:
+            output_files.write("test " * 100)
+            output_files.write("content")
+
+        content = "test " * 100 + "content"
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            ["output", "output.bz2", "output.gz"])
+        with open(self.path) as f:
+            self.assertEqual(f.read(), content)
+        self.assertEqual(gzip.open(self.path + ".gz").read(), content)
+        self.assertEqual(bz2.BZ2File(self.path + ".bz2").read(), content)
+
+    def test_xz(self):
+        """The xz compression is only available with lzma."""
+        try:
+            import lzma
+        except ImportError:
+            self.assertFalse("xz" in COMPRESSIONS)
+        else:
+            with OutputFiles(self.path, ["xz"]) as output_files:
+                output_files.write("content")
+            with lzma.open(self.path + ".xz") as f:
+                self.assertEqual(f.read(), "content")
+
+    def test_error(self):
+        """Nothing is written when an error happens."""
+        try:
+            with OutputFiles(self.path, ["gzip"]) as output_files:
+                output_files.write("content")
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+        self.assertEqual(os.listdir(self.directory), [])
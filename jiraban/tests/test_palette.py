@@ -0,0 +1,126 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+import os
+import shutil
+import tempfile
+
+from multiprocessing.pool import ThreadPool
+from unittest import TestCase
+
+from jiraban import palette as palette_module
+from jiraban.colors import html_colors
+from jiraban.palette import (
+    ColorMap,
+    get_palette,
+    palette_colors,
+    )
+
+
+class TestPaletteColors(TestCase):
+
+    def test_none(self):
+        """No colors returns an empty list."""
+        self.assertEqual(palette_colors(0), [])
+
+    def test_same_as_html_colors(self):
+        """The first colors are the same as html_colors."""
+        self.assertEqual(palette_colors(256), list(html_colors(256)))
+
+    def test_distinct(self):
+        """Colors of the palette only appear once."""
+        palette = get_palette()
+        self.assertTrue(len(palette) > 1000)
+        self.assertEqual(len(set(palette)), len(palette))
+
+    def test_threads(self):
+        """Threads getting the palette first all get the whole table."""
+        palette = get_palette()
+        palette_module._palette = None
+        pool = ThreadPool(8)
+        try:
+            palettes = pool.map(lambda i: get_palette(), range(8))
+        finally:
+            pool.close()
+            pool.join()
+        for other in palettes:
+            self.assertTrue(other is palettes[0])
+            self.assertEqual(other, palette)
+
+    def test_start_over(self):
+        """Colors start over when more are needed than in the palette."""
+        count = len(get_palette())
+        colors = palette_colors(count + 2)
+        self.assertEqual(colors[count:], colors[:2])
+
+
+class TestColorMap(TestCase):
+
+    def setUp(self):
+        super(TestColorMap, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "colors.json")
+
+    def tearDown(self):
+        super(TestColorMap, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def test_get(self):
+        """Names get the palette colors in order, once."""
+        color_map = ColorMap()
+        self.assertEqual(
+            [color_map.get(u"a"), color_map.get(u"b"), color_map.get(u"a")],
+            palette_colors(2) + palette_colors(1))
+        self.assertEqual(len(color_map), 2)
+
+    def test_none(self):
+        """Items without an identity also get a color."""
+        color_map = ColorMap()
+        self.assertEqual(color_map.get(None), palette_colors(1)[0])
+
+    def test_threads(self):
+        """Names get distinct colors when shared by threads."""
+        color_map = ColorMap()
+        names = [unicode(i) for i in range(len(palette_colors(50)))]
+        pool = ThreadPool(8)
+        try:
+            colors = pool.map(color_map.get, names)
+        finally:
+            pool.close()
+            pool.join()
+        self.assertEqual(sorted(colors), sorted(palette_colors(50)))
+
+    def test_save(self):
+        """Colors are kept across runs, new names get unused colors."""
+        color_map = ColorMap(self.path)
+        color_map.get(u"a")
+        color_map.get(u"b")
+        color_map.save()
+
+        color_map = ColorMap(self.path)
+        first, second, third = palette_colors(3)
+        self.assertEqual(color_map.get(u"c"), third)
+        self.assertEqual(color_map.get(u"b"), second)
+
+    def test_save_unchanged(self):
+        """The file is only written when colors were assigned."""
+        color_map = ColorMap(self.path)
+        color_map.save()
+        self.assertFalse(os.path.exists(self.path))
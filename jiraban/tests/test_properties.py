@@ -124,6 +124,24 @@ class TestProperty(TestCase):
         self.assertEqual(obj.prop2, 20)
         self.assertEqual(obj.prop3, 30)
 
+    def test_set_get_slot(self):
+        obj = self.SubClass()
+        obj.prop1 = 10
+        variable = get_variable(obj, self.SubClass.prop1)
+        self.assertTrue(obj.__dict__["prop1"] is variable)
+        self.assertEqual(variable.get(), 10)
+
+    def test_lazy(self):
+        obj = self.Class()
+        self.assertEqual(obj.prop1, None)
+        obj.prop2 = None
+        self.assertEqual(obj.prop2, None)
+        self.assertFalse("prop1" in obj.__dict__)
+        self.assertFalse("prop2" in obj.__dict__)
+
+        self.assertEqual(obj.prop3, 50)
+        self.assertTrue("prop3" in obj.__dict__)
+
     def test_set_get_explicitly(self):
         obj = self.Class()
         prop1 = self.Class.prop1
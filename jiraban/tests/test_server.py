@@ -0,0 +1,231 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+import sys
+
+from cStringIO import StringIO
+from httplib import HTTPConnection
+from threading import (
+    Event,
+    Thread,
+    )
+from time import sleep
+from unittest import TestCase
+
+from jiraban.server import (
+    BoardBuilder,
+    BoardHTTPServer,
+    BoardRequestHandler,
+    )
+
+
+class FakeBuild:
+    """Build returning the contents set on it, counting the builds."""
+
+    def __init__(self, body="board", stale_body="stale board"):
+        self.body = body
+        self.stale_body = stale_body
+        self.error = None
+        self.calls = 0
+        self.started = Event()
+        self.release = Event()
+        self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait()
+        if self.error is not None:
+            raise self.error
+        if self.body is None:
+            return None
+        return {"html": ("text/html", self.body, self.stale_body)}
+
+
+class QuietMixin:
+
+    def setUp(self):
+        super(QuietMixin, self).setUp()
+        self._real_stderr = sys.stderr
+        sys.stderr = StringIO()
+
+    def tearDown(self):
+        sys.stderr = self._real_stderr
+        super(QuietMixin, self).tearDown()
+
+
+class TestBoardBuilder(QuietMixin, TestCase):
+
+    def test_get(self):
+        """The board is built on first use, then served as built."""
+        build = FakeBuild()
+        builder = BoardBuilder(build)
+        rendition = builder.get("html")
+        self.assertEqual(rendition.body, "board")
+        self.assertEqual(rendition.content_type, "text/html")
+        self.assertTrue(rendition.etag.startswith('"'))
+        self.assertTrue(builder.get("html") is rendition)
+        self.assertEqual(builder.get("json"), None)
+        self.assertEqual(build.calls, 1)
+
+    def test_unchanged(self):
+        """Builds of an unchanged board keep the previous renditions."""
+        build = FakeBuild()
+        builder = BoardBuilder(build)
+        rendition = builder.get("html")
+        build.body = None
+        builder.build()
+        self.assertTrue(builder.get("html") is rendition)
+
+    def test_error(self):
+        """Failed builds keep the error and serve the stale renditions."""
+        build = FakeBuild()
+        builder = BoardBuilder(build)
+        builder.get("html")
+        build.error = ValueError("failed")
+        builder.build()
+        self.assertEqual(str(builder.error), "failed")
+        self.assertTrue(builder.stale)
+        self.assertEqual(builder.get("html").body, "stale board")
+
+        build.error = None
+        builder.build()
+        self.assertFalse(builder.stale)
+        self.assertEqual(builder.get("html").body, "board")
+
+    def test_same_stale_body(self):
+        """Formats without a stale body are served the same when stale."""
+        build = FakeBuild(stale_body=None)
+        builder = BoardBuilder(build)
+        rendition = builder.get("html")
+        build.error = ValueError("failed")
+        builder.build()
+        self.assertTrue(builder.get("html") is rendition)
+
+    def test_deadline(self):
+        """Builds past the deadline serve the stale renditions."""
+        build = FakeBuild()
+        builder = BoardBuilder(build, 0.01)
+        builder.build()
+        build.release.clear()
+        build.started.clear()
+        builder.build_in_background()
+        build.started.wait()
+        sleep(0.02)
+        self.assertEqual(builder.get("html").body, "stale board")
+        build.release.set()
+        while builder.builds < 2:
+            sleep(0.001)
+        self.assertEqual(builder.get("html").body, "board")
+
+    def test_first_deadline(self):
+        """The first request only waits for the build until the deadline."""
+        build = FakeBuild()
+        build.release.clear()
+        builder = BoardBuilder(build, 0.01)
+        self.assertEqual(builder.get("html"), None)
+        build.release.set()
+
+    def test_coalesce(self):
+        """Builds requested during a build wait for it instead."""
+        build = FakeBuild()
+        build.release.clear()
+        builder = BoardBuilder(build)
+        threads = [Thread(target=builder.build) for i in range(5)]
+        threads[0].start()
+        build.started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        while builder.waiting < 4:
+            sleep(0.001)
+        build.release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(build.calls, 1)
+        self.assertEqual(builder.builds, 1)
+
+
+class TestBoardHTTPServer(QuietMixin, TestCase):
+
+    def setUp(self):
+        super(TestBoardHTTPServer, self).setUp()
+        self.build = FakeBuild()
+        self.server = BoardHTTPServer(
+            ("localhost", 0), {"test": BoardBuilder(self.build)}, 60)
+        self.thread = Thread(
+            target=self.server.serve_forever, args=(0.01,))
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        super(TestBoardHTTPServer, self).tearDown()
+
+    def request(self, path, headers={}, method="GET"):
+        connection = HTTPConnection(*self.server.server_address)
+        connection.request(method, path, headers=headers)
+        response = connection.getresponse()
+        response.body = response.read()
+        connection.close()
+        return response
+
+    def test_get(self):
+        """Boards are served with an ETag and Cache-Control."""
+        response = self.request("/test.html")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body, "board")
+        self.assertEqual(response.getheader("Content-Type"), "text/html")
+        self.assertEqual(response.getheader("Cache-Control"), "max-age=60")
+        self.assertTrue(response.getheader("ETag"))
+
+    def test_head(self):
+        """HEAD requests get the headers without the body."""
+        response = self.request("/test.html", method="HEAD")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Content-Length"), "5")
+        self.assertEqual(response.body, "")
+
+    def test_not_modified(self):
+        """Requests with the current ETag are not modified."""
+        etag = self.request("/test.html").getheader("ETag")
+        response = self.request("/test.html", {"If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(response.body, "")
+        self.assertEqual(self.build.calls, 1)
+
+        response = self.request("/test.html", {"If-None-Match": '"old"'})
+        self.assertEqual(response.status, 200)
+
+    def test_redirect(self):
+        """The root redirects to the only board."""
+        response = self.request("/")
+        self.assertEqual(response.status, 302)
+        self.assertEqual(response.getheader("Location"), "/test.html")
+
+    def test_not_found(self):
+        """Unknown boards and formats are not found."""
+        self.assertEqual(self.request("/other.html").status, 404)
+        self.assertEqual(self.request("/test.csv").status, 404)
+
+    def test_not_built(self):
+        """Boards that couldn't be built are unavailable."""
+        self.build.error = ValueError("failed")
+        self.assertEqual(self.request("/test.html").status, 503)
@@ -0,0 +1,143 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+import json
+import os
+import pstats
+import shutil
+import tempfile
+
+from cStringIO import StringIO
+from unittest import TestCase
+
+from jiraban.timings import (
+    TimedStream,
+    Timings,
+    phase,
+    )
+
+
+class TestTimings(TestCase):
+
+    def test_phase(self):
+        """Each phase counts its calls and time."""
+        timings = Timings()
+        for _ in range(2):
+            with timings.phase("render"):
+                pass
+        [calls, wall, cpu] = timings.phases["render"]
+        self.assertEqual(calls, 2)
+        self.assertTrue(wall >= 0)
+        self.assertTrue(cpu >= 0)
+
+    def test_nested_phase(self):
+        """The time of nested phases is excluded from the outer phase."""
+        timings = Timings()
+        with timings.phase("board"):
+            with timings.phase("fetch"):
+                sum(range(100000))
+        self.assertTrue(
+            timings.phases["board"][1] < timings.phases["fetch"][1])
+        total = timings.to_dict()["total"]["wall"]
+        self.assertAlmostEqual(
+            total,
+            timings.phases["board"][1] + timings.phases["fetch"][1])
+
+    def test_count(self):
+        """Counters are added to."""
+        timings = Timings()
+        timings.count("requests")
+        timings.count("bytes", 10)
+        timings.count("bytes", 5)
+        self.assertEqual(timings.counters, {"requests": 1, "bytes": 15})
+
+    def test_write_json(self):
+        """The timings are written as JSON."""
+        timings = Timings()
+        timings.add("render", 2.0, 1.0)
+        timings.count("requests")
+        stream = StringIO()
+        timings.write_json(stream)
+        self.assertEqual(json.loads(stream.getvalue()), {
+            "phases": {"render": {"calls": 1, "wall": 2.0, "cpu": 1.0}},
+            "total": {"wall": 2.0, "cpu": 1.0},
+            "counters": {"requests": 1},
+            })
+
+    def test_write_summary(self):
+        """The summary lists the phases in the order they happen."""
+        timings = Timings()
+        timings.add("render", 2.0, 1.0)
+        timings.add("fetch", 1.0, 0.5)
+        timings.count("requests", 2)
+        timings.count("bytes", 100)
+        timings.count("request_seconds", 1.0)
+        stream = StringIO()
+        timings.write_summary(stream)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(
+            [line.split()[0] for line in lines[1:4]],
+            ["fetch", "render", "total"])
+        self.assertEqual(
+            lines[-1],
+            "2 requests, 100 bytes, 0.500 seconds of latency on average")
+
+    def test_profile(self):
+        """Only the profiled phase is profiled."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "profile")
+
+        timings = Timings("render")
+        with timings.phase("fetch"):
+            pass
+        self.assertFalse(timings.dump_profile(path))
+        with timings.phase("render"):
+            sorted([3, 2, 1])
+        self.assertTrue(timings.dump_profile(path))
+        stats = pstats.Stats(path)
+        self.assertTrue(any(
+            function[2] == "<sorted>" for function in stats.stats))
+
+
+class TestPhase(TestCase):
+
+    def test_none(self):
+        """Nothing is timed without timings."""
+        with phase(None, "render"):
+            pass
+
+    def test_timings(self):
+        """The phase is timed with timings."""
+        timings = Timings()
+        with phase(timings, "render"):
+            pass
+        self.assertEqual(timings.phases.keys(), ["render"])
+
+
+class TestTimedStream(TestCase):
+
+    def test_write(self):
+        """Writes are timed as the write phase."""
+        timings = Timings()
+        stream = StringIO()
+        TimedStream(stream, timings).write("test")
+        self.assertEqual(stream.getvalue(), "test")
+        self.assertEqual(timings.phases["write"][0], 1)
@@ -24,6 +24,8 @@ from jiraban.variables import (
     ListVariable,
     Variable,
     VariableFactory,
+    intern_value,
+    purge_interned_values,
     raise_none_error,
     )
 
@@ -96,6 +98,11 @@ class TestVariable(TestCase):
         variable = FakeVariable(required=True)
         self.assertRaises(ValueError, variable.get)
 
+    def test_coerce_all(self):
+        variable = FakeVariable()
+        self.assertEqual(variable.coerce_all([marker, None]), [marker, None])
+        self.assertEqual(variable.sets, [])
+
 
 class TestStringVariable(TestCase):
 
@@ -153,6 +160,66 @@ class TestListVariable(TestCase):
         variable = ListVariable(item_factory, ",")
         self.assertRaises(ValueError, variable.set, 0)
 
+    def test_set_get_integer_item(self):
+        item_factory = VariableFactory(StringVariable)
+        variable = ListVariable(item_factory, ",")
+        self.assertRaises(ValueError, variable.set, ["a", 0])
+
+    def test_set_does_not_mutate(self):
+        item_factory = VariableFactory(StringVariable)
+        variable = ListVariable(item_factory, ",")
+
+        l = [u"a"]
+        variable.set(l)
+        self.assertEqual(variable.get(), ["a"])
+        self.assertTrue(isinstance(l[0], unicode))
+        self.assertTrue(variable.get() is not l)
+
+    def test_set_get_immutable(self):
+        item_factory = VariableFactory(StringVariable)
+        variable = ListVariable(item_factory, ",", immutable=True)
+
+        variable.set(["a", "b"])
+        self.assertEqual(variable.get(), ("a", "b"))
+
+    def test_set_get_interned(self):
+        item_factory = VariableFactory(UnicodeVariable)
+        variable1 = ListVariable(item_factory, ",", interned=True)
+        variable2 = ListVariable(item_factory, ",", interned=True)
+
+        variable1.set([u"".join(["a", "b"])])
+        variable2.set([u"".join(["a", "b"])])
+        self.assertTrue(variable1.get()[0] is variable2.get()[0])
+
+
+class TestInternValue(TestCase):
+
+    def test_equal(self):
+        value = u"".join(["interned", "-", "value"])
+        self.assertEqual(intern_value(value), value)
+
+    def test_same(self):
+        value1 = u"".join(["interned", "-", "same"])
+        value2 = u"".join(["interned", "-", "same"])
+        self.assertTrue(intern_value(value1) is intern_value(value2))
+
+
+class TestPurgeInternedValues(TestCase):
+
+    def test_unused(self):
+        """Values only held by the table are forgotten."""
+        intern_value(u"".join(["interned", "-", "unused"]))
+        purge_interned_values()
+        value1 = u"".join(["interned", "-", "unused"])
+        self.assertTrue(intern_value(value1) is value1)
+
+    def test_used(self):
+        """Values still in use are kept."""
+        value1 = intern_value(u"".join(["interned", "-", "used"]))
+        purge_interned_values()
+        value2 = u"".join(["interned", "-", "used"])
+        self.assertTrue(intern_value(value2) is value1)
+
 
 class TestRaiseNoneError(TestCase):
 
@@ -0,0 +1,105 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = []
+
+from unittest import TestCase
+
+from jiraban.board import (
+    MAJOR,
+    OPEN,
+    Board,
+    Item,
+    )
+from jiraban.watch import BoardWatcher
+
+
+class FakeJIRA:
+    """JIRA returning the items set on it, recording the queries."""
+
+    def __init__(self):
+        self.items = {}
+        self.queries = []
+
+    def set_item(self, id, updated, summary=u"summary"):
+        self.items[id] = (updated, summary)
+
+    def create_item(self, id):
+        updated, summary = self.items[id]
+        return Item(
+            id, "link", MAJOR, OPEN, u"project", summary, updated=updated)
+
+    def iter_items(self, jql):
+        self.queries.append("items")
+        return [self.create_item(id) for id in sorted(self.items)]
+
+    def iter_items_by_key(self, keys):
+        self.queries.append("items %s" % ",".join(keys))
+        return [self.create_item(id) for id in keys]
+
+    def iter_updates(self, jql):
+        self.queries.append("updates")
+        return [(id, self.items[id][0]) for id in sorted(self.items)]
+
+
+class TestBoardWatcher(TestCase):
+
+    def setUp(self):
+        super(TestBoardWatcher, self).setUp()
+        self.jira = FakeJIRA()
+        self.board = Board("test")
+        self.watcher = BoardWatcher(self.jira, "jql", self.board)
+
+    def test_first_refresh(self):
+        """The first refresh gets all the items."""
+        self.jira.set_item("1", "t1")
+        self.jira.set_item("2", "t1")
+        self.assertTrue(self.watcher.refresh())
+        self.assertEqual(self.jira.queries, ["items"])
+        self.assertEqual([i.id for i in self.board], ["1", "2"])
+
+    def test_unchanged(self):
+        """Refreshing without changes only gets the updates."""
+        self.jira.set_item("1", "t1")
+        self.watcher.refresh()
+        self.assertFalse(self.watcher.refresh())
+        self.assertEqual(self.jira.queries, ["items", "updates"])
+
+    def test_changed(self):
+        """Only changed and new items are fetched and replaced."""
+        self.jira.set_item("1", "t1")
+        self.jira.set_item("2", "t1")
+        self.watcher.refresh()
+        self.jira.set_item("2", "t2", u"changed")
+        self.jira.set_item("3", "t1")
+        self.assertTrue(self.watcher.refresh())
+        self.assertEqual(self.jira.queries[-1], "items 2,3")
+        self.assertEqual(
+            [(i.id, i.summary) for i in self.board],
+            [("1", u"summary"), ("2", u"changed"), ("3", u"summary")])
+
+    def test_removed(self):
+        """Items no longer in the query are removed from the board."""
+        self.jira.set_item("1", "t1")
+        self.jira.set_item("2", "t1")
+        self.watcher.refresh()
+        del self.jira.items["1"]
+        self.assertTrue(self.watcher.refresh())
+        self.assertEqual(self.jira.queries, ["items", "updates"])
+        self.assertEqual([i.id for i in self.board], ["2"])
+        self.assertEqual(len(self.board.identities), 1)
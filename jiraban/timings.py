@@ -0,0 +1,229 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "PHASES",
+    "TimedStream",
+    "Timings",
+    "get_times",
+    "phase",
+    ]
+
+import json
+import os
+import time
+
+from contextlib import contextmanager
+from threading import (
+    Lock,
+    local,
+    )
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Phases of a run, in the order they happen.
+PHASES = [
+    "options", "fetch", "parse", "items", "board", "icons", "render",
+    "write"]
+
+
+def get_times():
+    """Get the wall time and the CPU time of the process, in seconds.
+
+    The CPU time has a resolution of microseconds where C{getrusage}
+    exists, falling back to the clock ticks of C{os.times} elsewhere.
+    """
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return time.time(), usage.ru_utime + usage.ru_stime
+
+    times = os.times()
+    return time.time(), times[0] + times[1]
+
+
+class Timings:
+    """Wall and CPU time spent in each phase of a run, with counters.
+
+    The time of a phase excludes the time of the phases nested in it,
+    so the phases add up to the time of the run. Phases are tracked
+    per thread, but the CPU time is that of the whole process.
+
+    @param profile_phase: Optional name of a phase to profile with
+        C{cProfile}, see L{dump_profile}.
+    @param memory: Optional L{MemoryReport} recording the memory at the
+        end of each phase.
+    """
+
+    def __init__(self, profile_phase=None, memory=None):
+        self.profile_phase = profile_phase
+        self.memory = memory
+        self.phases = {}
+        self.counters = {}
+        self._lock = Lock()
+        self._local = local()
+        self._profile = None
+        self._profiling = False
+
+    def add(self, name, wall, cpu, calls=1):
+        """Add C{wall} and C{cpu} seconds spent in the phase C{name}."""
+        with self._lock:
+            totals = self.phases.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += calls
+            totals[1] += wall
+            totals[2] += cpu
+
+    def count(self, name, value=1):
+        """Add C{value} to the counter C{name}."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def phase(self, name):
+        """Time the code within this context as the phase C{name}."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append([0.0, 0.0])
+        profiling = name == self.profile_phase and self._start_profile()
+        if self.memory is not None:
+            start_memory = self.memory.get_memory()[0]
+        start_wall, start_cpu = get_times()
+        try:
+            yield
+        finally:
+            end_wall, end_cpu = get_times()
+            if profiling:
+                self._stop_profile()
+            if self.memory is not None:
+                self.memory.record(name, start_memory)
+            wall = end_wall - start_wall
+            cpu = end_cpu - start_cpu
+            nested_wall, nested_cpu = stack.pop()
+            if stack:
+                stack[-1][0] += wall
+                stack[-1][1] += cpu
+            self.add(name, wall - nested_wall, cpu - nested_cpu)
+
+    def _start_profile(self):
+        with self._lock:
+            if self._profiling:
+                return False
+            if self._profile is None:
+                import cProfile
+                self._profile = cProfile.Profile()
+            self._profiling = True
+
+        self._profile.enable()
+        return True
+
+    def _stop_profile(self):
+        self._profile.disable()
+        with self._lock:
+            self._profiling = False
+
+    def dump_profile(self, path):
+        """Dump the C{cProfile} stats of the profiled phase to C{path}.
+
+        The stats can be read with the C{pstats} module. Nothing is
+        written when the phase never happened.
+
+        @return: Whether the stats were written.
+        """
+        if self._profile is None:
+            return False
+
+        self._profile.dump_stats(path)
+        return True
+
+    def get_names(self):
+        """Get the names of the phases, in the order they happen."""
+        return ([n for n in PHASES if n in self.phases] +
+            sorted(n for n in self.phases if n not in PHASES))
+
+    def to_dict(self):
+        """Get the timings as a dict of phases, totals and counters."""
+        phases = {}
+        total_wall = total_cpu = 0.0
+        for name, (calls, wall, cpu) in self.phases.iteritems():
+            phases[name] = {"calls": calls, "wall": wall, "cpu": cpu}
+            total_wall += wall
+            total_cpu += cpu
+
+        return {
+            "phases": phases,
+            "total": {"wall": total_wall, "cpu": total_cpu},
+            "counters": dict(self.counters),
+            }
+
+    def write_json(self, stream):
+        """Write the timings to C{stream} as JSON."""
+        json.dump(self.to_dict(), stream, indent=2, sort_keys=True)
+        stream.write("\n")
+
+    def write_summary(self, stream):
+        """Write a table of the timings to C{stream}."""
+        data = self.to_dict()
+        stream.write("%-10s %6s %10s %10s\n" % (
+            "phase", "calls", "wall (s)", "cpu (s)"))
+        for name in self.get_names():
+            phase = data["phases"][name]
+            stream.write("%-10s %6d %10.3f %10.3f\n" % (
+                name, phase["calls"], phase["wall"], phase["cpu"]))
+        stream.write("%-10s %6s %10.3f %10.3f\n" % (
+            "total", "", data["total"]["wall"], data["total"]["cpu"]))
+
+        requests = self.counters.get("requests", 0)
+        if requests:
+            stream.write(
+                "%d requests, %d bytes, %.3f seconds of latency on "
+                "average\n" % (
+                    requests, self.counters.get("bytes", 0),
+                    self.counters.get("request_seconds", 0) / requests))
+
+
+@contextmanager
+def phase(timings, name):
+    """Time the code within this context as the phase C{name}.
+
+    Nothing is timed when C{timings} is C{None}.
+    """
+    if timings is None:
+        yield
+    else:
+        with timings.phase(name):
+            yield
+
+
+class TimedStream:
+    """Stream timing its writes as the C{write} phase.
+
+    @param stream: File object, or any object with a C{write} method.
+    @param timings: L{Timings} of the writes.
+    """
+
+    def __init__(self, stream, timings):
+        self._stream = stream
+        self._timings = timings
+
+    def write(self, data):
+        with self._timings.phase("write"):
+            self._stream.write(data)
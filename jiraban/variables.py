@@ -23,8 +23,12 @@ __all__ = [
     "Variable",
     "VariableFactory",
     "get_variable",
+    "intern_value",
+    "purge_interned_values",
     ]
 
+import sys
+
 from functools import partial as VariableFactory
 
 
@@ -65,6 +69,14 @@ class Variable:
     def coerce(self, value):
         return value
 
+    def coerce_all(self, values):
+        """Coerce a sequence of values in a single call.
+
+        None values are left as is, like for a variable that is not set.
+        """
+        coerce = self.coerce
+        return [coerce(v) if v is not None else None for v in values]
+
 
 class StringVariable(Variable):
 
@@ -93,38 +105,84 @@ class ListVariable(Variable):
     def __init__(self, item_factory, separator, *args, **kwargs):
         self._item_factory = item_factory
         self._separator = separator
+        self._immutable = kwargs.pop("immutable", False)
+        self._interned = kwargs.pop("interned", False)
         super(ListVariable, self).__init__(*args, **kwargs)
 
     def coerce(self, values):
-        item_factory = self._item_factory
         if isinstance(values, str):
             values = values.split(self._separator) if values else []
         elif not isinstance(values, (list, tuple)):
             raise ValueError("%r is not a list or tuple" % (values,))
 
-        for i, v in enumerate(values):
-            values[i] = item_factory(value=v).get()
+        values = self._item_factory().coerce_all(values)
+        if self._interned:
+            values = [intern_value(v) for v in values]
+        if self._immutable:
+            values = tuple(values)
 
         return values
 
 
 def get_variable(obj, attribute):
-    return get_variables(obj)[attribute]
+    """Get the variable of C{obj} for C{attribute}.
+
+    Only the variable for C{attribute} is created, the first time it is
+    needed, so objects only pay for the attributes that are used.
+    """
+    slots = obj.__dict__
+    try:
+        return slots[attribute.name]
+    except KeyError:
+        variable = attribute.variable_factory(attribute=attribute)
+        return slots.setdefault(attribute.name, variable)
 
 
 def get_variables(obj):
+    """Get all the variables of C{obj} keyed by attribute.
+
+    Each variable is stored in a slot of the instance __dict__ named
+    after its attribute. Since properties are data descriptors, the slot
+    never shadows the property and can be read with a single lookup.
+    """
     from jiraban.attribute import get_attributes
 
-    if "__variables__" in obj.__dict__:
-        return obj.__dict__["__variables__"]
-    else:
-        variables = {}
-        cls = type(obj)
-        for attribute in get_attributes(cls).values():
-            variable = attribute.variable_factory(attribute=attribute)
-            variables[attribute] = variable
+    return dict(
+        (attribute, get_variable(obj, attribute))
+        for attribute in get_attributes(type(obj)).values())
+
+
+# Table of interned values, see intern_value.
+_interned_values = {}
+
+
+def intern_value(value):
+    """Get the interned copy of C{value}.
+
+    Equal values share the same object, so repeated values across many
+    objects are only stored once. Unlike the C{intern} builtin, this also
+    works for unicode and other hashable values.
+    """
+    return _interned_values.setdefault(value, value)
+
+
+def purge_interned_values():
+    """Forget the interned values no longer used outside of the table.
+
+    Long running processes should call this after dropping objects, so
+    the table only keeps the values still in use.
+
+    @return: The number of values forgotten.
+    """
+    purged = 0
+    for value in _interned_values.keys():
+        # The table holds two references, as key and as value, then
+        # the list of keys, the loop and the call hold one each.
+        if sys.getrefcount(value) <= 5:
+            _interned_values.pop(value, None)
+            purged += 1
 
-        return obj.__dict__.setdefault("__variables__", variables)
+    return purged
 
 
 def raise_none_error(attribute):
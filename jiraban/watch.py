@@ -0,0 +1,78 @@
+#
+# Copyright (c) 2013, Marc Tardif <marc@interunion.ca>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+__metaclass__ = type
+
+__all__ = [
+    "BoardWatcher",
+    ]
+
+from jiraban.variables import purge_interned_values
+
+
+class BoardWatcher:
+    """Keep a L{Board} up to date with the items of a JQL query.
+
+    The first refresh gets all the items. Later refreshes only get the
+    key and update time of each item, then the items that changed, and
+    apply the difference to the board in place. Values interned by the
+    items that were dropped are then forgotten.
+
+    @param jira: L{JIRA} instance to query.
+    @param jql: JQL query of the items on the board.
+    @param board: L{Board} to keep up to date.
+    """
+
+    def __init__(self, jira, jql, board):
+        self.jira = jira
+        self.jql = jql
+        self.board = board
+        self._items = {}
+        self.loaded = False
+
+    def refresh(self):
+        """Apply the changes since the last refresh to the board.
+
+        @return: Whether the board changed, always true the first time.
+        """
+        if not self.loaded:
+            self._update(self.jira.iter_items(self.jql))
+            self.loaded = True
+            return True
+
+        updates = dict(self.jira.iter_updates(self.jql))
+        removed = [key for key in self._items if key not in updates]
+        for key in removed:
+            self.board.remove(self._items.pop(key))
+
+        changed = sorted(
+            key for key, updated in updates.iteritems()
+            if key not in self._items or self._items[key].updated != updated)
+        if changed:
+            self._update(self.jira.iter_items_by_key(changed))
+        if removed or changed:
+            purge_interned_values()
+            return True
+
+        return False
+
+    def _update(self, items):
+        for item in items:
+            old_item = self._items.get(item.id)
+            if old_item is not None:
+                self.board.remove(old_item)
+            self.board.add(item)
+            self._items[item.id] = item